@@ -10,9 +10,24 @@ DATA_DIR = BASE_DIR / "data"
 
 # Database
 DATABASE_PATH = os.getenv("DATABASE_PATH", str(DATA_DIR / "valentine.db"))
+# Page storage engine: "sqlite", or "memory" (per process, for tests and benchmarks only)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+# Pages are spread over this many SQLite files by slug hash; change it only with `python -m app.db.reshard`
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
 
 # Redis
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# Fail fast when Redis degrades: connect/command timeouts, and how long a request
+# may wait to check out a pooled connection (including opening a new one)
+REDIS_CONNECT_TIMEOUT_MS = int(os.getenv("REDIS_CONNECT_TIMEOUT_MS", "250"))
+REDIS_COMMAND_TIMEOUT_MS = int(os.getenv("REDIS_COMMAND_TIMEOUT_MS", "250"))
+REDIS_POOL_TIMEOUT_MS = int(os.getenv("REDIS_POOL_TIMEOUT_MS", "100"))
+# Per-namespace circuit breaker: open after this many failures in a row, probe again after the reset time
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", "5"))
+REDIS_BREAKER_RESET_SECONDS = float(os.getenv("REDIS_BREAKER_RESET_SECONDS", "5"))
+# Batch commands from concurrent requests into one pipeline per event-loop tick (opt-in)
+REDIS_AUTO_PIPELINE = os.getenv("REDIS_AUTO_PIPELINE", "false").lower() == "true"
+REDIS_AUTO_PIPELINE_MAX_BATCH = int(os.getenv("REDIS_AUTO_PIPELINE_MAX_BATCH", "128"))
 
 # CORS - Parse comma-separated origins
 def get_allowed_origins() -> list[str]:
@@ -30,6 +45,136 @@ FRONTEND_DOMAIN = os.getenv("FRONTEND_DOMAIN", "https://special.obvix.cloud")
 # Rate limiting
 RATE_LIMIT_PAGES_PER_HOUR = int(os.getenv("RATE_LIMIT_PAGES_PER_HOUR", "10"))
 RATE_LIMIT_SLUG_CHECKS_PER_MINUTE = int(os.getenv("RATE_LIMIT_SLUG_CHECKS_PER_MINUTE", "60"))
+# Compute budget per IP, shared by the slug endpoints: each request costs 1 plus
+# one unit per database round trip it made (suggestions can make dozens)
+COMPUTE_BUDGET_PER_MINUTE = int(os.getenv("COMPUTE_BUDGET_PER_MINUTE", "300"))
+
+# Database query instrumentation (per-fingerprint stats, slow-query log with query plans)
+DB_QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS_ENABLED", "false").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "50"))
+DB_QUERY_STATS_DUMP_PATH = os.getenv("DB_QUERY_STATS_DUMP_PATH", str(DATA_DIR / "query_stats.{pid}.json"))
+
+# Traffic capture for offline replay (one rotating NDJSON file per worker process)
+TRAFFIC_CAPTURE_ENABLED = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", str(DATA_DIR / "traffic.{pid}.ndjson"))
+TRAFFIC_CAPTURE_MAX_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRAFFIC_CAPTURE_BACKUPS = int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", "5"))
+# HMAC key for slug hashes; set the same key on every worker so their captures group by slug.
+# Empty: a random key per worker process.
+TRAFFIC_CAPTURE_KEY = os.getenv("TRAFFIC_CAPTURE_KEY", "")
+
+# Sampling profiler (off by default): profile every Kth request, and/or on SIGUSR2 for a fixed time
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_EVERY_N_REQUESTS = int(os.getenv("PROFILE_EVERY_N_REQUESTS", "0"))
+PROFILE_SIGNAL_ENABLED = os.getenv("PROFILE_SIGNAL_ENABLED", "false").lower() == "true"
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", str(DATA_DIR / "profiles"))
+
+# Event-loop lag monitor; LOOP_DEBUG also flags synchronous I/O made on the loop thread
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "250"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "false").lower() == "true"
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Server-Timing header: always on when enabled, otherwise sampled at the given rate (0.0 - 1.0)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv("SERVER_TIMING_SAMPLE_RATE", "0"))
+
+# Retention and compaction (one worker per host runs the job)
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "false").lower() == "true"
+MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+MAINTENANCE_BATCH_PAUSE_MS = int(os.getenv("MAINTENANCE_BATCH_PAUSE_MS", "50"))
+CREATION_LOG_RETENTION_DAYS = int(os.getenv("CREATION_LOG_RETENTION_DAYS", "90"))
+PAGE_ARCHIVE_GRACE_DAYS = int(os.getenv("PAGE_ARCHIVE_GRACE_DAYS", "30"))
+VACUUM_PAGES_PER_STEP = int(os.getenv("VACUUM_PAGES_PER_STEP", "256"))
+
+# WAL checkpointing: PASSIVE when writes go quiet (or the last one is overdue),
+# RESTART/TRUNCATE only when readers keep the WAL from resetting or it outgrows the limit
+WAL_CHECKPOINT_ENABLED = os.getenv("WAL_CHECKPOINT_ENABLED", "true").lower() == "true"
+WAL_CHECK_INTERVAL_SECONDS = float(os.getenv("WAL_CHECK_INTERVAL_SECONDS", "5"))
+WAL_QUIET_SECONDS = float(os.getenv("WAL_QUIET_SECONDS", "2"))
+WAL_CHECKPOINT_MAX_INTERVAL_SECONDS = float(os.getenv("WAL_CHECKPOINT_MAX_INTERVAL_SECONDS", "60"))
+WAL_SIZE_LIMIT_MB = float(os.getenv("WAL_SIZE_LIMIT_MB", "64"))
+WAL_ESCALATE_AFTER = int(os.getenv("WAL_ESCALATE_AFTER", "3"))
+WAL_CHECKPOINT_BUSY_TIMEOUT_MS = int(os.getenv("WAL_CHECKPOINT_BUSY_TIMEOUT_MS", "100"))
+# Backstop for SQLite's own auto-checkpoint (runs inside whichever request commits)
+WAL_AUTOCHECKPOINT_PAGES = int(os.getenv("WAL_AUTOCHECKPOINT_PAGES", "10000"))
+
+# Online backups (0 disables the schedule; POST /api/admin/backup still works)
+BACKUP_INTERVAL_SECONDS = int(os.getenv("BACKUP_INTERVAL_SECONDS", "0"))
+BACKUP_DIR = os.getenv("BACKUP_DIR", str(DATA_DIR / "backups"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+# Wait before retrying a step when the source is locked
+BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", "10"))
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+# Page creation runs inline up to this many seconds before falling back to the queue
+PAGE_CREATE_SYNC_TIMEOUT = float(os.getenv("PAGE_CREATE_SYNC_TIMEOUT", "2.0"))
+
+# Slug leases: how long a reservation from the form holds, and how long a
+# creation holds the slug while it runs (inline or queued)
+SLUG_LEASE_TTL_SECONDS = int(os.getenv("SLUG_LEASE_TTL_SECONDS", "300"))
+SLUG_CREATE_LEASE_SECONDS = int(os.getenv("SLUG_CREATE_LEASE_SECONDS", "60"))
+
+# Idempotency-Key on page creation: how long a response is kept for retries,
+# how long an in-flight attempt holds the key, and how long a duplicate waits for it
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_IN_FLIGHT_SECONDS = int(os.getenv("IDEMPOTENCY_IN_FLIGHT_SECONDS", "30"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "5"))
+
+# Load shedding (per worker): concurrent requests per route class, how many may
+# wait for a slot, and how long they may wait before a 503. Classes are admitted
+# in this order of priority: reads, then slug checks, then writes (page creation, edits)
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "true").lower() == "true"
+LOAD_SHED_MAX_CONCURRENCY = int(os.getenv("LOAD_SHED_MAX_CONCURRENCY", "128"))
+LOAD_SHED_CLASSES = {
+    "read": {
+        "concurrency": int(os.getenv("LOAD_SHED_READ_CONCURRENCY", "96")),
+        "queue": int(os.getenv("LOAD_SHED_READ_QUEUE", "256")),
+        "deadline_ms": int(os.getenv("LOAD_SHED_READ_DEADLINE_MS", "1000")),
+    },
+    "slug_check": {
+        "concurrency": int(os.getenv("LOAD_SHED_SLUG_CHECK_CONCURRENCY", "48")),
+        "queue": int(os.getenv("LOAD_SHED_SLUG_CHECK_QUEUE", "128")),
+        "deadline_ms": int(os.getenv("LOAD_SHED_SLUG_CHECK_DEADLINE_MS", "500")),
+    },
+    "write": {
+        "concurrency": int(os.getenv("LOAD_SHED_WRITE_CONCURRENCY", "16")),
+        "queue": int(os.getenv("LOAD_SHED_WRITE_QUEUE", "32")),
+        "deadline_ms": int(os.getenv("LOAD_SHED_WRITE_DEADLINE_MS", "1000")),
+    },
+}
+
+# Page view analytics: live in Redis for the current UTC day, rolled up into
+# SQLite every PAGE_STATS_ROLLUP_SECONDS; owners can read up to PAGE_STATS_MAX_DAYS
+PAGE_STATS_ENABLED = os.getenv("PAGE_STATS_ENABLED", "true").lower() == "true"
+PAGE_STATS_ROLLUP_SECONDS = int(os.getenv("PAGE_STATS_ROLLUP_SECONDS", "300"))
+PAGE_STATS_MAX_DAYS = int(os.getenv("PAGE_STATS_MAX_DAYS", "90"))
+
+# Page expiration: how often the sweeper deactivates expired pages, how many per
+# shard in one transaction, and the longest lifetime a creator may ask for
+PAGE_EXPIRY_ENABLED = os.getenv("PAGE_EXPIRY_ENABLED", "true").lower() == "true"
+PAGE_EXPIRY_SWEEP_SECONDS = int(os.getenv("PAGE_EXPIRY_SWEEP_SECONDS", "60"))
+PAGE_EXPIRY_BATCH_SIZE = int(os.getenv("PAGE_EXPIRY_BATCH_SIZE", "200"))
+PAGE_MAX_LIFETIME_DAYS = int(os.getenv("PAGE_MAX_LIFETIME_DAYS", "3650"))
+
+# Hot pages: a space-saving tracker of page views finds the most viewed pages
+# (counts halve every HOT_PAGES_DECAY_SECONDS); the top ones with enough views
+# are pinned in an in-process cache and in Redis, and preloaded at startup
+HOT_PAGES_ENABLED = os.getenv("HOT_PAGES_ENABLED", "true").lower() == "true"
+HOT_PAGES_CAPACITY = int(os.getenv("HOT_PAGES_CAPACITY", "256"))
+HOT_PAGES_TOP = int(os.getenv("HOT_PAGES_TOP", "20"))
+HOT_PAGES_MIN_VIEWS = int(os.getenv("HOT_PAGES_MIN_VIEWS", "20"))
+HOT_PAGES_REFRESH_SECONDS = float(os.getenv("HOT_PAGES_REFRESH_SECONDS", "5"))
+HOT_PAGES_DECAY_SECONDS = float(os.getenv("HOT_PAGES_DECAY_SECONDS", "60"))
+HOT_PAGES_LOCAL_TTL_SECONDS = float(os.getenv("HOT_PAGES_LOCAL_TTL_SECONDS", "10"))
+HOT_PAGES_REDIS_TTL_SECONDS = int(os.getenv("HOT_PAGES_REDIS_TTL_SECONDS", "300"))
+HOT_PAGES_WARMUP_TIMEOUT_SECONDS = float(os.getenv("HOT_PAGES_WARMUP_TIMEOUT_SECONDS", "5"))
 
 # Slug validation
 MIN_SLUG_LENGTH = 3
@@ -43,7 +188,7 @@ RESERVED_SLUGS = {
     "help", "about", "contact", "terms", "privacy", "404", "500",
 }
 
-# Templates
+# Templates (expires_after_days: default lifetime of pages using the template, absent = never expire)
 TEMPLATES = {
     "classic": {
         "id": "classic",
@@ -116,5 +261,7 @@ TEMPLATES = {
         "secondary_color": "#ffe4e6",
         "font": "Pacifico",
         "interactive": True,
+        # Countdown pages are for one occasion; they expire a week after creation
+        "expires_after_days": 7,
     },
 }
@@ -1,61 +1,435 @@
+import asyncio
+import os
+import time
+import zlib
 import aiosqlite
+from collections import namedtuple
 from pathlib import Path
 from contextlib import asynccontextmanager
-from ..config import DATABASE_PATH, DATA_DIR
+from functools import lru_cache
+from typing import Any, AsyncIterator, Optional
+from ..config import (
+    DATABASE_PATH,
+    DATA_DIR,
+    DB_SHARDS,
+    DB_QUERY_STATS_ENABLED,
+    DB_SLOW_QUERY_MS,
+    DB_QUERY_STATS_DUMP_PATH,
+    WAL_CHECKPOINT_ENABLED,
+    WAL_AUTOCHECKPOINT_PAGES,
+)
+from ..services.timing import timed
+from .query_stats import QueryStats, find_full_scans
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single worker, no lock needed
+    fcntl = None
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
 
 # Ensure data directory exists
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Opt-in statement instrumentation (None when disabled)
+query_stats: Optional[QueryStats] = QueryStats(DB_SLOW_QUERY_MS) if DB_QUERY_STATS_ENABLED else None
+
+
+def shard_paths(shards: int = DB_SHARDS, base: str = DATABASE_PATH) -> list[str]:
+    """Database files in use: DATABASE_PATH itself, or {stem}.shard{i}{suffix} beside it when sharded."""
+    if shards <= 1:
+        return [base]
+    path = Path(base)
+    return [str(path.with_name(f"{path.stem}.shard{i}{path.suffix}")) for i in range(shards)]
+
+
+SHARD_PATHS = shard_paths()
+
+
+def shard_for(slug: str, shards: int = DB_SHARDS) -> int:
+    """Shard holding a slug (crc32 of the lowercased slug, stable across processes unlike hash())."""
+    if shards <= 1:
+        return 0
+    return zlib.crc32(slug.lower().encode()) % shards
+
+
+def sharded_id_sql(table: str, shard: int, shards: int = DB_SHARDS) -> str:
+    """
+    SQL expression for the id of a new row in an AUTOINCREMENT table.
+
+    With one shard this is NULL (plain AUTOINCREMENT). Otherwise it is the
+    smallest id above the shard's sequence that is congruent to the shard
+    number mod the shard count, so ids stay unique across shards. It is
+    evaluated inside the INSERT, under the shard's writer lock.
+    """
+    if shards <= 1:
+        return "NULL"
+    seq = f"(SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = '{table}')"
+    return f"({seq} + 1 + (({shard} - {seq} - 1) % {shards} + {shards}) % {shards})"
+
+
+def migration_files() -> list[tuple[int, Path]]:
+    """Numbered migration scripts (NNN_name.sql), in order."""
+    return sorted(
+        (int(path.name.split("_", 1)[0]), path)
+        for path in MIGRATIONS_DIR.glob("*.sql")
+    )
+
+
+# Latest schema version shipped with this code
+SCHEMA_VERSION = migration_files()[-1][0]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    return version
+
+
+def _lock_file(path: str):
+    """Block until we hold an exclusive lock on path. Returns the open lock file."""
+    lock = open(path, "a")
+    if fcntl:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def try_lock_file(path: str):
+    """
+    Take an exclusive lock on path without waiting. Returns the open lock file,
+    or None if another process holds it. Used to elect one worker per host for
+    background jobs; the lock is released when the file is closed or the
+    process exits.
+    """
+    lock = open(path, "a")
+    if fcntl:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+    return lock
+
+
+def check_shard_layout():
+    """Refuse to start against files laid out for a different DB_SHARDS (data would look missing)."""
+    existing = [path for path in shard_paths(DB_SHARDS + 1) if os.path.exists(path)]
+    if DB_SHARDS > 1 and os.path.exists(DATABASE_PATH) and not existing:
+        found = "unsharded data"
+    elif DB_SHARDS == 1 and not os.path.exists(DATABASE_PATH) and existing:
+        found = "sharded data"
+    elif DB_SHARDS > 1 and existing and len(existing) != DB_SHARDS:
+        found = f"{len(existing)} or more shard files"
+    else:
+        return
+    raise RuntimeError(
+        f"Found {found} next to {DATABASE_PATH} but DB_SHARDS={DB_SHARDS}; "
+        f"run `python -m app.db.reshard --to {DB_SHARDS}` or fix DB_SHARDS"
+    )
+
 
 async def init_db():
-    """Initialize the database with schema."""
-    schema_path = Path(__file__).parent / "schema.sql"
+    """Initialize every database file (one per shard), concurrently."""
+    check_shard_layout()
+    await asyncio.gather(*(migrate(path) for path in SHARD_PATHS))
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Enable WAL mode for better concurrency
-        await db.execute("PRAGMA journal_mode=WAL")
-        await db.execute("PRAGMA foreign_keys=ON")
 
-        # Read and execute schema
-        with open(schema_path, "r") as f:
-            schema = f.read()
+async def migrate(path: str):
+    """
+    Apply pending migrations to one database file.
+
+    The schema version is tracked in PRAGMA user_version, so a worker booting
+    against a current database only reads one header field. Otherwise the
+    first worker to take the migration lock applies each pending migration in
+    its own transaction; workers waiting on the lock re-check the version and
+    find nothing left to do.
+    """
+    async with aiosqlite.connect(path) as db:
+        if await get_schema_version(db) >= SCHEMA_VERSION:
+            return
+
+    lock = await asyncio.to_thread(_lock_file, f"{path}.migrate.lock")
+    try:
+        async with aiosqlite.connect(path) as db:
+            version = await get_schema_version(db)
+            if version == 0:
+                # Must be set before the first table exists; lets maintenance hand freed pages back
+                await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+            # Enable WAL mode for better concurrency (persists in the file)
+            cursor = await db.execute("PRAGMA journal_mode=WAL")
+            await cursor.close()
 
-        await db.executescript(schema)
-        await db.commit()
+            # Foreign keys stay off here: table rebuilds must not cascade
+            for number, migration in migration_files():
+                if number <= version:
+                    continue
+                script = await asyncio.to_thread(migration.read_text)
+                await db.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+                print(f"Applied migration {migration.name} to {Path(path).name}")
+    finally:
+        lock.close()
+
+
+async def open_db(path: str) -> aiosqlite.Connection:
+    """
+    Open an aiosqlite connection that is closed even if the caller is cancelled
+    mid-connect (e.g. by the sync creation timeout). aiosqlite only cleans up
+    after an Exception, so a cancelled connect would leave its thread running.
+    """
+    connect = asyncio.ensure_future(aiosqlite.connect(path))
+    try:
+        return await asyncio.shield(connect)
+    except asyncio.CancelledError:
+        # Let the connect finish, then close it
+        try:
+            await (await connect).close()
+        except Exception as e:
+            print(f"Error closing abandoned connection to {path}: {e}")
+        raise
 
 
 @asynccontextmanager
-async def get_db():
-    """Get a database connection."""
-    db = await aiosqlite.connect(DATABASE_PATH)
-    db.row_factory = aiosqlite.Row
+async def get_db(shard: int = 0):
+    """Get a database connection (to the given shard when sharded)."""
+    # Rows come back as plain tuples; the helpers below shape them (see row_format)
+    db = await open_db(SHARD_PATHS[shard])
 
     try:
         await db.execute("PRAGMA foreign_keys=ON")
+        if WAL_CHECKPOINT_ENABLED:
+            # The checkpoint manager does the regular work off the request path
+            await db.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}")
         yield db
     finally:
         await db.close()
 
 
-async def execute_query(query: str, params: tuple = ()):
+# Plan captures in flight, one per fingerprint (also keeps the tasks referenced)
+_plan_captures: dict[str, asyncio.Task] = {}
+
+
+def _record_query(query: str, params: tuple, start: float, shard: int):
+    """
+    Record statement timing. New and slow statements get their plan captured
+    in a background task on its own connection, so EXPLAIN never counts
+    towards the caller's db time.
+    """
+    if query_stats is None:
+        return
+
+    elapsed = time.perf_counter() - start
+    key, stats, needs_plan = query_stats.record(query, elapsed)
+    if needs_plan and key not in _plan_captures:
+        task = asyncio.create_task(_capture_plan(key, stats, query, params, shard, elapsed))
+        _plan_captures[key] = task
+        task.add_done_callback(lambda _: _plan_captures.pop(key, None))
+
+
+async def _capture_plan(key: str, stats, query: str, params: tuple, shard: int, elapsed: float):
+    """Explain a statement and flag full-table scans."""
+    try:
+        async with get_db(shard) as db:
+            cursor = await db.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            stats.plan = [row[3] for row in await cursor.fetchall()]
+    except Exception as e:
+        print(f"Query plan error for {key}: {e}")
+        stats.plan = []
+
+    full_scans = find_full_scans(stats.plan)
+    if full_scans and not stats.full_scan:
+        print(f"Full table scan: {key} -> {'; '.join(full_scans)}")
+    stats.full_scan = bool(full_scans)
+
+    if elapsed >= query_stats.slow_query_seconds:
+        print(f"Slow query ({elapsed * 1000:.1f}ms): {key} -> {'; '.join(stats.plan)}")
+
+
+def dump_query_stats():
+    """Write collected query stats to disk (one file per worker process)."""
+    if query_stats is None:
+        return
+
+    path = DB_QUERY_STATS_DUMP_PATH.replace("{pid}", str(os.getpid()))
+    try:
+        query_stats.dump(path)
+    except OSError as e:
+        print(f"Query stats dump error for {path}: {e}")
+
+
+@lru_cache(maxsize=256)
+def row_class(columns: tuple[str, ...]) -> type:
+    """
+    Compact row type for a column list (one per distinct SELECT): a tuple
+    subclass with __slots__ = () and named fields, so rows carry no per-row
+    dict. row.name, row["name"] and row[index] all work, so it can stand in
+    for a dict in read-only code. Columns must be identifiers (alias expressions).
+    """
+    for column in columns:
+        if not column.isidentifier() or column.startswith("_"):
+            raise ValueError(f"Column {column!r} needs an alias to be used as a row attribute")
+
+    base = namedtuple("Row", columns)
+
+    def __getitem__(self, key):
+        return getattr(self, key) if isinstance(key, str) else tuple.__getitem__(self, key)
+
+    return type("Row", (base,), {
+        "__slots__": (),
+        "__getitem__": __getitem__,
+        "keys": lambda self: columns,
+    })
+
+
+def _shape_rows(cursor: aiosqlite.Cursor, rows: list[tuple], row_format: str) -> list:
+    """Turn raw tuples into the requested row_format: "dict" (default), "row" (row_class) or "tuple"."""
+    if row_format == "tuple":
+        return rows
+    columns = tuple(column[0] for column in cursor.description)
+    if row_format == "dict":
+        return [dict(zip(columns, row)) for row in rows]
+    if row_format == "row":
+        cls = row_class(columns)
+        return [tuple.__new__(cls, row) for row in rows]
+    raise ValueError(f"Unknown row_format: {row_format}")
+
+
+async def execute_query(query: str, params: tuple = (), shard: int = 0, row_format: str = "dict") -> list:
     """Execute a query and return results."""
-    async with get_db() as db:
-        cursor = await db.execute(query, params)
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            _record_query(query, params, start, shard)
+            return _shape_rows(cursor, rows, row_format)
 
 
-async def execute_insert(query: str, params: tuple = ()):
+async def fetch_one(query: str, params: tuple = (), shard: int = 0, row_format: str = "dict") -> Optional[Any]:
+    """Execute a query and return only its first row (None if there is none); later rows are never read."""
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            cursor = await db.execute(query, params)
+            row = await cursor.fetchone()
+            await cursor.close()
+            _record_query(query, params, start, shard)
+            if row is None:
+                return None
+            return _shape_rows(cursor, [row], row_format)[0]
+
+
+async def fetch_val(query: str, params: tuple = (), shard: int = 0, default: Any = None) -> Any:
+    """First column of the first row, or default when there are no rows."""
+    row = await fetch_one(query, params, shard, row_format="tuple")
+    return row[0] if row is not None else default
+
+
+async def exists(query: str, params: tuple = (), shard: int = 0) -> bool:
+    """Whether the query returns any row (typically `SELECT 1 FROM ... WHERE ...`)."""
+    return await fetch_one(query, params, shard, row_format="tuple") is not None
+
+
+async def iterate_query(
+    query: str,
+    params: tuple = (),
+    shard: int = 0,
+    chunk_size: int = 500,
+    row_format: str = "dict",
+) -> AsyncIterator[Any]:
+    """
+    Stream rows in fetchmany chunks instead of loading the whole result.
+
+    The connection (and its read snapshot) stays open until the iterator is
+    exhausted or closed, so consume it promptly and wrap early exits in
+    contextlib.aclosing(). In WAL mode the open snapshot does not block
+    writers, but it does hold back checkpoints.
+    """
+    async with get_db(shard) as db:
+        start = time.perf_counter()
+        with timed("db", db_round_trips=1):
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchmany(chunk_size)
+        try:
+            while rows:
+                for row in _shape_rows(cursor, rows, row_format):
+                    yield row
+                with timed("db", db_round_trips=1):
+                    rows = await cursor.fetchmany(chunk_size)
+        finally:
+            await cursor.close()
+        _record_query(query, params, start, shard)
+
+
+async def execute_insert(query: str, params: tuple = (), shard: int = 0):
     """Execute an insert and return the last row id."""
-    async with get_db() as db:
-        cursor = await db.execute(query, params)
-        await db.commit()
-        return cursor.lastrowid
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            cursor = await db.execute(query, params)
+            await db.commit()
+            _record_query(query, params, start, shard)
+            return cursor.lastrowid
 
 
-async def execute_update(query: str, params: tuple = ()):
+async def execute_update(query: str, params: tuple = (), shard: int = 0):
     """Execute an update and return rows affected."""
-    async with get_db() as db:
-        cursor = await db.execute(query, params)
-        await db.commit()
-        return cursor.rowcount
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            cursor = await db.execute(query, params)
+            await db.commit()
+            _record_query(query, params, start, shard)
+            return cursor.rowcount
+
+
+async def execute_returning(query: str, params: tuple = (), shard: int = 0) -> list[dict]:
+    """Execute a write with a RETURNING clause, commit, and return the returned rows."""
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            await db.commit()
+            _record_query(query, params, start, shard)
+            return _shape_rows(cursor, rows, "dict")
+
+
+async def execute_many(query: str, rows: list[tuple], shard: int = 0) -> int:
+    """Run one statement for many parameter tuples in a single transaction; returns rows affected."""
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            start = time.perf_counter()
+            try:
+                cursor = await db.executemany(query, rows)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            _record_query(query, rows[0] if rows else (), start, shard)
+            return cursor.rowcount
+
+
+async def execute_transaction(statements: list[tuple[str, tuple]], shard: int = 0) -> list[int]:
+    """Execute several statements in one transaction and return rows affected by each."""
+    with timed("db", db_round_trips=1):
+        async with get_db(shard) as db:
+            counts = []
+            try:
+                for query, params in statements:
+                    start = time.perf_counter()
+                    cursor = await db.execute(query, params)
+                    counts.append(cursor.rowcount)
+                    _record_query(query, params, start, shard)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            return counts
+
+
+async def fan_out_query(query: str, params: tuple = (), row_format: str = "dict") -> list[list]:
+    """Run a read on every shard concurrently. Returns the rows per shard, in shard order."""
+    return list(await asyncio.gather(*(
+        execute_query(query, params, shard=shard, row_format=row_format) for shard in range(len(SHARD_PATHS))
+    )))
@@ -0,0 +1,175 @@
+"""
+In-memory page storage for tests and benchmarks.
+
+State lives in the process, so every API worker (and RQ worker) sees its own
+pages. Never use it in production.
+"""
+import time
+from typing import AsyncIterator, Optional
+
+from .repository import PageRepository, SlugTakenError, UPDATABLE_FIELDS, TRANSFER_FIELDS, TRANSFER_DEFAULTS, CONFLICT_POLICIES
+
+
+def _timestamp() -> str:
+    """UTC timestamp in the format SQLite's CURRENT_TIMESTAMP produces."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class InMemoryPageRepository(PageRepository):
+    """PageRepository on dicts. No method awaits, so each one runs atomically on the event loop."""
+
+    def __init__(self):
+        self.pages: dict[int, dict] = {}
+        self.active: dict[str, int] = {}  # slug_lower -> page id
+        self.creation_logs: list[dict] = []
+        self.daily: dict[tuple[int, str], dict] = {}  # (page id, day) -> rolled-up view stats
+        self._next_id = 1
+
+    def _active_page(self, slug: str, include_expired: bool = False) -> Optional[dict]:
+        page_id = self.active.get(slug.lower())
+        page = self.pages[page_id] if page_id is not None else None
+        if page and not include_expired and page["expires_at"] and page["expires_at"] <= _timestamp():
+            return None
+        return page
+
+    def _deactivate(self, page: dict):
+        page["is_active"] = 0
+        page["deleted_at"] = page["updated_at"] = _timestamp()
+        del self.active[page["slug_lower"]]
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        page = self._active_page(slug)
+        return dict(page) if page else None
+
+    async def get_many(self, slugs: list[str]) -> dict[str, dict]:
+        pages = (self._active_page(slug) for slug in slugs)
+        return {page["slug_lower"]: dict(page) for page in pages if page}
+
+    async def slug_exists(self, slug: str) -> bool:
+        return self._active_page(slug) is not None
+
+    async def create(self, page: dict, edit_token: str, ip_hash: str) -> dict:
+        slug = page["slug"]
+        holder = self._active_page(slug, include_expired=True)
+        if holder and self._active_page(slug) is None:
+            self._deactivate(holder)
+        elif holder:
+            raise SlugTakenError(slug)
+
+        page_id = self._next_id
+        self._next_id += 1
+        stored = {
+            "id": page_id,
+            "slug": slug,
+            "slug_lower": slug.lower(),
+            **{name: page.get(name) for name in UPDATABLE_FIELDS},
+            "edit_token": edit_token,
+            "created_at": _timestamp(),
+            "view_count": 0,
+            "is_active": 1,
+            "deleted_at": None,
+            "updated_at": None,
+        }
+        stored["updated_at"] = stored["created_at"]
+        self.pages[page_id] = stored
+        self.active[stored["slug_lower"]] = page_id
+        self.creation_logs.append({"ip_hash": ip_hash, "page_id": page_id, "created_at": stored["created_at"]})
+        return dict(stored)
+
+    async def update(self, slug: str, edit_token: str, fields: dict) -> Optional[dict]:
+        page = self._active_page(slug)
+        if not page or page["edit_token"] != edit_token:
+            return None
+        page.update({name: value for name, value in fields.items() if name in UPDATABLE_FIELDS})
+        page["updated_at"] = _timestamp()
+        return dict(page)
+
+    async def delete(self, slug: str, edit_token: str) -> bool:
+        page = self._active_page(slug)
+        if not page or page["edit_token"] != edit_token:
+            return False
+        self._deactivate(page)
+        return True
+
+    async def increment_views(self, slug: str, page_id: int, by: int = 1):
+        page = self.pages.get(page_id)
+        if page:
+            page["view_count"] += by
+
+    async def most_viewed(self, limit: int) -> list[dict]:
+        pages = sorted((page for page in map(self._active_page, list(self.active)) if page),
+                       key=lambda page: page["view_count"], reverse=True)
+        return [dict(page) for page in pages[:limit]]
+
+    async def expire_pages(self, limit: int) -> list[str]:
+        now = _timestamp()
+        expired = [
+            self.pages[page_id] for page_id in self.active.values()
+            if self.pages[page_id]["expires_at"] and self.pages[page_id]["expires_at"] <= now
+        ][:limit]
+        for page in expired:
+            self._deactivate(page)
+        return [page["slug"] for page in expired]
+
+    async def save_daily_stats(self, rows: list[dict]):
+        for row in rows:
+            key = (row["page_id"], row["day"])
+            stored = self.daily.get(key)
+            if stored and stored["views"] > row["views"]:
+                stored["unique_viewers"] = max(stored["unique_viewers"], row["unique_viewers"])
+                continue
+            self.daily[key] = {
+                "day": row["day"],
+                "views": row["views"],
+                "unique_viewers": max(row["unique_viewers"], stored["unique_viewers"] if stored else 0),
+                "hourly": list(row["hourly"]),
+            }
+
+    async def daily_stats(self, slug: str, page_id: int, since: str) -> list[dict]:
+        rows = [dict(row) for (row_page_id, day), row in self.daily.items() if row_page_id == page_id and day >= since]
+        return sorted(rows, key=lambda row: row["day"], reverse=True)
+
+    async def iter_pages(self, active_only: bool = False, since: Optional[str] = None,
+                         batch_size: int = 1000) -> AsyncIterator[dict]:
+        for page_id in sorted(self.pages):
+            page = self.pages.get(page_id)
+            if not page or (active_only and not page["is_active"]):
+                continue
+            if since and (page["updated_at"] or "") < since:
+                continue
+            yield dict(page)
+
+    async def import_pages(self, pages: list[dict], on_conflict: str = "skip") -> dict:
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+
+        written = 0
+        for incoming in pages:
+            now = _timestamp()
+            incoming = {
+                **incoming,
+                **{name: value for name, value in TRANSFER_DEFAULTS.items() if incoming.get(name) is None},
+                "created_at": incoming.get("created_at") or now,
+                "updated_at": incoming.get("updated_at") or now,
+            }
+            slug_lower = incoming["slug"].lower()
+            existing = self._active_page(slug_lower, include_expired=True) if incoming["is_active"] else None
+            if existing:
+                if on_conflict == "fail":
+                    raise SlugTakenError(incoming["slug"])
+                if on_conflict == "skip":
+                    continue
+                existing.update({name: incoming.get(name) for name in TRANSFER_FIELDS if name != "is_active"})
+                existing["slug_lower"] = slug_lower
+            else:
+                page_id = self._next_id
+                self._next_id += 1
+                stored = {"id": page_id, "slug_lower": slug_lower, **{name: incoming.get(name) for name in TRANSFER_FIELDS}}
+                self.pages[page_id] = stored
+                if stored["is_active"]:
+                    self.active[slug_lower] = page_id
+            written += 1
+        return {"written": written, "skipped": len(pages) - written}
+
+    async def stats(self) -> list[dict]:
+        return [{"shard": 0, "path": None, "pages": len(self.pages), "active": len(self.active), "bytes": 0}]
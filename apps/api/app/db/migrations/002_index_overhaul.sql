@@ -0,0 +1,46 @@
+-- Index overhaul
+--
+-- The column-level UNIQUE constraints on slug and slug_lower each carried an
+-- automatic index, and idx_pages_slug_lower duplicated the second one, so
+-- every insert maintained three slug indexes. idx_pages_edit_token was
+-- maintained but never queried: tokens are compared after the slug lookup.
+-- UNIQUE constraints can only be dropped by rebuilding the table.
+
+CREATE TABLE pages_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    slug TEXT NOT NULL,
+    slug_lower TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    sender_name TEXT,
+    recipient_name TEXT,
+    template_id TEXT NOT NULL DEFAULT 'classic',
+    edit_token TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    view_count INTEGER DEFAULT 0,
+    is_active BOOLEAN DEFAULT 1
+);
+
+INSERT INTO pages_new (
+    id, slug, slug_lower, title, message, sender_name, recipient_name,
+    template_id, edit_token, created_at, view_count, is_active
+)
+SELECT
+    id, slug, slug_lower, title, message, sender_name, recipient_name,
+    template_id, edit_token, created_at, view_count, is_active
+FROM pages;
+
+-- Keep the AUTOINCREMENT high-water mark so ids are never reused
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'pages')
+WHERE name = 'pages_new';
+
+-- Drops idx_pages_slug_lower, idx_pages_edit_token and both autoindexes with it
+DROP TABLE pages;
+ALTER TABLE pages_new RENAME TO pages;
+
+-- Every lookup filters on is_active = 1, so soft-deleted rows stay out of the
+-- index. The index alone answers existence checks (slug checks, suggestions)
+-- without touching the table, and uniqueness now only applies to active
+-- pages, so a deleted page's slug can be taken again.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pages_active_slug ON pages(slug_lower) WHERE is_active = 1;
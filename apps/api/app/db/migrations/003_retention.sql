@@ -0,0 +1,33 @@
+-- Retention and compaction
+--
+-- Soft-deleted pages record when they were deleted so the maintenance job can
+-- move them to pages_archive after a grace period, keeping the hot table and
+-- its indexes limited to pages that can still be served.
+
+ALTER TABLE pages ADD COLUMN deleted_at TIMESTAMP;
+
+-- Pages deleted before this migration start their grace period now
+UPDATE pages SET deleted_at = CURRENT_TIMESTAMP WHERE is_active = 0;
+
+-- Only soft-deleted rows are indexed
+CREATE INDEX IF NOT EXISTS idx_pages_deleted_at ON pages(deleted_at) WHERE is_active = 0;
+
+CREATE TABLE IF NOT EXISTS pages_archive (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL,
+    slug_lower TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    sender_name TEXT,
+    recipient_name TEXT,
+    template_id TEXT NOT NULL,
+    edit_token TEXT NOT NULL,
+    created_at TIMESTAMP,
+    view_count INTEGER DEFAULT 0,
+    deleted_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Deleting a page sets creation_logs.page_id to NULL; without an index every
+-- archived page would scan the whole log table
+CREATE INDEX IF NOT EXISTS idx_creation_logs_page_id ON creation_logs(page_id);
@@ -0,0 +1,9 @@
+-- Change tracking for incremental exports
+--
+-- updated_at is set by every create, edit and delete (view counts do not
+-- count as changes), so `export --since` can pick up what changed.
+-- ALTER TABLE cannot add a CURRENT_TIMESTAMP default; writers set it.
+
+ALTER TABLE pages ADD COLUMN updated_at TIMESTAMP;
+
+UPDATE pages SET updated_at = COALESCE(deleted_at, created_at);
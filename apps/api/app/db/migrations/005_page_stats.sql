@@ -0,0 +1,14 @@
+-- Daily view analytics
+--
+-- One row per page and UTC day, rolled up from the Redis counters and
+-- HyperLogLogs by the page stats job. hourly is a JSON array of 24 view counts.
+-- Rows live in the same shard as their page.
+
+CREATE TABLE IF NOT EXISTS page_stats_daily (
+    page_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    unique_viewers INTEGER NOT NULL DEFAULT 0,
+    hourly TEXT NOT NULL,
+    PRIMARY KEY (page_id, day)
+) WITHOUT ROWID;
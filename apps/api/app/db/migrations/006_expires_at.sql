@@ -0,0 +1,11 @@
+-- Page expiration
+--
+-- expires_at ("YYYY-MM-DD HH:MM:SS" UTC, NULL = never) is set from the request
+-- or the template's default. Reads treat pages past it as gone; the expiry
+-- sweeper deactivates them. Only active pages that expire are indexed, so the
+-- sweeper finds due pages without scanning and the index stays small.
+
+ALTER TABLE pages ADD COLUMN expires_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_pages_expires_at ON pages(expires_at)
+    WHERE is_active = 1 AND expires_at IS NOT NULL;
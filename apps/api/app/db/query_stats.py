@@ -0,0 +1,117 @@
+"""
+Per-statement timing, fingerprinting and slow-query capture for the database layer.
+"""
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Optional
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(query: str) -> str:
+    """
+    Normalize a SQL statement so that statements differing only in literals,
+    IN-list length or whitespace share one fingerprint.
+    """
+    normalized = _COMMENT_RE.sub(" ", query)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(?+)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def find_full_scans(plan: list[str]) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN lines that scan a table without an index."""
+    return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
+
+
+class FingerprintStats:
+    """Running stats for one fingerprint, with a bounded sample window for percentiles."""
+
+    __slots__ = ("count", "total", "max", "samples", "plan", "full_scan", "slow_count")
+
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque[float] = deque(maxlen=sample_size)
+        self.plan: Optional[list[str]] = None
+        self.full_scan = False
+        self.slow_count = 0
+
+    def p95(self) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class QueryStats:
+    """Collects timings for every statement and remembers query plans per fingerprint."""
+
+    def __init__(self, slow_query_ms: float, sample_size: int = 500):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.sample_size = sample_size
+        self.started_at = time.time()
+        self._stats: dict[str, FingerprintStats] = {}
+
+    def record(self, query: str, elapsed: float) -> tuple[str, FingerprintStats, bool]:
+        """
+        Record one execution.
+        Returns (fingerprint, stats, needs_plan) - needs_plan is True when the
+        statement was slow or has not been explained yet.
+        """
+        key = fingerprint(query)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = FingerprintStats(self.sample_size)
+
+        stats.count += 1
+        stats.total += elapsed
+        stats.samples.append(elapsed)
+        if elapsed > stats.max:
+            stats.max = elapsed
+
+        is_slow = elapsed >= self.slow_query_seconds
+        if is_slow:
+            stats.slow_count += 1
+        return key, stats, is_slow or stats.plan is None
+
+    def reset(self):
+        self.started_at = time.time()
+        self._stats.clear()
+
+    def snapshot(self) -> dict:
+        """Return all fingerprints ordered by total time spent, most expensive first."""
+        queries = [
+            {
+                "fingerprint": key,
+                "count": stats.count,
+                "total_ms": round(stats.total * 1000, 3),
+                "mean_ms": round(stats.total / stats.count * 1000, 3),
+                "p95_ms": round(stats.p95() * 1000, 3),
+                "max_ms": round(stats.max * 1000, 3),
+                "slow_count": stats.slow_count,
+                "full_scan": stats.full_scan,
+                "plan": stats.plan,
+            }
+            for key, stats in self._stats.items()
+        ]
+        queries.sort(key=lambda q: q["total_ms"], reverse=True)
+        return {
+            "since": self.started_at,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "queries": queries,
+        }
+
+    def dump(self, path: str):
+        """Write the current snapshot to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
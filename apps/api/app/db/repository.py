@@ -0,0 +1,138 @@
+"""
+Page storage interface.
+
+Routes and tasks talk to a PageRepository instead of building SQL, so the
+storage engine can be swapped (STORAGE_BACKEND) or benchmarked on its own.
+Pages are plain dicts with the columns of the pages table.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from ..config import STORAGE_BACKEND
+
+# Columns a caller may change through update()
+UPDATABLE_FIELDS = ("title", "message", "sender_name", "recipient_name", "template_id", "expires_at")
+
+# Columns carried by export/import (ids are reassigned on import)
+TRANSFER_FIELDS = (
+    "slug", *UPDATABLE_FIELDS, "edit_token", "created_at", "view_count",
+    "is_active", "deleted_at", "updated_at",
+)
+
+# Values an imported page gets when its line leaves a column out
+TRANSFER_DEFAULTS = {"view_count": 0, "is_active": 1}
+
+# What import_pages does when an incoming active page's slug is already in use
+CONFLICT_POLICIES = ("skip", "overwrite", "fail")
+
+
+def db_timestamp(moment: datetime) -> str:
+    """A datetime as timestamp columns store it: "YYYY-MM-DD HH:MM:SS" in UTC (naive values are taken as UTC)."""
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SlugTakenError(Exception):
+    """Raised by create() when an active page already uses the slug."""
+
+
+class PageRepository(ABC):
+    """
+    Storage operations on pages. Slugs are matched case-insensitively. Pages
+    past their expires_at count as gone for reads and writes, even before the
+    expiry sweeper deactivates them.
+    """
+
+    async def init(self):
+        """Prepare storage (schema, files) on startup."""
+
+    @abstractmethod
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        """The active page for a slug, or None."""
+
+    @abstractmethod
+    async def get_many(self, slugs: list[str]) -> dict[str, dict]:
+        """Active pages for several slugs, keyed by lowercased slug (missing slugs are left out)."""
+
+    @abstractmethod
+    async def slug_exists(self, slug: str) -> bool:
+        """Whether an active page uses the slug."""
+
+    @abstractmethod
+    async def create(self, page: dict, edit_token: str, ip_hash: str) -> dict:
+        """
+        Store a new page and its creation log entry, and return the stored page.
+        page holds slug plus the UPDATABLE_FIELDS. An expired page still holding
+        the slug is deactivated first. Raises SlugTakenError.
+        """
+
+    @abstractmethod
+    async def update(self, slug: str, edit_token: str, fields: dict) -> Optional[dict]:
+        """Apply fields if the active page's edit token matches; the updated page, or None if nothing matched."""
+
+    @abstractmethod
+    async def delete(self, slug: str, edit_token: str) -> bool:
+        """Soft-delete the active page if its edit token matches; False if nothing matched."""
+
+    @abstractmethod
+    async def increment_views(self, slug: str, page_id: int, by: int = 1):
+        """Add to a page's view count."""
+
+    @abstractmethod
+    async def most_viewed(self, limit: int) -> list[dict]:
+        """The active pages with the highest view_count, most viewed first."""
+
+    @abstractmethod
+    async def expire_pages(self, limit: int) -> list[str]:
+        """Deactivate up to limit expired pages per shard (like a delete); returns their slugs."""
+
+    @abstractmethod
+    async def save_daily_stats(self, rows: list[dict]):
+        """
+        Upsert rolled-up view stats: rows of slug, page_id, day ("YYYY-MM-DD"),
+        views, unique_viewers and hourly (24 counts). Counts never go down, so a
+        rollup after Redis lost a day's counters keeps the earlier numbers.
+        """
+
+    @abstractmethod
+    async def daily_stats(self, slug: str, page_id: int, since: str) -> list[dict]:
+        """A page's rolled-up stats for days on or after since ("YYYY-MM-DD"), newest first."""
+
+    @abstractmethod
+    def iter_pages(self, active_only: bool = False, since: Optional[str] = None,
+                   batch_size: int = 1000) -> AsyncIterator[dict]:
+        """
+        Every page (or only active ones, or only those changed at or after
+        since, a "YYYY-MM-DD HH:MM:SS" UTC timestamp), read in id-keyset
+        batches so memory stays flat. Ordered by id within each shard.
+        """
+
+    @abstractmethod
+    async def import_pages(self, pages: list[dict], on_conflict: str = "skip") -> dict:
+        """
+        Insert a chunk of exported pages (TRANSFER_FIELDS) with new ids, in
+        bounded transactions. on_conflict is one of CONFLICT_POLICIES: skip
+        keeps the existing page, overwrite replaces its content, fail raises
+        SlugTakenError. Returns {"written": n, "skipped": n}.
+        """
+
+    @abstractmethod
+    async def stats(self) -> list[dict]:
+        """Page counts per storage partition (one entry per shard for SQLite)."""
+
+
+def create_page_repository(backend: str = STORAGE_BACKEND) -> PageRepository:
+    """Build the repository for a STORAGE_BACKEND value."""
+    if backend == "sqlite":
+        from .sqlite_repository import SQLitePageRepository
+        return SQLitePageRepository()
+    if backend == "memory":
+        from .memory_repository import InMemoryPageRepository
+        return InMemoryPageRepository()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+# Global repository instance
+page_repository = create_page_repository()
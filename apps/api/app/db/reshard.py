@@ -0,0 +1,168 @@
+"""
+Offline resharding: copy every page into a new set of shard files.
+
+Stop the API and queue workers first, then:
+
+    python -m app.db.reshard --to 4            # from the current DB_SHARDS
+    python -m app.db.reshard --from 4 --to 1   # back to a single file
+
+Pages and archived pages move to the shard of their slug; creation logs
+follow their page. Ids are kept, and every new shard's sequence starts above
+the highest id copied, so ids handed out afterwards stay unique. The old files
+are kept as *.pre-reshard until you delete them. Start the API with the new
+DB_SHARDS value afterwards.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from ..config import DB_SHARDS
+from .database import shard_paths, shard_for, migrate
+
+
+def columns(db: sqlite3.Connection, table: str) -> list[str]:
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+
+
+def copy_table(sources: list[sqlite3.Connection], targets: list[sqlite3.Connection], table: str,
+               route, batch_size: int, keep_ids: bool = True) -> int:
+    """
+    Stream a table out of every source in id order and insert each row into its
+    target shard. Without keep_ids the target assigns new ids (for tables whose
+    ids are per shard and referenced nowhere).
+    """
+    names = columns(sources[0], table)
+    copied_names = names if keep_ids else names[1:]
+    placeholders = ", ".join("?" * len(copied_names))
+    insert = f"INSERT INTO {table} ({', '.join(copied_names)}) VALUES ({placeholders})"
+    copied = 0
+    for source in sources:
+        last_id = 0
+        while True:
+            rows = source.execute(
+                f"SELECT {', '.join(names)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            by_shard: dict[int, list[tuple]] = {}
+            for row in rows:
+                by_shard.setdefault(route(dict(zip(names, row))), []).append(row if keep_ids else row[1:])
+            for shard, shard_rows in by_shard.items():
+                targets[shard].executemany(insert, shard_rows)
+            for target in targets:
+                target.commit()
+            last_id = rows[-1][0]
+            copied += len(rows)
+    return copied
+
+
+def reshard(from_shards: int, to_shards: int, batch_size: int = 1000) -> dict:
+    source_paths = shard_paths(from_shards)
+    missing = [path for path in source_paths if not os.path.exists(path)]
+    if missing:
+        raise SystemExit(f"Missing source files: {', '.join(missing)}")
+
+    kept = [f"{path}.pre-reshard" for path in source_paths if os.path.exists(f"{path}.pre-reshard")]
+    if kept:
+        raise SystemExit(f"Remove the files kept from an earlier reshard first: {', '.join(kept)}")
+
+    final_paths = shard_paths(to_shards)
+    # Build under temporary names so source and target sets may overlap
+    build_paths = [f"{path}.reshard" for path in final_paths]
+    for path in build_paths:
+        for leftover in (path, f"{path}-wal", f"{path}-shm"):
+            Path(leftover).unlink(missing_ok=True)
+
+    async def migrate_all():
+        await asyncio.gather(*(migrate(path) for path in build_paths))
+    asyncio.run(migrate_all())
+
+    sources = [sqlite3.connect(path) for path in source_paths]
+    targets = [sqlite3.connect(path) for path in build_paths]
+    page_shards: dict[int, int] = {}
+
+    def route_page(row: dict) -> int:
+        shard = shard_for(row["slug_lower"], to_shards)
+        page_shards[row["id"]] = shard
+        return shard
+
+    def route_log(row: dict) -> int:
+        return page_shards.get(row["page_id"], 0)
+
+    try:
+        # Logs go last so their page's new shard is known
+        counts = {
+            "pages": copy_table(sources, targets, "pages", route_page, batch_size),
+            "pages_archive": copy_table(
+                sources, targets, "pages_archive",
+                lambda row: shard_for(row["slug_lower"], to_shards), batch_size,
+            ),
+            "creation_logs": copy_table(sources, targets, "creation_logs", route_log, batch_size, keep_ids=False),
+        }
+
+        # New ids must not collide with any copied id on any shard
+        max_id = max(
+            source.execute(
+                "SELECT MAX(seq) FROM sqlite_sequence WHERE name = 'pages'"
+            ).fetchone()[0] or 0
+            for source in sources
+        )
+        max_id = max([max_id] + [
+            source.execute("SELECT COALESCE(MAX(id), 0) FROM pages_archive").fetchone()[0]
+            for source in sources
+        ])
+        for target in targets:
+            target.execute("DELETE FROM sqlite_sequence WHERE name = 'pages'")
+            target.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('pages', ?)", (max_id,))
+            target.commit()
+        # Fold each WAL into its main file so only the main files need moving
+        for db in sources + targets:
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except BaseException:
+        for db in sources + targets:
+            db.close()
+        for path in build_paths:
+            for leftover in (path, f"{path}-wal", f"{path}-shm", f"{path}.migrate.lock"):
+                Path(leftover).unlink(missing_ok=True)
+        raise
+    for db in sources + targets:
+        db.close()
+
+    for path in source_paths:
+        os.replace(path, f"{path}.pre-reshard")
+    for build, final in zip(build_paths, final_paths):
+        os.replace(build, final)
+    for path in source_paths + build_paths:
+        for leftover in (f"{path}-wal", f"{path}-shm", f"{path}.migrate.lock"):
+            Path(leftover).unlink(missing_ok=True)
+
+    return {"from": from_shards, "to": to_shards, "files": final_paths, "copied": counts, "next_id_floor": max_id}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Redistribute pages across a new number of SQLite shards")
+    parser.add_argument("--from", dest="from_shards", type=int, default=DB_SHARDS,
+                        help="Current shard count (default: DB_SHARDS)")
+    parser.add_argument("--to", dest="to_shards", type=int, required=True, help="New shard count")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.to_shards < 1 or args.from_shards < 1:
+        parser.error("shard counts must be at least 1")
+    if args.to_shards == args.from_shards:
+        parser.error("--from and --to are the same")
+
+    result = reshard(args.from_shards, args.to_shards, args.batch_size)
+    for table, count in result["copied"].items():
+        print(f"  {table:<15} {count} rows")
+    print(f"Wrote {', '.join(result['files'])} (old files kept as *.pre-reshard)")
+    print(f"Set DB_SHARDS={args.to_shards} before starting the API")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
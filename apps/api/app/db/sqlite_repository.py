@@ -0,0 +1,282 @@
+"""
+SQLite page storage (one file, or DB_SHARDS files routed by slug).
+"""
+import asyncio
+import json
+import os
+import sqlite3
+from typing import AsyncIterator, Optional
+
+from .database import (
+    SHARD_PATHS,
+    init_db,
+    shard_for,
+    sharded_id_sql,
+    execute_query,
+    fetch_one,
+    exists,
+    execute_update,
+    execute_many,
+    execute_returning,
+    execute_transaction,
+    fan_out_query,
+)
+from .repository import PageRepository, SlugTakenError, UPDATABLE_FIELDS, TRANSFER_FIELDS, TRANSFER_DEFAULTS, CONFLICT_POLICIES
+
+# Upsert clause per import conflict policy; the target is the partial unique index on active slugs
+IMPORT_CONFLICT_SQL = {
+    "skip": "ON CONFLICT (slug_lower) WHERE is_active = 1 DO NOTHING",
+    "overwrite": (
+        "ON CONFLICT (slug_lower) WHERE is_active = 1 DO UPDATE SET "
+        + ", ".join(f"{name} = excluded.{name}" for name in TRANSFER_FIELDS if name != "is_active")
+    ),
+    "fail": "",
+}
+
+
+# Pages that can be served: active and not past expires_at (the sweeper deactivates expired ones later)
+LIVE = "is_active = 1 AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)"
+
+
+class SQLitePageRepository(PageRepository):
+    """PageRepository on the SQLite helpers in db.database."""
+
+    async def init(self):
+        await init_db()
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        return await fetch_one(
+            f"SELECT * FROM pages WHERE slug_lower = ? AND {LIVE}",
+            (slug.lower(),),
+            shard=shard_for(slug)
+        )
+
+    async def get_many(self, slugs: list[str]) -> dict[str, dict]:
+        by_shard: dict[int, list[str]] = {}
+        for slug in {slug.lower() for slug in slugs}:
+            by_shard.setdefault(shard_for(slug), []).append(slug)
+
+        async def fetch(shard: int, shard_slugs: list[str]) -> list[dict]:
+            placeholders = ", ".join("?" * len(shard_slugs))
+            return await execute_query(
+                f"SELECT * FROM pages WHERE slug_lower IN ({placeholders}) AND {LIVE}",
+                tuple(shard_slugs),
+                shard=shard
+            )
+
+        results = await asyncio.gather(*(fetch(shard, shard_slugs) for shard, shard_slugs in by_shard.items()))
+        return {page["slug_lower"]: page for pages in results for page in pages}
+
+    async def slug_exists(self, slug: str) -> bool:
+        return await exists(
+            f"SELECT 1 FROM pages WHERE slug_lower = ? AND {LIVE}",
+            (slug.lower(),),
+            shard=shard_for(slug)
+        )
+
+    async def create(self, page: dict, edit_token: str, ip_hash: str) -> dict:
+        slug = page["slug"]
+        # The page and its creation log live on the slug's shard
+        shard = shard_for(slug)
+        try:
+            await execute_transaction([
+                (
+                    # An expired page not swept yet would still hold the unique slug index
+                    """
+                    UPDATE pages SET is_active = 0, deleted_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                    WHERE slug_lower = ? AND is_active = 1 AND expires_at <= CURRENT_TIMESTAMP
+                    """,
+                    (slug.lower(),),
+                ),
+                (
+                    f"""
+                    INSERT INTO pages (id, slug, slug_lower, title, message, sender_name, recipient_name, template_id, edit_token, expires_at, updated_at)
+                    VALUES ({sharded_id_sql('pages', shard)}, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """,
+                    (
+                        slug,
+                        slug.lower(),
+                        page["title"],
+                        page["message"],
+                        page.get("sender_name"),
+                        page.get("recipient_name"),
+                        page["template_id"],
+                        edit_token,
+                        page.get("expires_at"),
+                    ),
+                ),
+                (
+                    "INSERT INTO creation_logs (ip_hash, page_id) VALUES (?, last_insert_rowid())",
+                    (ip_hash,),
+                ),
+            ], shard=shard)
+        except sqlite3.IntegrityError as e:
+            if "slug_lower" in str(e):
+                raise SlugTakenError(slug) from e
+            raise
+
+        return await self.get_by_slug(slug)
+
+    async def update(self, slug: str, edit_token: str, fields: dict) -> Optional[dict]:
+        updates = {name: value for name, value in fields.items() if name in UPDATABLE_FIELDS}
+        if not updates:
+            page = await self.get_by_slug(slug)
+            return page if page and page["edit_token"] == edit_token else None
+
+        assignments = ", ".join(f"{name} = ?" for name in updates)
+        pages = await execute_returning(
+            f"UPDATE pages SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE slug_lower = ? AND {LIVE} AND edit_token = ? RETURNING *",
+            (*updates.values(), slug.lower(), edit_token),
+            shard=shard_for(slug)
+        )
+        return pages[0] if pages else None
+
+    async def delete(self, slug: str, edit_token: str) -> bool:
+        deleted = await execute_update(
+            f"""
+            UPDATE pages SET is_active = 0, deleted_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE slug_lower = ? AND {LIVE} AND edit_token = ?
+            """,
+            (slug.lower(), edit_token),
+            shard=shard_for(slug)
+        )
+        return deleted > 0
+
+    async def increment_views(self, slug: str, page_id: int, by: int = 1):
+        await execute_update(
+            "UPDATE pages SET view_count = view_count + ? WHERE id = ?",
+            (by, page_id),
+            shard=shard_for(slug)
+        )
+
+    async def most_viewed(self, limit: int) -> list[dict]:
+        # No index on view_count (it changes on every view), so this scans; used at startup only
+        per_shard = await fan_out_query(
+            f"SELECT * FROM pages WHERE {LIVE} ORDER BY view_count DESC LIMIT ?",
+            (limit,)
+        )
+        pages = [page for pages in per_shard for page in pages]
+        return sorted(pages, key=lambda page: page["view_count"], reverse=True)[:limit]
+
+    async def expire_pages(self, limit: int) -> list[str]:
+        # The subquery walks the partial index on expires_at (active pages that expire only)
+        per_shard = await asyncio.gather(*(
+            execute_returning(
+                """
+                UPDATE pages SET is_active = 0, deleted_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM pages
+                    WHERE is_active = 1 AND expires_at IS NOT NULL AND expires_at <= CURRENT_TIMESTAMP
+                    LIMIT ?
+                )
+                RETURNING slug
+                """,
+                (limit,),
+                shard=shard
+            )
+            for shard in range(len(SHARD_PATHS))
+        ))
+        return [row["slug"] for rows in per_shard for row in rows]
+
+    async def save_daily_stats(self, rows: list[dict]):
+        by_shard: dict[int, list[tuple]] = {}
+        for row in rows:
+            by_shard.setdefault(shard_for(row["slug"]), []).append(
+                (row["page_id"], row["day"], row["views"], row["unique_viewers"], json.dumps(row["hourly"]))
+            )
+        await asyncio.gather(*(
+            execute_many(
+                "INSERT INTO page_stats_daily (page_id, day, views, unique_viewers, hourly) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (page_id, day) DO UPDATE SET "
+                "views = MAX(views, excluded.views), "
+                "unique_viewers = MAX(unique_viewers, excluded.unique_viewers), "
+                "hourly = CASE WHEN excluded.views >= views THEN excluded.hourly ELSE hourly END",
+                shard_rows,
+                shard=shard
+            )
+            for shard, shard_rows in by_shard.items()
+        ))
+
+    async def daily_stats(self, slug: str, page_id: int, since: str) -> list[dict]:
+        rows = await execute_query(
+            "SELECT day, views, unique_viewers, hourly FROM page_stats_daily "
+            "WHERE page_id = ? AND day >= ? ORDER BY day DESC",
+            (page_id, since),
+            shard=shard_for(slug)
+        )
+        return [{**row, "hourly": json.loads(row["hourly"])} for row in rows]
+
+    async def iter_pages(self, active_only: bool = False, since: Optional[str] = None,
+                         batch_size: int = 1000) -> AsyncIterator[dict]:
+        filters = ""
+        params: tuple = ()
+        if active_only:
+            filters += " AND is_active = 1"
+        if since:
+            filters += " AND updated_at >= ?"
+            params = (since,)
+
+        for shard in range(len(SHARD_PATHS)):
+            last_id = 0
+            while True:
+                # Keyset pagination: each batch is its own short read
+                pages = await execute_query(
+                    f"SELECT * FROM pages WHERE id > ?{filters} ORDER BY id LIMIT ?",
+                    (last_id, *params, batch_size),
+                    shard=shard
+                )
+                for page in pages:
+                    yield page
+                if len(pages) < batch_size:
+                    break
+                last_id = pages[-1]["id"]
+
+    async def import_pages(self, pages: list[dict], on_conflict: str = "skip") -> dict:
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+
+        by_shard: dict[int, list[tuple]] = {}
+        for page in pages:
+            row = tuple(page.get(name) for name in TRANSFER_FIELDS)
+            by_shard.setdefault(shard_for(page["slug"]), []).append((page["slug"].lower(), *row))
+
+        columns = ", ".join(("slug_lower", *TRANSFER_FIELDS))
+        placeholders = ", ".join(["?"] + [
+            f"COALESCE(?, {TRANSFER_DEFAULTS[name]})" if name in TRANSFER_DEFAULTS
+            else "COALESCE(?, CURRENT_TIMESTAMP)" if name in ("created_at", "updated_at")
+            else "?"
+            for name in TRANSFER_FIELDS
+        ])
+
+        async def write(shard: int, rows: list[tuple]) -> int:
+            query = (
+                f"INSERT INTO pages (id, {columns}) VALUES ({sharded_id_sql('pages', shard)}, {placeholders}) "
+                f"{IMPORT_CONFLICT_SQL[on_conflict]}"
+            )
+            try:
+                return await execute_many(query, rows, shard=shard)
+            except sqlite3.IntegrityError as e:
+                if "slug_lower" in str(e):
+                    raise SlugTakenError(str(e)) from e
+                raise
+
+        written = sum(await asyncio.gather(*(write(shard, rows) for shard, rows in by_shard.items())))
+        return {"written": written, "skipped": len(pages) - written}
+
+    async def stats(self) -> list[dict]:
+        counts = await fan_out_query(
+            "SELECT COUNT(*), COALESCE(SUM(is_active), 0) FROM pages",
+            row_format="tuple"
+        )
+        return [
+            {
+                "shard": shard,
+                "path": path,
+                "pages": rows[0][0],
+                "active": rows[0][1],
+                "bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            }
+            for shard, (path, rows) in enumerate(zip(SHARD_PATHS, counts))
+        ]
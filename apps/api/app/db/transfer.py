@@ -0,0 +1,144 @@
+"""
+NDJSON export and import of pages.
+
+    python -m app.db.transfer export --output pages.ndjson [--active-only] [--since 2026-02-01T00:00:00Z]
+    python -m app.db.transfer import pages.ndjson [--on-conflict skip|overwrite|fail] [--chunk-size 1000]
+
+One page per line with the columns in TRANSFER_FIELDS. Export streams pages
+in id-keyset batches; import reads the file in chunks and writes each chunk
+with executemany in one transaction per shard, so a large file never sits in
+memory and the writer lock is released between chunks. Imported pages get new
+ids. Works against whichever STORAGE_BACKEND and DB_SHARDS are configured.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from .repository import PageRepository, SlugTakenError, TRANSFER_FIELDS, CONFLICT_POLICIES, page_repository
+
+# Columns an import line must carry; the rest fall back to defaults
+REQUIRED_FIELDS = ("slug", "title", "message", "template_id", "edit_token")
+
+
+def parse_since(value: Optional[str]) -> Optional[str]:
+    """ISO 8601 timestamp -> "YYYY-MM-DD HH:MM:SS" in UTC, as stored by SQLite. Naive values are taken as UTC."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def export_lines(repository: PageRepository = page_repository, active_only: bool = False,
+                       since: Optional[str] = None, batch_size: int = 1000) -> AsyncIterator[str]:
+    """Yield one NDJSON line per page."""
+    async for page in repository.iter_pages(active_only=active_only, since=since, batch_size=batch_size):
+        yield json.dumps({name: page.get(name) for name in TRANSFER_FIELDS}, ensure_ascii=False) + "\n"
+
+
+async def import_file(stream, repository: PageRepository = page_repository, on_conflict: str = "skip",
+                      chunk_size: int = 1000, progress=None) -> dict:
+    """Import NDJSON from a text stream chunk by chunk; progress(totals) is called after each chunk."""
+    totals = {"lines": 0, "written": 0, "skipped": 0}
+    chunk: list[dict] = []
+
+    async def flush():
+        result = await repository.import_pages(chunk, on_conflict=on_conflict)
+        totals["written"] += result["written"]
+        totals["skipped"] += result["skipped"]
+        totals["lines"] += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(totals)
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            page = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {number}: {e}") from e
+        missing = [name for name in REQUIRED_FIELDS if not isinstance(page, dict) or not page.get(name)]
+        if missing:
+            raise ValueError(f"line {number}: missing {', '.join(missing)}")
+        chunk.append(page)
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+    return totals
+
+
+async def run_export(args) -> int:
+    await page_repository.init()
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count = 0
+    start = time.perf_counter()
+    try:
+        async for line in export_lines(active_only=args.active_only, since=parse_since(args.since),
+                                       batch_size=args.batch_size):
+            output.write(line)
+            count += 1
+            if count % args.batch_size == 0:
+                print(f"  exported {count} pages", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Exported {count} pages in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+async def run_import(args) -> int:
+    await page_repository.init()
+    start = time.perf_counter()
+
+    def progress(totals: dict):
+        rate = totals["lines"] / max(time.perf_counter() - start, 1e-9)
+        print(f"  {totals['lines']} pages read, {totals['written']} written, "
+              f"{totals['skipped']} skipped ({rate:.0f}/s)")
+
+    with open(args.file, encoding="utf-8") as stream:
+        try:
+            totals = await import_file(stream, on_conflict=args.on_conflict,
+                                       chunk_size=args.chunk_size, progress=progress)
+        except (SlugTakenError, ValueError) as e:
+            print(f"Import stopped: {e}. Chunks before the failing one were committed.")
+            return 1
+    print(f"Imported {totals['written']} pages, skipped {totals['skipped']} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export or import pages as NDJSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Stream pages to NDJSON")
+    export.add_argument("--output", default=None, help="File to write (default: stdout)")
+    export.add_argument("--active-only", action="store_true", help="Skip deleted pages")
+    export.add_argument("--since", default=None, help="Only pages created or changed at or after this ISO timestamp")
+    export.add_argument("--batch-size", type=int, default=1000)
+
+    load = commands.add_parser("import", help="Load pages from NDJSON")
+    load.add_argument("file")
+    load.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default="skip",
+                      help="When an active page already uses the slug")
+    load.add_argument("--chunk-size", type=int, default=1000, help="Pages per transaction")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        try:
+            parse_since(args.since)
+        except ValueError:
+            parser.error("--since must be an ISO 8601 timestamp")
+        return asyncio.run(run_export(args))
+    return asyncio.run(run_import(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,114 @@
+import asyncio
+import os
+import signal
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from .db.database import init_db
-from .routes import slugs, pages, templates
+from .db.database import dump_query_stats
+from .db.repository import page_repository
+from .routes import slugs, pages, templates, admin
 from .services.redis_client import redis_client
-from .config import ALLOWED_ORIGINS
+from .middleware.server_timing import ServerTimingMiddleware
+from .middleware.traffic_capture import TrafficCaptureMiddleware, TrafficRecorder
+from .middleware.profiling import SampledRequestProfilerMiddleware
+from .middleware.load_shedding import LoadSheddingMiddleware, ConcurrencyLimiter
+from .services.profiler import profile_for, request_profiler
+from .services.loop_monitor import loop_monitor
+from .services.maintenance import maintenance_job
+from .services.wal_manager import wal_manager
+from .services.hot_pages import hot_pages
+from .services.page_stats import page_stats
+from .services.expiry import expiry_sweeper
+from .config import (
+    ALLOWED_ORIGINS,
+    SERVER_TIMING_ENABLED,
+    SERVER_TIMING_SAMPLE_RATE,
+    TRAFFIC_CAPTURE_ENABLED,
+    TRAFFIC_CAPTURE_PATH,
+    TRAFFIC_CAPTURE_MAX_BYTES,
+    TRAFFIC_CAPTURE_BACKUPS,
+    TRAFFIC_CAPTURE_KEY,
+    PROFILE_INTERVAL_MS,
+    PROFILE_EVERY_N_REQUESTS,
+    PROFILE_SIGNAL_ENABLED,
+    PROFILE_SIGNAL_SECONDS,
+    PROFILE_OUTPUT_DIR,
+    LOOP_MONITOR_ENABLED,
+    MAINTENANCE_ENABLED,
+    WAL_CHECKPOINT_ENABLED,
+    STORAGE_BACKEND,
+    HOT_PAGES_ENABLED,
+    HOT_PAGES_WARMUP_TIMEOUT_SECONDS,
+    LOAD_SHED_ENABLED,
+    LOAD_SHED_MAX_CONCURRENCY,
+    LOAD_SHED_CLASSES,
+    PAGE_STATS_ENABLED,
+    PAGE_EXPIRY_ENABLED,
+)
+
+traffic_recorder = None
+
+
+async def warm_caches():
+    """Preload the template catalog and hot pages; /health answers only once this is done."""
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(templates.cache_template_list(), hot_pages.warm()),
+            timeout=HOT_PAGES_WARMUP_TIMEOUT_SECONDS,
+        )
+        print(f"Cache warmup done: {len(hot_pages.hot)} hot pages")
+    except Exception as e:
+        # A cold cache is slower, not broken
+        print(f"Cache warmup incomplete: {e!r}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await init_db()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    await page_repository.init()
     await redis_client.connect()
+    if HOT_PAGES_ENABLED:
+        await warm_caches()
+        hot_pages.start()
+    if PAGE_STATS_ENABLED:
+        page_stats.start()
+    if PAGE_EXPIRY_ENABLED:
+        expiry_sweeper.start()
+    # Checkpoints and retention work on the SQLite files
+    sqlite_jobs = STORAGE_BACKEND == "sqlite"
+    if sqlite_jobs and WAL_CHECKPOINT_ENABLED:
+        wal_manager.start()
+    if sqlite_jobs and MAINTENANCE_ENABLED:
+        maintenance_job.start()
+    if PROFILE_SIGNAL_ENABLED:
+        # `kill -USR2 <worker pid>` profiles that worker's loop thread and writes the stacks to disk
+        loop_thread = threading.get_ident()
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR2,
+            lambda: profile_for(PROFILE_SIGNAL_SECONDS, PROFILE_INTERVAL_MS / 1000, PROFILE_OUTPUT_DIR, loop_thread),
+        )
     yield
     # Shutdown
+    if sqlite_jobs and MAINTENANCE_ENABLED:
+        await maintenance_job.stop()
+    if sqlite_jobs and WAL_CHECKPOINT_ENABLED:
+        await wal_manager.stop()
+    if LOOP_MONITOR_ENABLED:
+        await loop_monitor.stop()
+    if PAGE_EXPIRY_ENABLED:
+        await expiry_sweeper.stop()
+    if PAGE_STATS_ENABLED:
+        await page_stats.stop()
+    if HOT_PAGES_ENABLED:
+        await hot_pages.stop()
     await redis_client.close()
+    dump_query_stats()
+    if traffic_recorder:
+        traffic_recorder.close()
 
 
 app = FastAPI(
@@ -25,19 +118,46 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Load shedding - added before CORS so CORS wraps it and browsers can read the 503s
+if LOAD_SHED_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware, limiter=ConcurrencyLimiter(LOAD_SHED_CLASSES, LOAD_SHED_MAX_CONCURRENCY))
+
 # CORS middleware - dynamically configured via environment
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PATCH", "DELETE"],
-    allow_headers=["Content-Type", "X-Edit-Token"],
+    allow_headers=["Content-Type", "X-Edit-Token", "Idempotency-Key"],
+    expose_headers=["Idempotent-Replayed", "Retry-After"],
 )
 
+# Server-Timing breakdown - opt-in, always on or sampled
+if SERVER_TIMING_ENABLED or SERVER_TIMING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        sample_rate=1.0 if SERVER_TIMING_ENABLED else SERVER_TIMING_SAMPLE_RATE,
+    )
+
+# Sampled per-request profiling - opt-in
+if PROFILE_EVERY_N_REQUESTS > 0:
+    app.add_middleware(SampledRequestProfilerMiddleware, profiler=request_profiler, every=PROFILE_EVERY_N_REQUESTS)
+
+# Traffic capture for offline replay - opt-in, outermost so it sees final status and duration
+if TRAFFIC_CAPTURE_ENABLED:
+    traffic_recorder = TrafficRecorder(
+        TRAFFIC_CAPTURE_PATH.replace("{pid}", str(os.getpid())),
+        max_bytes=TRAFFIC_CAPTURE_MAX_BYTES,
+        backup_count=TRAFFIC_CAPTURE_BACKUPS,
+        key=TRAFFIC_CAPTURE_KEY,
+    )
+    app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
 # Include routers
 app.include_router(slugs.router, prefix="/api/slugs", tags=["slugs"])
 app.include_router(pages.router, prefix="/api/pages", tags=["pages"])
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/")
@@ -0,0 +1,149 @@
+"""
+ASGI middleware that sheds load instead of queueing work without bound.
+
+API requests fall into route classes (reads, slug checks, writes), each with a
+concurrency limit, a bounded wait queue and a deadline, under one limit for the
+whole worker. Freed slots go to waiting reads first, then slug checks, then
+writes. A request that cannot start before its deadline gets a 503 with
+Retry-After: immediately when its queue is full or the expected wait is already
+past the deadline, otherwise once the deadline passes.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..services.metrics import metrics
+
+# Weight of the latest request in the running average of service time
+SERVICE_TIME_ALPHA = 0.1
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Route class of a request; None for requests that are never shed (health, admin, CORS preflight)."""
+    if method == "OPTIONS" or not path.startswith("/api/") or path.startswith("/api/admin/"):
+        return None
+    if path.startswith("/api/slugs/"):
+        return "slug_check"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class ConcurrencyLimiter:
+    """Per-class slots and wait queues; classes are served in the order they are configured."""
+
+    def __init__(self, classes: dict[str, dict], max_concurrency: int):
+        self.classes = classes
+        self.max_concurrency = max_concurrency
+        self.in_flight = {name: 0 for name in classes}
+        self.waiting: dict[str, deque[asyncio.Future]] = {name: deque() for name in classes}
+        self.service_time = {name: 0.0 for name in classes}  # seconds, running average
+
+    def _has_slot(self, name: str) -> bool:
+        return (
+            self.in_flight[name] < self.classes[name]["concurrency"]
+            and sum(self.in_flight.values()) < self.max_concurrency
+        )
+
+    def expected_wait(self, name: str) -> float:
+        """Rough seconds until a request joining the class's queue now would start."""
+        ahead = len(self.waiting[name]) + 1
+        return ahead * self.service_time[name] / self.classes[name]["concurrency"]
+
+    def retry_after(self, name: str) -> int:
+        return max(1, math.ceil(self.expected_wait(name)))
+
+    def _admit(self, name: str):
+        self.in_flight[name] += 1
+        metrics.inc("load_shed_admitted_total", route_class=name)
+        metrics.set("load_shed_in_flight", self.in_flight[name], route_class=name)
+
+    def _wake(self):
+        """Hand free slots to waiters, highest-priority class first."""
+        for name, queue in self.waiting.items():
+            while queue and self._has_slot(name):
+                future = queue.popleft()
+                if future.done():
+                    continue  # timed out or cancelled
+                self._admit(name)
+                future.set_result(None)
+            metrics.set("load_shed_queued", len(queue), route_class=name)
+
+    async def acquire(self, name: str) -> Optional[str]:
+        """Wait for a slot. Returns None once admitted, or the reason the request is shed."""
+        settings = self.classes[name]
+        queue = self.waiting[name]
+        if not queue and self._has_slot(name):
+            self._admit(name)
+            return None
+
+        reason = None
+        if len(queue) >= settings["queue"]:
+            reason = "queue_full"
+        elif self.expected_wait(name) > settings["deadline_ms"] / 1000:
+            reason = "expected_wait"
+        if reason:
+            metrics.inc("load_shed_rejected_total", route_class=name, reason=reason)
+            return reason
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        metrics.set("load_shed_queued", len(queue), route_class=name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, settings["deadline_ms"] / 1000)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the wait ended; give it back
+                self.release(name, 0.0)
+            elif future in queue:
+                queue.remove(future)
+                metrics.set("load_shed_queued", len(queue), route_class=name)
+            if not isinstance(e, asyncio.TimeoutError):
+                raise
+            metrics.inc("load_shed_rejected_total", route_class=name, reason="deadline")
+            return "deadline"
+        metrics.observe("load_shed_queue_wait_seconds", time.perf_counter() - start, route_class=name)
+        return None
+
+    def release(self, name: str, elapsed: float):
+        """Free a slot after a request finished `elapsed` seconds after it started."""
+        self.in_flight[name] -= 1
+        if elapsed:
+            self.service_time[name] += SERVICE_TIME_ALPHA * (elapsed - self.service_time[name])
+        metrics.set("load_shed_in_flight", self.in_flight[name], route_class=name)
+        self._wake()
+
+
+class LoadSheddingMiddleware:
+    """Admit API requests through a ConcurrencyLimiter; 503 with Retry-After for the ones it sheds."""
+
+    def __init__(self, app: ASGIApp, limiter: ConcurrencyLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if await self.limiter.acquire(name):
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy. Please try again shortly."},
+                headers={"Retry-After": str(self.limiter.retry_after(name))},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(name, time.perf_counter() - start)
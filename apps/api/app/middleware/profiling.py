@@ -0,0 +1,32 @@
+"""
+ASGI middleware that runs the sampling profiler while every Kth request is in flight.
+"""
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..services.profiler import SamplingProfiler
+
+
+class SampledRequestProfilerMiddleware:
+    """Profile every Kth HTTP request; samples accumulate on the given profiler."""
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler, every: int):
+        self.app = app
+        self.profiler = profiler
+        self.every = every
+        self._count = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._count += 1
+        if self._count % self.every:
+            await self.app(scope, receive, send)
+            return
+
+        self.profiler.acquire()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.release()
@@ -0,0 +1,38 @@
+"""
+ASGI middleware that attaches a Server-Timing header to sampled responses.
+"""
+import random
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.timing import start_request_timings, stop_request_timings
+
+
+class ServerTimingMiddleware:
+    """
+    Collect a request-scoped timing breakdown (rate limiter, cache, DB, queue,
+    suggestions) and return it as a standard Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = start_request_timings()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header_value())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_request_timings(token)
@@ -0,0 +1,118 @@
+"""
+ASGI middleware that records sanitized request metadata to a rotating NDJSON file
+so real traffic can be replayed offline (see benchmarks/replay.py).
+"""
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import secrets
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def hash_slug(slug: str, key: bytes) -> str:
+    """Keyed hash of a slug so captures don't contain page addresses and can't be reversed with a wordlist."""
+    return hmac.new(key, slug.lower().encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def key_id(key: bytes) -> str:
+    """Identifies the key in capture headers without revealing it."""
+    return hmac.new(key, b"traffic-capture-key-id", hashlib.sha256).hexdigest()[:16]
+
+
+class CaptureFileHandler(RotatingFileHandler):
+    """Starts every capture file, including rotated ones, with a header line naming the slug key."""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int, header: str):
+        self.header = header
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count)
+
+    def _open(self):
+        stream = super()._open()
+        stream.write(self.header + self.terminator)
+        return stream
+
+
+class TrafficRecorder:
+    """
+    Writes one JSON line per request. Records are handed to a background thread
+    through a queue, so the event loop never waits on disk I/O.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int, key: str = ""):
+        self.path = path
+        self.key = key.encode() if key else secrets.token_bytes(32)
+        header = json.dumps({"capture": 1, "slug_key_id": key_id(self.key)}, separators=(",", ":"))
+        handler = CaptureFileHandler(path, max_bytes, backup_count, header)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        self._logger = logging.getLogger(f"traffic_capture.{path}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(QueueHandler(records))
+        self._listener = QueueListener(records, handler)
+        self._listener.start()
+
+    def hash_slug(self, slug: str) -> str:
+        return hash_slug(slug, self.key)
+
+    def record(self, entry: dict):
+        self._logger.info(json.dumps(entry, separators=(",", ":")))
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+class TrafficCaptureMiddleware:
+    """
+    Record method, route template, slug hash, status and duration of every HTTP
+    request, plus whether the slug was taken for slug checks and leases.
+    """
+
+    def __init__(self, app: ASGIApp, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_capture(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_capture)
+        finally:
+            # The router fills in the matched route and path params on the shared scope
+            route = scope.get("route")
+            slug = scope.get("path_params", {}).get("slug")
+            entry = {
+                "t": round(started_at, 6),
+                "method": scope["method"],
+                "route": getattr(route, "path", None) or "unmatched",
+                "slug": self.recorder.hash_slug(slug) if slug else None,
+                "slug_len": len(slug) if slug else None,
+                "status": status,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+            # Set by the slug routes on request.state
+            slug_taken = scope.get("state", {}).get("slug_taken")
+            if slug_taken is not None:
+                entry["slug_taken"] = slug_taken
+            self.recorder.record(entry)
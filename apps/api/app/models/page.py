@@ -1,9 +1,23 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import re
 
-from ..config import MIN_SLUG_LENGTH, MAX_SLUG_LENGTH, SLUG_PATTERN
+from ..config import MIN_SLUG_LENGTH, MAX_SLUG_LENGTH, SLUG_PATTERN, PAGE_MAX_LIFETIME_DAYS
+
+
+def validate_expires_at(v: Optional[datetime]) -> Optional[datetime]:
+    """expires_at must lie in the future and within PAGE_MAX_LIFETIME_DAYS; naive values are UTC."""
+    if v is None:
+        return v
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    if v <= now:
+        raise ValueError("expires_at must be in the future")
+    if v > now + timedelta(days=PAGE_MAX_LIFETIME_DAYS):
+        raise ValueError(f"expires_at must be within {PAGE_MAX_LIFETIME_DAYS} days")
+    return v
 
 
 class PageCreate(BaseModel):
@@ -13,6 +27,12 @@ class PageCreate(BaseModel):
     sender_name: Optional[str] = Field(None, max_length=50)
     recipient_name: Optional[str] = Field(None, max_length=50)
     template_id: str = Field(default="classic")
+    # Token from POST /api/slugs/lease/{slug}, if the slug was reserved beforehand
+    lease_token: Optional[str] = Field(None, max_length=64)
+    # When the page stops being served; defaults to the template's expires_after_days
+    expires_at: Optional[datetime] = None
+
+    _check_expires_at = field_validator("expires_at")(validate_expires_at)
 
     @field_validator("slug")
     @classmethod
@@ -31,6 +51,9 @@ class PageUpdate(BaseModel):
     sender_name: Optional[str] = Field(None, max_length=50)
     recipient_name: Optional[str] = Field(None, max_length=50)
     template_id: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+    _check_expires_at = field_validator("expires_at")(validate_expires_at)
 
 
 class PageResponse(BaseModel):
@@ -43,6 +66,7 @@ class PageResponse(BaseModel):
     template_id: str
     created_at: datetime
     view_count: int
+    expires_at: Optional[datetime] = None
 
 
 class PageCreateResponse(BaseModel):
@@ -71,3 +95,24 @@ class SlugCheckResponse(BaseModel):
     available: bool
     reason: Optional[str] = None
     suggestions: list[str] = []
+
+
+class SlugLeaseResponse(BaseModel):
+    slug: str
+    lease_token: str
+    expires_in: int  # seconds
+
+
+class DailyPageStats(BaseModel):
+    date: str  # YYYY-MM-DD, UTC
+    views: int
+    unique_viewers: int  # estimated
+    hourly: list[int]  # views per UTC hour
+
+
+class PageStatsResponse(BaseModel):
+    """View analytics for a page owner."""
+    slug: str
+    total_views: int
+    today: DailyPageStats
+    days: list[DailyPageStats]  # newest first, today included
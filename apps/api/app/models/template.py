@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class Template(BaseModel):
@@ -9,6 +10,7 @@ class Template(BaseModel):
     secondary_color: str
     font: str
     interactive: bool = False
+    expires_after_days: Optional[int] = None  # default page lifetime, None = never expires
 
 
 class TemplateListResponse(BaseModel):
@@ -0,0 +1,165 @@
+import asyncio
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
+
+from ..config import ADMIN_TOKEN, PROFILE_INTERVAL_MS, PROFILE_EVERY_N_REQUESTS
+from ..db import database
+from ..db.repository import page_repository
+from ..db.transfer import export_lines, parse_since
+from ..services.profiler import SamplingProfiler, request_profiler, memory_profiler
+from ..services.metrics import metrics
+from ..services.loop_monitor import loop_monitor
+from ..services.maintenance import maintenance_job
+from ..services.wal_manager import wal_manager, CHECKPOINT_MODES
+from ..services.hot_pages import hot_pages
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with a valid admin token. Admin endpoints are hidden when no token is configured."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics(format: str = "json"):
+    """Metrics for this worker, as JSON or in the Prometheus text format (?format=prometheus)."""
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus())
+    return metrics.snapshot()
+
+
+@router.get("/event-loop", dependencies=[Depends(require_admin)])
+async def get_event_loop_report():
+    """Event-loop lag, recent stalls with the blocking stack, and sync I/O seen on the loop (LOOP_DEBUG)."""
+    return loop_monitor.report()
+
+
+@router.get("/hot-pages", dependencies=[Depends(require_admin)])
+async def get_hot_pages(limit: int = 50):
+    """Pages this worker considers hot, and the heaviest hitters it is tracking with their estimated views."""
+    return hot_pages.report(max(1, min(limit, 500)))
+
+
+@router.get("/maintenance", dependencies=[Depends(require_admin)])
+async def get_maintenance_status():
+    """Progress of the current maintenance pass and the result of the last one."""
+    return maintenance_job.status
+
+
+@router.post("/maintenance/run", dependencies=[Depends(require_admin)])
+async def run_maintenance():
+    """Run a maintenance pass now (waits for one already in progress)."""
+    return await maintenance_job.run_once()
+
+
+@router.get("/wal", dependencies=[Depends(require_admin)])
+async def get_wal_status():
+    """WAL size, last checkpoint and last backup (leader is true on the worker running the schedule)."""
+    return wal_manager.status
+
+
+@router.post("/wal/checkpoint", dependencies=[Depends(require_admin)])
+async def run_checkpoint(mode: str = "PASSIVE"):
+    """Checkpoint every shard now."""
+    if mode.upper() not in CHECKPOINT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(CHECKPOINT_MODES)}")
+    return [await wal_manager.checkpoint(mode, shard) for shard in range(len(database.SHARD_PATHS))]
+
+
+@router.post("/backup", dependencies=[Depends(require_admin)])
+async def run_backup():
+    """Write an online backup of every shard to BACKUP_DIR now."""
+    return [await wal_manager.backup(shard) for shard in range(len(database.SHARD_PATHS))]
+
+
+@router.get("/shards", dependencies=[Depends(require_admin)])
+async def get_shard_stats():
+    """Page counts and file size per database shard (queried concurrently)."""
+    return await page_repository.stats()
+
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+async def export_pages(active_only: bool = False, since: Optional[str] = None):
+    """Stream pages as NDJSON (optionally only active ones, or those changed since an ISO timestamp)."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO 8601 timestamp")
+    return StreamingResponse(
+        export_lines(active_only=active_only, since=since),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="pages.ndjson"'},
+    )
+
+
+@router.get("/query-stats", dependencies=[Depends(require_admin)])
+async def get_query_stats():
+    """Per-fingerprint query stats for this worker, most expensive first."""
+    if database.query_stats is None:
+        raise HTTPException(status_code=404, detail="Query stats are disabled")
+    return database.query_stats.snapshot()
+
+
+@router.delete("/query-stats", dependencies=[Depends(require_admin)])
+async def reset_query_stats():
+    """Reset query stats for this worker."""
+    if database.query_stats is None:
+        raise HTTPException(status_code=404, detail="Query stats are disabled")
+    database.query_stats.reset()
+    return {"message": "Query stats reset"}
+
+
+@router.post("/profile/cpu", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = 10, interval_ms: float = PROFILE_INTERVAL_MS):
+    """Sample this worker's event loop thread for N seconds; returns collapsed stacks for flamegraphs."""
+    if not 0 < seconds <= 120:
+        raise HTTPException(status_code=400, detail="seconds must be between 0 and 120")
+
+    profiler = SamplingProfiler(max(interval_ms, 1) / 1000)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler.collapsed()
+
+
+@router.get("/profile/requests", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_requests(reset: bool = False):
+    """Collapsed stacks sampled while every Kth request was in flight (PROFILE_EVERY_N_REQUESTS)."""
+    if not PROFILE_EVERY_N_REQUESTS:
+        raise HTTPException(status_code=404, detail="Per-request profiling is disabled")
+    output = request_profiler.collapsed()
+    if reset:
+        request_profiler.reset()
+    return output
+
+
+@router.post("/profile/memory/start", dependencies=[Depends(require_admin)])
+async def start_memory_profile(frames: int = 10):
+    """Start tracemalloc on this worker and take the baseline snapshot."""
+    memory_profiler.start(frames)
+    return {"message": "Memory tracing started", "frames": frames}
+
+
+@router.get("/profile/memory/snapshot", dependencies=[Depends(require_admin)])
+async def memory_snapshot(limit: int = 25, group_by: str = "lineno"):
+    """Top allocation growth since the previous snapshot on this worker."""
+    if not memory_profiler.tracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is not running")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return await asyncio.to_thread(memory_profiler.snapshot_diff, limit, group_by)
+
+
+@router.post("/profile/memory/stop", dependencies=[Depends(require_admin)])
+async def stop_memory_profile():
+    """Stop tracemalloc and free its bookkeeping."""
+    memory_profiler.stop()
+    return {"message": "Memory tracing stopped"}
@@ -4,21 +4,36 @@ import asyncio
 import json
 import os
 from fastapi import APIRouter, Request, HTTPException, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from typing import Optional, Union
-from redis import Redis
-from rq import Queue
-from rq.job import Job
 
 from ..models.page import (
     PageCreate, PageUpdate, PageResponse, PageCreateResponse,
-    PageJobResponse, PageJobStatusResponse
+    PageJobResponse, PageJobStatusResponse, PageStatsResponse
 )
-from ..services.slug_service import check_slug_availability
+from ..services.slug_service import check_slug_rules
+from ..services.slug_lease import slug_leases
 from ..services.rate_limiter import rate_limiter
 from ..services.cache_service import cache_service
-from ..db.database import execute_query, execute_insert, execute_update, get_db
+from ..services.idempotency import idempotency_store
+from ..services.hot_pages import hot_pages
+from ..services.page_stats import page_stats
+from ..services.timing import timed
+from ..services.redis_client import redis_client, AVAILABILITY_ERRORS
+from ..db.repository import page_repository, db_timestamp
 from ..tasks.page_tasks import create_page_async
-from ..config import FRONTEND_DOMAIN
+from ..config import (
+    FRONTEND_DOMAIN,
+    PAGE_CREATE_SYNC_TIMEOUT,
+    SLUG_CREATE_LEASE_SECONDS,
+    HOT_PAGES_ENABLED,
+    PAGE_STATS_ENABLED,
+    PAGE_STATS_MAX_DAYS,
+    REDIS_CONNECT_TIMEOUT_MS,
+    REDIS_COMMAND_TIMEOUT_MS,
+)
+from .slugs import slug_conflict, LEASED_REASON
 
 router = APIRouter()
 
@@ -33,6 +48,46 @@ def hash_ip(ip: str) -> str:
     return hashlib.sha256(ip.encode()).hexdigest()[:16]
 
 
+def get_page_queue():
+    """
+    RQ queue for page creation.
+    rq and the sync Redis client are imported here, not at module load: they are
+    only needed when creation overflows into the queue.
+    """
+    from redis import Redis
+    from rq import Queue
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    connection = Redis.from_url(
+        f"{redis_url}/2",
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT_MS / 1000,
+        socket_timeout=REDIS_COMMAND_TIMEOUT_MS / 1000,
+    )
+    return Queue("page_creation", connection=connection)
+
+
+def queue_call(fn, *args, **kwargs):
+    """Run a sync RQ call behind the queue circuit breaker; 503 while queue Redis is unavailable."""
+    breaker = redis_client.breakers["queue"]
+    unavailable = HTTPException(
+        status_code=503,
+        detail="Page creation is busy. Please try again shortly.",
+        headers={"Retry-After": str(max(1, int(breaker.reset_seconds)))}
+    )
+    if not breaker.allow():
+        raise unavailable
+    try:
+        result = fn(*args, **kwargs)
+    except AVAILABILITY_ERRORS:
+        breaker.record_failure()
+        raise unavailable
+    except Exception:
+        breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+
 def get_client_ip(request: Request) -> str:
     """
     Get the best-guess client IP.
@@ -51,13 +106,56 @@ def get_client_ip(request: Request) -> str:
 
 
 @router.post("", response_model=Union[PageCreateResponse, PageJobResponse])
-async def create_page(page: PageCreate, request: Request):
+async def create_page(page: PageCreate, request: Request, idempotency_key: Optional[str] = Header(None)):
     """
     Create a new Valentine's page.
-    Tries synchronous creation first (2s timeout), falls back to queue if slow.
+    Tries synchronous creation first (PAGE_CREATE_SYNC_TIMEOUT, 2s by default), falls back to queue if slow.
+    A slug that is taken, or leased by someone else, gets a 409 with suggestions.
+    With an Idempotency-Key header, retries get the first attempt's response back.
     """
-    # Rate limiting - use real client IP when behind proxies
     client_ip = get_client_ip(request)
+    if idempotency_key is None:
+        return await run_create_page(page, client_ip)
+
+    if not 1 <= len(idempotency_key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1 to 255 characters")
+
+    # Scoped to the client: a replay hands back the first caller's edit_token
+    client = hash_ip(client_ip)
+    fingerprint = hashlib.sha256(page.model_dump_json().encode()).hexdigest()
+    state, record = await idempotency_store.claim(idempotency_key, client, fingerprint)
+    if state == "replay":
+        return JSONResponse(
+            status_code=record["status_code"],
+            content=record["body"],
+            headers={"Idempotent-Replayed": "true"}
+        )
+    if state == "mismatch":
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if state == "busy":
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+
+    try:
+        response = await run_create_page(page, client_ip)
+    except BaseException:
+        await idempotency_store.release(idempotency_key, client)
+        raise
+
+    # Only successes (created or queued) are kept; anything else may be retried
+    if isinstance(response, (PageCreateResponse, PageJobResponse)):
+        await idempotency_store.complete(idempotency_key, client, fingerprint, 200, jsonable_encoder(response))
+    else:
+        await idempotency_store.release(idempotency_key, client)
+    return response
+
+
+async def run_create_page(page: PageCreate, client_ip: str) -> Union[PageCreateResponse, PageJobResponse, JSONResponse]:
+    """Rate limit, lease the slug, then create inline or queue."""
+    # Rate limiting - use real client IP when behind proxies
     allowed, retry_after = await rate_limiter.check_page_creation(client_ip)
 
     if not allowed:
@@ -67,12 +165,20 @@ async def create_page(page: PageCreate, request: Request):
             headers={"Retry-After": str(retry_after)}
         )
 
-    # Check slug availability
-    available, reason = await check_slug_availability(page.slug)
-    if not available:
+    # Format and reserved words only; the insert itself finds out whether the slug is free
+    valid, reason = check_slug_rules(page.slug)
+    if not valid:
         raise HTTPException(status_code=400, detail=reason)
 
-    # Try synchronous creation with 2s timeout
+    # Hold the slug while creating: renew the caller's reservation, or take a short lease
+    if page.lease_token:
+        lease_token = await slug_leases.acquire(page.slug, page.lease_token)
+    else:
+        lease_token = await slug_leases.acquire(page.slug, ttl_seconds=SLUG_CREATE_LEASE_SECONDS)
+    if lease_token is None:
+        return await slug_conflict(page.slug, LEASED_REASON, client_ip)
+
+    # Try synchronous creation with a timeout
     try:
         result = await asyncio.wait_for(
             create_page_async(
@@ -83,8 +189,9 @@ async def create_page(page: PageCreate, request: Request):
                 client_ip=client_ip,
                 sender_name=page.sender_name,
                 recipient_name=page.recipient_name,
+                expires_at=db_timestamp(page.expires_at) if page.expires_at else None,
             ),
-            timeout=2.0
+            timeout=PAGE_CREATE_SYNC_TIMEOUT
         )
 
         if result["status"] == "success":
@@ -96,14 +203,17 @@ async def create_page(page: PageCreate, request: Request):
                 edit_token=result["edit_token"],
                 url=result["url"]
             )
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Failed to create page"))
+
+        # A lease taken just for this request should not block a retry
+        if not page.lease_token:
+            await slug_leases.release(page.slug, lease_token)
+        if result.get("code") == "slug_taken":
+            return await slug_conflict(page.slug, result["error"], client_ip)
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to create page"))
 
     except asyncio.TimeoutError:
         # Queue the job for background processing
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        redis_conn = Redis.from_url(f"{redis_url}/2")
-        queue = Queue("page_creation", connection=redis_conn)
+        queue = get_page_queue()
 
         job_data = json.dumps({
             "slug": page.slug,
@@ -113,13 +223,16 @@ async def create_page(page: PageCreate, request: Request):
             "client_ip": client_ip,
             "sender_name": page.sender_name,
             "recipient_name": page.recipient_name,
+            "expires_at": db_timestamp(page.expires_at) if page.expires_at else None,
         })
 
-        job = queue.enqueue(
-            "app.tasks.page_tasks.create_page_sync",
-            job_data,
-            job_timeout=30
-        )
+        with timed("queue", redis_round_trips=1):
+            job = queue_call(
+                queue.enqueue,
+                "app.tasks.page_tasks.create_page_sync",
+                job_data,
+                job_timeout=30
+            )
 
         return PageJobResponse(
             job_id=job.id,
@@ -128,13 +241,35 @@ async def create_page(page: PageCreate, request: Request):
         )
 
 
+# Declared before /job/{job_id} so a page with the slug "job" still gets its stats
+@router.get("/{slug}/stats", response_model=PageStatsResponse)
+async def get_page_stats(
+    slug: str,
+    days: int = 30,
+    x_edit_token: Optional[str] = Header(None)
+):
+    """Views per day and hour and unique viewers per day, for the last `days` days (requires edit token)."""
+    if not x_edit_token:
+        raise HTTPException(status_code=401, detail="Edit token required")
+
+    page_data = await page_repository.get_by_slug(slug)
+    if not page_data:
+        raise HTTPException(status_code=404, detail="Page not found")
+    if not secrets.compare_digest(page_data["edit_token"], x_edit_token):
+        raise HTTPException(status_code=403, detail="Invalid edit token")
+
+    return await page_stats.report(page_data, max(1, min(days, PAGE_STATS_MAX_DAYS)))
+
+
 @router.get("/job/{job_id}", response_model=PageJobStatusResponse)
 async def get_job_status(job_id: str):
     """Poll job status for queued page creation."""
     try:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        redis_conn = Redis.from_url(f"{redis_url}/2")
-        job = Job.fetch(job_id, connection=redis_conn)
+        from rq.job import Job
+
+        queue = get_page_queue()
+        with timed("queue", redis_round_trips=1):
+            job = queue_call(Job.fetch, job_id, connection=queue.connection)
 
         status_map = {
             "queued": "queued",
@@ -177,30 +312,39 @@ async def get_job_status(job_id: str):
                 status=job_status
             )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Job not found: {str(e)}")
 
 
-@router.get("/{slug}", response_model=PageResponse)
-async def get_page(slug: str):
-    """Get a page by slug (public)."""
-    pages = await execute_query(
-        "SELECT * FROM pages WHERE slug_lower = ? AND is_active = 1",
-        (slug.lower(),)
-    )
-
-    if not pages:
+async def raise_not_matched(slug: str):
+    """A conditional write matched nothing: tell a missing page from a wrong edit token."""
+    if await page_repository.get_by_slug(slug) is None:
         raise HTTPException(status_code=404, detail="Page not found")
+    raise HTTPException(status_code=403, detail="Invalid edit token")
 
-    page_data = pages[0]
+
+@router.get("/{slug}", response_model=PageResponse)
+async def get_page(slug: str, request: Request):
+    """Get a page by slug (public). Hot pages are served from cache."""
+    hot = HOT_PAGES_ENABLED and hot_pages.record(slug)
+    page_data, generation = await hot_pages.get(slug) if hot else (None, None)
+
+    if not page_data:
+        page_data = await page_repository.get_by_slug(slug)
+        if not page_data:
+            raise HTTPException(status_code=404, detail="Page not found")
+        if hot:
+            # Skipped if the page was edited or deleted since generation was read
+            await hot_pages.pin(page_data, generation)
 
     # Increment view count
-    await execute_update(
-        "UPDATE pages SET view_count = view_count + 1 WHERE id = ?",
-        (page_data["id"],)
-    )
+    await page_repository.increment_views(slug, page_data["id"])
+    if PAGE_STATS_ENABLED:
+        await page_stats.record_view(page_data["id"], slug, hash_ip(get_client_ip(request)))
 
-    return PageResponse(
+    response = PageResponse(
         id=page_data["id"],
         slug=page_data["slug"],
         title=page_data["title"],
@@ -210,7 +354,11 @@ async def get_page(slug: str):
         template_id=page_data["template_id"],
         created_at=page_data["created_at"],
         view_count=page_data["view_count"] + 1,
+        expires_at=page_data.get("expires_at"),
     )
+    if hot:
+        hot_pages.count_view(slug)
+    return response
 
 
 @router.patch("/{slug}", response_model=PageResponse)
@@ -223,54 +371,18 @@ async def update_page(
     if not x_edit_token:
         raise HTTPException(status_code=401, detail="Edit token required")
 
-    # Verify token
-    pages = await execute_query(
-        "SELECT * FROM pages WHERE slug_lower = ? AND is_active = 1",
-        (slug.lower(),)
-    )
+    fields = update.model_dump(exclude_none=True)
+    if "expires_at" in fields:
+        fields["expires_at"] = db_timestamp(fields["expires_at"])
 
-    if not pages:
-        raise HTTPException(status_code=404, detail="Page not found")
-
-    page_data = pages[0]
-
-    if page_data["edit_token"] != x_edit_token:
-        raise HTTPException(status_code=403, detail="Invalid edit token")
+    # Applied only if the token matches
+    page_data = await page_repository.update(slug, x_edit_token, fields)
 
-    # Build update query
-    updates = []
-    params = []
-
-    if update.title is not None:
-        updates.append("title = ?")
-        params.append(update.title)
-    if update.message is not None:
-        updates.append("message = ?")
-        params.append(update.message)
-    if update.sender_name is not None:
-        updates.append("sender_name = ?")
-        params.append(update.sender_name)
-    if update.recipient_name is not None:
-        updates.append("recipient_name = ?")
-        params.append(update.recipient_name)
-    if update.template_id is not None:
-        updates.append("template_id = ?")
-        params.append(update.template_id)
-
-    if updates:
-        params.append(page_data["id"])
-        await execute_update(
-            f"UPDATE pages SET {', '.join(updates)} WHERE id = ?",
-            tuple(params)
-        )
-
-    # Fetch updated page
-    pages = await execute_query(
-        "SELECT * FROM pages WHERE id = ?",
-        (page_data["id"],)
-    )
+    if not page_data:
+        await raise_not_matched(slug)
 
-    page_data = pages[0]
+    if HOT_PAGES_ENABLED:
+        await hot_pages.evict(slug)
 
     return PageResponse(
         id=page_data["id"],
@@ -282,6 +394,7 @@ async def update_page(
         template_id=page_data["template_id"],
         created_at=page_data["created_at"],
         view_count=page_data["view_count"],
+        expires_at=page_data["expires_at"],
     )
 
 
@@ -294,24 +407,13 @@ async def delete_page(
     if not x_edit_token:
         raise HTTPException(status_code=401, detail="Edit token required")
 
-    # Verify token
-    pages = await execute_query(
-        "SELECT * FROM pages WHERE slug_lower = ? AND is_active = 1",
-        (slug.lower(),)
-    )
-
-    if not pages:
-        raise HTTPException(status_code=404, detail="Page not found")
-
-    page_data = pages[0]
+    # Soft delete, only if the token matches
+    if not await page_repository.delete(slug, x_edit_token):
+        await raise_not_matched(slug)
 
-    if page_data["edit_token"] != x_edit_token:
-        raise HTTPException(status_code=403, detail="Invalid edit token")
-
-    # Soft delete
-    await execute_update(
-        "UPDATE pages SET is_active = 0 WHERE id = ?",
-        (page_data["id"],)
-    )
+    # The slug is free again
+    await cache_service.delete(f"slug_available:{slug.lower()}")
+    if HOT_PAGES_ENABLED:
+        await hot_pages.evict(slug)
 
     return {"message": "Page deleted successfully"}
@@ -1,8 +1,16 @@
+import time
+from contextlib import asynccontextmanager
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import JSONResponse
+from typing import Optional
 
-from ..models.page import SlugCheckResponse
-from ..services.slug_service import check_slug_availability, generate_suggestions
+from ..config import SLUG_LEASE_TTL_SECONDS
+from ..models.page import SlugCheckResponse, SlugLeaseResponse
+from ..services.slug_service import check_slug_availability, generate_suggestions, TAKEN_REASON
+from ..services.slug_lease import slug_leases
 from ..services.rate_limiter import rate_limiter
+from ..services.metrics import metrics
+from ..services.timing import timed, count_work
 
 router = APIRouter()
 
@@ -24,9 +32,66 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+# Cost reserved before a budgeted block runs, about a full suggestion fan-out
+# (slug lookup plus 99 numbered and 14 word candidates); settled afterwards
+RESERVED_COST = 115
+
+
+@asynccontextmanager
+async def compute_budget(client_ip: str, endpoint: str):
+    """
+    429 once the IP's compute budget is spent. Otherwise reserve RESERVED_COST,
+    run the block and settle to what it cost: 1 plus one unit per database
+    round trip it made.
+    """
+    reserved_at = time.time()
+    allowed, retry_after = await rate_limiter.reserve(client_ip, RESERVED_COST, reserved_at)
+    if not allowed:
+        metrics.inc("compute_budget_rejected_total", endpoint=endpoint)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests. Please try again in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    with count_work() as work:
+        try:
+            yield
+        finally:
+            cost = 1 + work.db_round_trips
+            metrics.observe("request_cost", cost, endpoint=endpoint)
+            await rate_limiter.charge(client_ip, cost - RESERVED_COST, reserved_at)
+
+
+# Reason given when another visitor or a creation in flight holds the slug's lease
+LEASED_REASON = "Someone else is claiming this slug right now"
+
+
+async def slug_conflict(slug: str, reason: str, client_ip: Optional[str] = None) -> JSONResponse:
+    """
+    409 for a slug that is taken or leased, with alternatives to offer instead.
+    With client_ip, the suggestions are charged to its compute budget and left
+    out once the budget is spent.
+    """
+    if client_ip is None:
+        with timed("suggest"):
+            suggestions = await generate_suggestions(slug)
+        return JSONResponse(status_code=409, content={"detail": reason, "suggestions": suggestions})
+
+    suggestions = []
+    try:
+        async with compute_budget(client_ip, "create_conflict"):
+            with timed("suggest"):
+                suggestions = await generate_suggestions(slug)
+    except HTTPException as e:
+        if e.status_code != 429:
+            raise
+    return JSONResponse(status_code=409, content={"detail": reason, "suggestions": suggestions})
+
+
 @router.get("/check/{slug}", response_model=SlugCheckResponse)
-async def check_slug(slug: str, request: Request):
-    """Check if a slug is available."""
+async def check_slug(slug: str, request: Request, lease_token: Optional[str] = None):
+    """Check if a slug is available (a slug leased by someone else is not; pass your lease_token)."""
     # Rate limiting - use real client IP when behind proxies
     client_ip = get_client_ip(request)
     allowed, retry_after = await rate_limiter.check_slug_check(client_ip)
@@ -38,13 +103,19 @@ async def check_slug(slug: str, request: Request):
             headers={"Retry-After": str(retry_after)}
         )
 
-    # Check availability
-    available, reason = await check_slug_availability(slug)
+    async with compute_budget(client_ip, "check"):
+        # Check availability
+        available, reason = await check_slug_availability(slug)
+        # For traffic capture: replays need to know which checked slugs were taken
+        request.state.slug_taken = reason == TAKEN_REASON
+        if available and not await slug_leases.is_free(slug, lease_token):
+            available, reason = False, LEASED_REASON
 
-    # Generate suggestions if not available
-    suggestions = []
-    if not available:
-        suggestions = await generate_suggestions(slug)
+        # Generate suggestions if not available
+        suggestions = []
+        if not available:
+            with timed("suggest"):
+                suggestions = await generate_suggestions(slug)
 
     return SlugCheckResponse(
         slug=slug,
@@ -54,11 +125,45 @@ async def check_slug(slug: str, request: Request):
     )
 
 
+@router.post("/lease/{slug}", response_model=SlugLeaseResponse)
+async def lease_slug(slug: str, request: Request, lease_token: Optional[str] = None):
+    """
+    Reserve an available slug for SLUG_LEASE_TTL_SECONDS while the form is
+    filled in. Pass the returned lease_token when creating the page, or back
+    here to renew the lease. 409 with suggestions if the slug is taken.
+    """
+    client_ip = get_client_ip(request)
+    allowed, retry_after = await rate_limiter.check_slug_check(client_ip)
+
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests. Please try again in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    async with compute_budget(client_ip, "lease"):
+        available, reason = await check_slug_availability(slug)
+        request.state.slug_taken = reason == TAKEN_REASON
+        if not available:
+            if reason != TAKEN_REASON:
+                raise HTTPException(status_code=400, detail=reason)
+            return await slug_conflict(slug, reason)
+
+        token = await slug_leases.acquire(slug, lease_token)
+        if token is None:
+            return await slug_conflict(slug, LEASED_REASON)
+
+    return SlugLeaseResponse(slug=slug, lease_token=token, expires_in=SLUG_LEASE_TTL_SECONDS)
+
+
 @router.get("/suggest")
-async def suggest_slugs(base: str = "valentine", count: int = 5):
-    """Generate slug suggestions based on a base word."""
+async def suggest_slugs(request: Request, base: str = "valentine", count: int = 5):
+    """Generate slug suggestions based on a base word (charged to the compute budget)."""
     if count > 10:
         count = 10
 
-    suggestions = await generate_suggestions(base, count)
+    async with compute_budget(get_client_ip(request), "suggest"):
+        with timed("suggest"):
+            suggestions = await generate_suggestions(base, count)
     return {"suggestions": suggestions}
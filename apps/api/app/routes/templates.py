@@ -6,25 +6,26 @@ from ..services.cache_service import cache_service
 
 router = APIRouter()
 
+TEMPLATE_LIST_KEY = "templates:list"
+
+
+async def cache_template_list() -> TemplateListResponse:
+    """Build the template list and cache it for 24 hours (templates rarely change)."""
+    templates = [Template(**t) for t in TEMPLATES.values()]
+    response = TemplateListResponse(templates=templates)
+    await cache_service.set(TEMPLATE_LIST_KEY, response.dict(), ttl=86400)
+    return response
+
 
 @router.get("", response_model=TemplateListResponse)
 async def list_templates():
     """List all available templates with 24h caching."""
-    cache_key = "templates:list"
-
     # Try cache first
-    cached = await cache_service.get(cache_key)
+    cached = await cache_service.get(TEMPLATE_LIST_KEY)
     if cached:
         return TemplateListResponse(**cached)
 
-    # Build response
-    templates = [Template(**t) for t in TEMPLATES.values()]
-    response = TemplateListResponse(templates=templates)
-
-    # Cache for 24 hours (templates rarely change)
-    await cache_service.set(cache_key, response.dict(), ttl=86400)
-
-    return response
+    return await cache_template_list()
 
 
 @router.get("/{template_id}", response_model=Template)
@@ -0,0 +1,80 @@
+"""
+Automatic pipelining of Redis commands across coroutines (REDIS_AUTO_PIPELINE).
+
+Commands issued by any coroutine are queued instead of sent. At the end of the
+current event-loop tick (call_soon), everything queued goes out as one
+non-transactional pipeline, and each caller's future gets its own result or
+exception. Under concurrency, many requests share one round trip and one
+pooled connection. A lone command pays one loop iteration of delay.
+"""
+import asyncio
+from typing import Any
+
+from ..config import REDIS_AUTO_PIPELINE_MAX_BATCH
+from .metrics import metrics
+
+# Client attributes that are not commands, or manage their own round trips
+PASSTHROUGH = {"pipeline", "close", "aclose", "connection_pool"}
+
+
+class AutoPipeline:
+    """Proxy that batches commands from concurrent callers into pipelines."""
+
+    def __init__(self, client: Any, namespace: str, max_batch: int = REDIS_AUTO_PIPELINE_MAX_BATCH):
+        self.client = client
+        self.namespace = namespace
+        self.max_batch = max_batch
+        self._pending: list[tuple[str, tuple, dict, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._tasks: set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.client, name)
+        if name in PASSTHROUGH or name.startswith("_") or not callable(attr):
+            return attr
+
+        def command(*args, **kwargs) -> asyncio.Future:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending.append((name, args, kwargs, future))
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_soon(self._flush)
+            return future
+
+        return command
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._execute(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch: list[tuple[str, tuple, dict, asyncio.Future]]):
+        metrics.observe("redis_auto_pipeline_batch_size", len(batch), namespace=self.namespace)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for name, args, kwargs, _ in batch:
+                getattr(pipe, name)(*args, **kwargs)
+            # Per-command errors come back in place of results instead of failing the batch
+            results = await pipe.execute(raise_on_error=False)
+        except BaseException as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller was cancelled
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
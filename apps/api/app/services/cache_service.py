@@ -5,6 +5,7 @@ import json
 from typing import Optional, Any
 
 from .redis_client import redis_client
+from .timing import timed
 
 
 class CacheService:
@@ -16,7 +17,8 @@ class CacheService:
         Returns None if key doesn't exist or is expired.
         """
         try:
-            value = await redis_client.cache.get(key)
+            with timed("cache", redis_round_trips=1):
+                value = await redis_client.cache.get(key)
             return json.loads(value) if value else None
         except Exception as e:
             print(f"Cache get error for key {key}: {e}")
@@ -28,7 +30,8 @@ class CacheService:
         """
         try:
             serialized = json.dumps(value)
-            await redis_client.cache.setex(key, ttl, serialized)
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.setex(key, ttl, serialized)
         except Exception as e:
             print(f"Cache set error for key {key}: {e}")
 
@@ -37,7 +40,8 @@ class CacheService:
         Delete value from cache.
         """
         try:
-            await redis_client.cache.delete(key)
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.delete(key)
         except Exception as e:
             print(f"Cache delete error for key {key}: {e}")
 
@@ -46,7 +50,8 @@ class CacheService:
         Check if key exists in cache.
         """
         try:
-            return await redis_client.cache.exists(key) > 0
+            with timed("cache", redis_round_trips=1):
+                return await redis_client.cache.exists(key) > 0
         except Exception as e:
             print(f"Cache exists error for key {key}: {e}")
             return False
@@ -0,0 +1,74 @@
+"""
+Page expiration.
+
+Pages get an expires_at from the creator or from their template's
+expires_after_days. Reads stop serving a page once it passes that time; the
+sweeper then deactivates expired pages every PAGE_EXPIRY_SWEEP_SECONDS, up to
+PAGE_EXPIRY_BATCH_SIZE per shard per transaction, and drops their cached
+availability and page copies so the slugs can be taken again. Deactivated pages
+are archived by the maintenance job like deleted ones.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from ..config import TEMPLATES, PAGE_EXPIRY_SWEEP_SECONDS, PAGE_EXPIRY_BATCH_SIZE, MAINTENANCE_BATCH_PAUSE_MS
+from ..db.repository import page_repository, db_timestamp
+from .cache_service import cache_service
+from .hot_pages import hot_pages
+from .metrics import metrics
+
+
+def default_expiry(template_id: str) -> Optional[str]:
+    """expires_at for a new page that did not ask for one: now plus the template's expires_after_days."""
+    days = TEMPLATES.get(template_id, {}).get("expires_after_days")
+    if not days:
+        return None
+    return db_timestamp(datetime.now(timezone.utc) + timedelta(days=days))
+
+
+class ExpirySweeper:
+    """Deactivates expired pages in small batches."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """Deactivate every page expired so far; returns how many."""
+        swept = 0
+        while True:
+            slugs = await page_repository.expire_pages(PAGE_EXPIRY_BATCH_SIZE)
+            for slug in slugs:
+                await cache_service.delete(f"slug_available:{slug.lower()}")
+                await hot_pages.evict(slug)
+            swept += len(slugs)
+            metrics.inc("pages_expired_total", len(slugs))
+            # A full batch from any shard means there may be more
+            if len(slugs) < PAGE_EXPIRY_BATCH_SIZE:
+                return swept
+            await asyncio.sleep(MAINTENANCE_BATCH_PAUSE_MS / 1000)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _loop(self):
+        # Every worker sweeps: a page is deactivated by exactly one UPDATE, and
+        # the partial index makes a sweep with nothing due a single index probe
+        while True:
+            await asyncio.sleep(PAGE_EXPIRY_SWEEP_SECONDS)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Expiry sweep error: {e}")
+
+
+# Global expiry sweeper instance
+expiry_sweeper = ExpirySweeper()
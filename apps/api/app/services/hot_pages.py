@@ -0,0 +1,359 @@
+"""
+Hot-page detection and pinning.
+
+Every page view feeds a space-saving tracker (HOT_PAGES_CAPACITY counters,
+halved every HOT_PAGES_DECAY_SECONDS so it follows recent traffic). Every
+HOT_PAGES_REFRESH_SECONDS the top HOT_PAGES_TOP pages with at least
+HOT_PAGES_MIN_VIEWS views become hot. Hot pages are served from an in-process
+cache and a Redis copy instead of SQLite. Every evict bumps the page's
+generation in Redis, and a copy is only written to Redis if the generation is
+still the one seen before the page was read, so a read racing an edit or
+delete can't cache what it replaced. The tracker state is per worker;
+each worker also publishes its top counts to Redis so a restarted worker can
+preload the pages that are hot across workers.
+"""
+import asyncio
+import heapq
+import json
+import os
+import socket
+import time
+from typing import Optional
+
+from ..config import (
+    HOT_PAGES_CAPACITY,
+    HOT_PAGES_TOP,
+    HOT_PAGES_MIN_VIEWS,
+    HOT_PAGES_REFRESH_SECONDS,
+    HOT_PAGES_DECAY_SECONDS,
+    HOT_PAGES_LOCAL_TTL_SECONDS,
+    HOT_PAGES_REDIS_TTL_SECONDS,
+)
+from ..db.repository import page_repository
+from .metrics import metrics
+from .redis_client import redis_client
+from .timing import timed
+
+# Columns a page view needs; edit tokens never go into the caches
+PUBLIC_FIELDS = (
+    "id", "slug", "title", "message", "sender_name", "recipient_name",
+    "template_id", "created_at", "view_count", "expires_at",
+)
+
+# Hash of worker -> {"at": unix time, "counts": {slug: count}}, read by workers at startup.
+# Each worker overwrites its own field; entries are decayed by age when read.
+HOT_LIST_KEY = "hot_pages:workers"
+HOT_LIST_TTL_SECONDS = 3600
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Generations outlive any read that could still pin the copy they replaced
+GENERATION_TTL_SECONDS = 3600
+
+# Write the copy only if no evict happened since the page was read
+PIN_SCRIPT = """
+local generation = redis.call('GET', KEYS[2]) or ''
+if generation ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class SpaceSaving:
+    """
+    Space-saving top-k counter (Metwally et al.): at most `capacity` keys. A new
+    key replaces the smallest counter and inherits its count as overestimation
+    error, so every key with more than total/capacity hits is always tracked.
+
+    The smallest counter is found through a lazily updated min-heap: a hit on
+    a tracked key is O(1), a new key O(log capacity) amortized.
+    """
+
+    def __init__(self, capacity: int = HOT_PAGES_CAPACITY):
+        self.capacity = capacity
+        self.counts: dict[str, float] = {}
+        self.errors: dict[str, float] = {}
+        # One (count, key) per tracked key. Counts only grow between decays, so an
+        # entry may lag behind its key's count but never exceed it.
+        self._heap: list[tuple[float, str]] = []
+
+    def offer(self, key: str, weight: float = 1):
+        if key in self.counts:
+            self.counts[key] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (weight, key))
+            return
+        floor, victim = self._smallest()
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[key] = floor + weight
+        self.errors[key] = floor
+        heapq.heapreplace(self._heap, (floor + weight, key))
+
+    def _smallest(self) -> tuple[float, str]:
+        """Bring the smallest counter to the top of the heap, refreshing lagging entries on the way."""
+        while True:
+            count, key = self._heap[0]
+            if self.counts[key] == count:
+                return count, key
+            heapq.heapreplace(self._heap, (self.counts[key], key))
+
+    def top(self, n: int) -> list[tuple[str, float, float]]:
+        """(key, count, error) for the n largest counters."""
+        keys = sorted(self.counts, key=self.counts.__getitem__, reverse=True)[:n]
+        return [(key, self.counts[key], self.errors[key]) for key in keys]
+
+    def decay(self, factor: float = 0.5):
+        """Scale every counter down so old traffic fades; drops counters that reach zero."""
+        for key in list(self.counts):
+            self.counts[key] *= factor
+            self.errors[key] *= factor
+            if self.counts[key] < 0.5:
+                del self.counts[key]
+                del self.errors[key]
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+def public_page(page: dict) -> dict:
+    return {name: page.get(name) for name in PUBLIC_FIELDS}
+
+
+def is_expired(page: dict) -> bool:
+    return bool(page.get("expires_at")) and page["expires_at"] <= time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+def page_key(slug: str) -> str:
+    return f"page:{slug.lower()}"
+
+
+def generation_key(slug: str) -> str:
+    return f"page_gen:{slug.lower()}"
+
+
+class HotPages:
+    """Tracks views, decides which pages are hot, and caches those."""
+
+    def __init__(self):
+        self.tracker = SpaceSaving()
+        self.hot: set[str] = set()
+        self._local: dict[str, tuple[float, dict]] = {}  # slug_lower -> (expires_at, page)
+        self._last_decay = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, slug: str) -> bool:
+        """Count a view; returns True if the page is currently hot."""
+        slug_lower = slug.lower()
+        self.tracker.offer(slug_lower)
+        return slug_lower in self.hot
+
+    async def get(self, slug: str) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Cached copy of a hot page, from this worker or from Redis. On a miss,
+        also returns the page's generation, to pass to pin() after reading the
+        page from the database (None if Redis could not be asked).
+        """
+        slug_lower = slug.lower()
+        entry = self._local.get(slug_lower)
+        if entry and is_expired(entry[1]):
+            # Past expires_at before the sweeper got to it
+            await self.evict(slug_lower)
+            entry = None
+        if entry and entry[0] > time.monotonic():
+            metrics.inc("page_cache_hits_total", layer="local")
+            return entry[1], None
+
+        try:
+            with timed("cache", redis_round_trips=1):
+                value, generation = await redis_client.cache.mget(page_key(slug_lower), generation_key(slug_lower))
+        except Exception as e:
+            print(f"Cache get error for key {page_key(slug_lower)}: {e}")
+            metrics.inc("page_cache_misses_total")
+            return None, None
+
+        page = json.loads(value) if value else None
+        if page and not is_expired(page):
+            metrics.inc("page_cache_hits_total", layer="redis")
+            self._local[slug_lower] = (time.monotonic() + HOT_PAGES_LOCAL_TTL_SECONDS, page)
+            return page, None
+        metrics.inc("page_cache_misses_total")
+        return None, generation or ""
+
+    async def generations(self, slugs: list[str]) -> dict[str, str]:
+        """Current generation of each slug, read before the pages are."""
+        if not slugs:
+            return {}
+        with timed("cache", redis_round_trips=1):
+            values = await redis_client.cache.mget(*(generation_key(slug) for slug in slugs))
+        return {slug.lower(): value or "" for slug, value in zip(slugs, values)}
+
+    async def pin(self, page: dict, generation: Optional[str]):
+        """
+        Cache a hot page in Redis and in this worker, unless it was evicted
+        since `generation` was read (the copy would be older than the edit).
+        """
+        if generation is None:
+            return
+        page = public_page(page)
+        slug_lower = page["slug"].lower()
+        try:
+            with timed("cache", redis_round_trips=1):
+                pinned = await redis_client.cache.eval(
+                    PIN_SCRIPT, 2, page_key(slug_lower), generation_key(slug_lower),
+                    generation, json.dumps(page), HOT_PAGES_REDIS_TTL_SECONDS,
+                )
+        except Exception as e:
+            print(f"Cache set error for key {page_key(slug_lower)}: {e}")
+            return
+        if pinned:
+            self._local[slug_lower] = (time.monotonic() + HOT_PAGES_LOCAL_TTL_SECONDS, page)
+        else:
+            metrics.inc("page_cache_stale_pins_total")
+
+    def count_view(self, slug: str):
+        """Keep the cached view count roughly current between refreshes."""
+        entry = self._local.get(slug.lower())
+        if entry:
+            entry[1]["view_count"] += 1
+
+    async def evict(self, slug: str):
+        """
+        Drop cached copies after an edit or delete and bump the generation, so
+        reads from before it can't pin their copy again (other workers' local
+        copies expire within the local TTL).
+        """
+        slug_lower = slug.lower()
+        self._local.pop(slug_lower, None)
+        try:
+            pipe = redis_client.cache.pipeline(transaction=True)
+            pipe.incr(generation_key(slug_lower))
+            pipe.expire(generation_key(slug_lower), GENERATION_TTL_SECONDS)
+            pipe.delete(page_key(slug_lower))
+            with timed("cache", redis_round_trips=1):
+                await pipe.execute()
+        except Exception as e:
+            print(f"Cache delete error for key {page_key(slug_lower)}: {e}")
+
+    def refresh(self):
+        """Recompute the hot set, decay old counts and drop expired local copies."""
+        now = time.monotonic()
+        if now - self._last_decay >= HOT_PAGES_DECAY_SECONDS:
+            self.tracker.decay()
+            self._last_decay = now
+        self.hot = {
+            slug for slug, count, error in self.tracker.top(HOT_PAGES_TOP)
+            if count - error >= HOT_PAGES_MIN_VIEWS
+        }
+        self._local = {
+            slug: entry for slug, entry in self._local.items()
+            if slug in self.hot and entry[0] > now
+        }
+        metrics.set("hot_pages", len(self.hot))
+
+    async def publish(self):
+        """Replace this worker's entry in the shared hot list with its current (decayed) top counts."""
+        now = time.time()
+        entry = json.dumps({"at": now, "counts": {slug: count for slug, count, _ in self.tracker.top(HOT_PAGES_TOP)}})
+        with timed("cache", redis_round_trips=1):
+            entries = await redis_client.cache.hgetall(HOT_LIST_KEY)
+        # Workers that stopped publishing (restarted or scaled down)
+        gone = [worker for worker, value in entries.items() if now - json.loads(value)["at"] > HOT_LIST_TTL_SECONDS]
+
+        pipe = redis_client.cache.pipeline(transaction=False)
+        pipe.hset(HOT_LIST_KEY, WORKER_ID, entry)
+        if gone:
+            pipe.hdel(HOT_LIST_KEY, *gone)
+        pipe.expire(HOT_LIST_KEY, HOT_LIST_TTL_SECONDS)
+        with timed("cache", redis_round_trips=1):
+            await pipe.execute()
+
+    async def shared_counts(self) -> dict[str, float]:
+        """
+        Views per page summed over the workers' published counts, each halved
+        for every HOT_PAGES_DECAY_SECONDS since it was published, as if the
+        worker had kept decaying it.
+        """
+        try:
+            with timed("cache", redis_round_trips=1):
+                entries = await redis_client.cache.hgetall(HOT_LIST_KEY)
+        except Exception as e:
+            print(f"Hot list read error: {e}")
+            return {}
+
+        now = time.time()
+        counts: dict[str, float] = {}
+        for value in entries.values():
+            entry = json.loads(value)
+            factor = 0.5 ** (max(0.0, now - entry["at"]) / HOT_PAGES_DECAY_SECONDS)
+            for slug, count in entry["counts"].items():
+                counts[slug] = counts.get(slug, 0) + count * factor
+        return {slug: count for slug, count in counts.items() if count >= 0.5}
+
+    async def warm(self) -> int:
+        """
+        Preload the pages hot across workers before a restart (the shared list
+        in Redis), or the most viewed pages when there is none. They start out
+        hot, with just enough views to stay hot only if traffic keeps coming.
+        """
+        shared = await self.shared_counts()
+        if shared:
+            ranked = sorted(shared, key=shared.__getitem__, reverse=True)[:HOT_PAGES_TOP]
+        else:
+            ranked = [page["slug_lower"] for page in await page_repository.most_viewed(HOT_PAGES_TOP)]
+
+        # Generations first, then the pages, like a read
+        generations = await self.generations(ranked)
+        found = await page_repository.get_many(ranked)
+        pages = [found[slug] for slug in ranked if slug in found]
+
+        for page in pages:
+            self.tracker.offer(page["slug_lower"], HOT_PAGES_MIN_VIEWS)
+            await self.pin(page, generations[page["slug_lower"]])
+        self.refresh()
+        return len(pages)
+
+    def report(self, limit: int = 50) -> dict:
+        now = time.monotonic()
+        return {
+            "hot": sorted(self.hot),
+            "tracked": [
+                {
+                    "slug": slug,
+                    "views": round(count, 1),
+                    "error": round(error, 1),
+                    "hot": slug in self.hot,
+                    "cached": slug in self._local and self._local[slug][0] > now,
+                }
+                for slug, count, error in self.tracker.top(limit)
+            ],
+            "capacity": self.tracker.capacity,
+            "min_views": HOT_PAGES_MIN_VIEWS,
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(HOT_PAGES_REFRESH_SECONDS)
+            try:
+                self.refresh()
+                await self.publish()
+            except Exception as e:
+                print(f"Hot pages refresh error: {e}")
+
+
+# Global hot page tracker
+hot_pages = HotPages()
@@ -0,0 +1,98 @@
+"""
+Idempotency-Key support for POST /api/pages.
+
+The first request with a key leaves an in-flight marker in Redis (SET NX PX)
+and, when it succeeds, replaces it with the response (the created page or the
+queued job_id) for IDEMPOTENCY_TTL_SECONDS. Retries with the same key get that
+response back for one Redis lookup. Keys are scoped to the client's hashed IP,
+so a response (and its edit_token) only goes back to the client that made the
+first request. Duplicates that arrive while the first
+attempt is still running wait for it instead of creating again. Failed attempts
+are not stored, so a retry runs again. Without Redis the key is ignored.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from ..config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_IN_FLIGHT_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from .metrics import metrics
+from .redis_client import redis_client
+from .timing import timed
+
+# How often a waiting duplicate looks for the first attempt's outcome
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def idempotency_key(key: str, client: str) -> str:
+    return f"idempotency:{hashlib.sha256(f'{client}:{key}'.encode()).hexdigest()}"
+
+
+class IdempotencyStore:
+    """Request outcomes by client and Idempotency-Key on the cache Redis DB."""
+
+    async def claim(self, key: str, client: str, fingerprint: str) -> tuple[str, Optional[dict]]:
+        """
+        Returns ("new", None) when the caller should run the request,
+        ("replay", record) with the stored response, ("mismatch", None) if the
+        key was used for a different request body, or ("busy", None) if the
+        first attempt is still running after IDEMPOTENCY_WAIT_SECONDS.
+        """
+        marker = json.dumps({"state": "in_flight", "fingerprint": fingerprint})
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        waited = False
+        try:
+            while True:
+                with timed("cache", redis_round_trips=1):
+                    claimed = await redis_client.cache.set(
+                        idempotency_key(key, client), marker, px=IDEMPOTENCY_IN_FLIGHT_SECONDS * 1000, nx=True
+                    )
+                if claimed:
+                    result = "new"
+                    break
+
+                with timed("cache", redis_round_trips=1):
+                    stored = await redis_client.cache.get(idempotency_key(key, client))
+                if stored is None:
+                    # The first attempt failed and let go of the key; run it ourselves
+                    continue
+                record = json.loads(stored)
+                if record["fingerprint"] != fingerprint:
+                    result = "mismatch"
+                    break
+                if record["state"] == "done":
+                    metrics.inc("idempotency_requests_total", result="waited" if waited else "replayed")
+                    return "replay", record
+                if time.monotonic() >= deadline:
+                    result = "busy"
+                    break
+                waited = True
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        except Exception as e:
+            print(f"Idempotency error for key {key}: {e}")
+            result = "new"
+
+        metrics.inc("idempotency_requests_total", result=result)
+        return result, None
+
+    async def complete(self, key: str, client: str, fingerprint: str, status_code: int, body: Any):
+        """Store the response for retries."""
+        record = json.dumps({"state": "done", "fingerprint": fingerprint, "status_code": status_code, "body": body})
+        try:
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.setex(idempotency_key(key, client), IDEMPOTENCY_TTL_SECONDS, record)
+        except Exception as e:
+            print(f"Idempotency error for key {key}: {e}")
+
+    async def release(self, key: str, client: str):
+        """Drop the in-flight marker after a failed attempt so a retry runs again."""
+        try:
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.delete(idempotency_key(key, client))
+        except Exception as e:
+            print(f"Idempotency error for key {key}: {e}")
+
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
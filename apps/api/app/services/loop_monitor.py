@@ -0,0 +1,149 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A heartbeat task measures how late the loop wakes it up (lag). A watchdog
+thread notices when the heartbeat stops and captures the loop thread's stack,
+which is the code that is blocking the loop. In debug mode an audit hook also
+flags synchronous file/socket/sleep calls made on the loop thread.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from .metrics import metrics
+from ..config import LOOP_MONITOR_INTERVAL_MS, LOOP_LAG_THRESHOLD_MS, LOOP_DEBUG
+
+# Audit events that mean synchronous I/O or sleeping
+BLOCKING_AUDIT_EVENTS = {
+    "open",
+    "socket.connect",
+    "socket.getaddrinfo",
+    "socket.gethostbyname",
+    "subprocess.Popen",
+    "time.sleep",
+    "os.listdir",
+    "os.scandir",
+}
+
+
+class LoopMonitor:
+    """Measures event-loop lag continuously and records the stacks of long stalls."""
+
+    def __init__(self, interval: float, threshold: float, debug: bool = False):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.stalls: deque[dict] = deque(maxlen=20)
+        self.blocking_calls: dict[tuple, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_ident: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._in_hook = threading.local()
+
+    def start(self):
+        """Start monitoring the running loop. Must be called from the loop thread."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_ident = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure_lag())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+        if self.debug:
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.threshold
+            # Audit hooks can't be removed; the hook checks self._loop_ident and goes quiet after stop()
+            sys.addaudithook(self._audit)
+
+    async def stop(self):
+        self._stop.set()
+        self._loop_ident = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._heartbeat = time.monotonic()
+            metrics.observe("event_loop_lag_seconds", lag)
+            metrics.set("event_loop_lag_last_seconds", lag)
+
+    def _watch(self):
+        """Runs in its own thread: capture the loop thread's stack while it is stalled."""
+        reported_heartbeat = None
+        check_every = min(self.threshold / 2, self.interval)
+        while not self._stop.wait(check_every):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_ident)
+            if frame is None:
+                continue
+            reported_heartbeat = heartbeat
+            stack = traceback.format_stack(frame)
+            del frame
+            self.stalls.append({"at": time.time(), "stalled_ms": round(stalled_for * 1000, 1), "stack": stack})
+            metrics.inc("event_loop_stalls_total")
+            print(f"Event loop blocked for {stalled_for * 1000:.0f}ms+, blocking code:\n{''.join(stack[-6:])}")
+
+    def _audit(self, event: str, args: tuple):
+        if event not in BLOCKING_AUDIT_EVENTS or threading.get_ident() != self._loop_ident:
+            return
+        if getattr(self._in_hook, "active", False):
+            return
+        if event == "socket.connect" and args[0].gettimeout() == 0.0:
+            return  # non-blocking connect issued by asyncio itself
+        self._in_hook.active = True
+        try:
+            # lookup_lines=False: reading source lines would itself call open()
+            caller = traceback.StackSummary.extract(
+                traceback.walk_stack(sys._getframe(1)), limit=12, lookup_lines=False
+            )
+            if any(f.filename.endswith(("linecache.py", "tokenize.py")) for f in caller):
+                return  # source lookups for tracebacks (asyncio debug mode), not application I/O
+            site = next(
+                (f for f in caller if "/app/" in f.filename.replace("\\", "/") and "loop_monitor" not in f.filename),
+                caller[0] if caller else None,
+            )
+            where = f"{site.filename}:{site.lineno} in {site.name}" if site else "unknown"
+            key = (event, where)
+            count = self.blocking_calls.get(key, 0) + 1
+            self.blocking_calls[key] = count
+            metrics.inc("blocking_calls_on_loop_total", event=event)
+            if count == 1:
+                print(f"Blocking call on event loop thread: {event} at {where}")
+        finally:
+            self._in_hook.active = False
+
+    def report(self) -> dict:
+        return {
+            "lag": metrics.snapshot()["histograms"].get("event_loop_lag_seconds"),
+            "stalls": list(self.stalls),
+            "blocking_calls": [
+                {"event": event, "where": where, "count": count}
+                for (event, where), count in sorted(self.blocking_calls.items(), key=lambda item: -item[1])
+            ],
+        }
+
+
+# Global loop monitor instance
+loop_monitor = LoopMonitor(LOOP_MONITOR_INTERVAL_MS / 1000, LOOP_LAG_THRESHOLD_MS / 1000, debug=LOOP_DEBUG)
@@ -0,0 +1,238 @@
+"""
+Background retention and compaction for the SQLite database.
+
+- Deletes creation_logs rows older than CREATION_LOG_RETENTION_DAYS
+- Moves pages soft-deleted more than PAGE_ARCHIVE_GRACE_DAYS ago to pages_archive
+- Deletes page_stats_daily rows older than PAGE_STATS_MAX_DAYS (owners cannot read them)
+- Runs incremental vacuum to return freed pages to the filesystem
+
+All work happens in small batches, each in its own short transaction, with a
+pause in between so request writers never wait long on the writer lock. One
+worker per host runs the job (elected with a file lock).
+"""
+import asyncio
+import time
+from typing import Optional
+
+from .metrics import metrics
+from ..config import (
+    DATABASE_PATH,
+    MAINTENANCE_INTERVAL_SECONDS,
+    MAINTENANCE_BATCH_SIZE,
+    MAINTENANCE_BATCH_PAUSE_MS,
+    CREATION_LOG_RETENTION_DAYS,
+    PAGE_ARCHIVE_GRACE_DAYS,
+    PAGE_STATS_MAX_DAYS,
+    VACUUM_PAGES_PER_STEP,
+)
+from ..db.database import execute_query, execute_update, execute_transaction, get_db, try_lock_file, SHARD_PATHS
+
+ARCHIVE_COLUMNS = (
+    "id, slug, slug_lower, title, message, sender_name, recipient_name, "
+    "template_id, edit_token, created_at, view_count, deleted_at"
+)
+
+
+class MaintenanceJob:
+    """Periodic retention pass with progress reporting."""
+
+    def __init__(self):
+        self.status: dict = {"state": "idle", "last_run": None, "progress": {}}
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+        self._leader_lock = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._leader_lock:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+            # Re-try every interval so another worker takes over if the leader exits
+            if self._leader_lock is None:
+                self._leader_lock = await asyncio.to_thread(try_lock_file, f"{DATABASE_PATH}.maintenance.lock")
+                if self._leader_lock is None:
+                    continue
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.status["state"] = "failed"
+                self.status["error"] = str(e)
+                metrics.inc("maintenance_failures_total")
+                print(f"Maintenance error: {e}")
+
+    async def _pause(self):
+        await asyncio.sleep(MAINTENANCE_BATCH_PAUSE_MS / 1000)
+
+    async def run_once(self) -> dict:
+        """Run one full pass. Concurrent calls wait for the pass in progress."""
+        async with self._run_lock:
+            started = time.time()
+            progress = {"creation_logs_deleted": 0, "pages_archived": 0, "page_stats_deleted": 0, "vacuum_pages_reclaimed": 0, "vacuum_bytes_reclaimed": 0}
+            self.status.update(state="running", started_at=started, progress=progress, error=None)
+
+            # Shards are processed one after another to keep the extra write load flat
+            for shard in range(len(SHARD_PATHS)):
+                self.status["shard"] = shard
+
+                self.status["step"] = "creation_logs"
+                await self._delete_expired_logs(progress, shard)
+
+                self.status["step"] = "archive_pages"
+                await self._archive_deleted_pages(progress, shard)
+
+                self.status["step"] = "page_stats"
+                await self._delete_expired_page_stats(progress, shard)
+
+                self.status["step"] = "incremental_vacuum"
+                await self._incremental_vacuum(progress, shard)
+
+            duration = time.time() - started
+            metrics.observe("maintenance_duration_seconds", duration)
+            metrics.set("maintenance_last_run_timestamp", time.time())
+            self.status.update(state="idle", step=None, shard=None, last_run={**progress, "finished_at": time.time(), "duration_seconds": round(duration, 3)})
+            return self.status["last_run"]
+
+    async def _delete_expired_logs(self, progress: dict, shard: int):
+        if CREATION_LOG_RETENTION_DAYS <= 0:
+            return
+        cutoff = f"-{CREATION_LOG_RETENTION_DAYS} days"
+        while True:
+            deleted = await execute_update(
+                """
+                DELETE FROM creation_logs WHERE id IN (
+                    SELECT id FROM creation_logs WHERE created_at < datetime('now', ?) LIMIT ?
+                )
+                """,
+                (cutoff, MAINTENANCE_BATCH_SIZE),
+                shard=shard
+            )
+            progress["creation_logs_deleted"] += deleted
+            metrics.inc("maintenance_rows_deleted_total", deleted, table="creation_logs")
+            if deleted < MAINTENANCE_BATCH_SIZE:
+                return
+            await self._pause()
+
+    async def _delete_expired_page_stats(self, progress: dict, shard: int):
+        # No index on day (every rollup would pay for it); each batch scans until it finds enough rows
+        cutoff = f"-{PAGE_STATS_MAX_DAYS} days"
+        while True:
+            deleted = await execute_update(
+                """
+                DELETE FROM page_stats_daily WHERE (page_id, day) IN (
+                    SELECT page_id, day FROM page_stats_daily WHERE day < date('now', ?) LIMIT ?
+                )
+                """,
+                (cutoff, MAINTENANCE_BATCH_SIZE),
+                shard=shard
+            )
+            progress["page_stats_deleted"] += deleted
+            metrics.inc("maintenance_rows_deleted_total", deleted, table="page_stats_daily")
+            if deleted < MAINTENANCE_BATCH_SIZE:
+                return
+            await self._pause()
+
+    async def _archive_deleted_pages(self, progress: dict, shard: int):
+        if PAGE_ARCHIVE_GRACE_DAYS < 0:
+            return
+        cutoff = f"-{PAGE_ARCHIVE_GRACE_DAYS} days"
+        while True:
+            rows = await execute_query(
+                "SELECT id FROM pages WHERE is_active = 0 AND deleted_at < datetime('now', ?) LIMIT ?",
+                (cutoff, MAINTENANCE_BATCH_SIZE),
+                shard=shard,
+                row_format="tuple"
+            )
+            if not rows:
+                return
+
+            ids = tuple(row[0] for row in rows)
+            placeholders = ", ".join("?" * len(ids))
+            await execute_transaction([
+                (
+                    f"INSERT OR REPLACE INTO pages_archive ({ARCHIVE_COLUMNS}) "
+                    f"SELECT {ARCHIVE_COLUMNS} FROM pages WHERE id IN ({placeholders}) AND is_active = 0",
+                    ids,
+                ),
+                (f"DELETE FROM pages WHERE id IN ({placeholders}) AND is_active = 0", ids),
+                (f"DELETE FROM page_stats_daily WHERE page_id IN ({placeholders})", ids),
+            ], shard=shard)
+            progress["pages_archived"] += len(ids)
+            metrics.inc("maintenance_rows_deleted_total", len(ids), table="pages")
+            if len(ids) < MAINTENANCE_BATCH_SIZE:
+                return
+            await self._pause()
+
+    async def _incremental_vacuum(self, progress: dict, shard: int):
+        async with get_db(shard) as db:
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            (mode,) = await cursor.fetchone()
+            if mode != 2:
+                self.status["vacuum"] = (
+                    "skipped: database was created without auto_vacuum=INCREMENTAL; "
+                    "run `python -m app.services.maintenance --enable-incremental-vacuum` during a quiet window"
+                )
+                return
+            cursor = await db.execute("PRAGMA page_size")
+            (page_size,) = await cursor.fetchone()
+
+        while True:
+            async with get_db(shard) as db:
+                cursor = await db.execute("PRAGMA freelist_count")
+                (before,) = await cursor.fetchone()
+                if before == 0:
+                    return
+                cursor = await db.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+                await cursor.fetchall()
+                await db.commit()
+                cursor = await db.execute("PRAGMA freelist_count")
+                (after,) = await cursor.fetchone()
+
+            reclaimed = before - after
+            progress["vacuum_pages_reclaimed"] += reclaimed
+            progress["vacuum_bytes_reclaimed"] += reclaimed * page_size
+            metrics.inc("maintenance_vacuum_bytes_reclaimed_total", reclaimed * page_size)
+            if reclaimed == 0 or after == 0:
+                return
+            await self._pause()
+
+
+# Global maintenance job instance
+maintenance_job = MaintenanceJob()
+
+
+async def _enable_incremental_vacuum():
+    """One-off conversion of an existing database; VACUUM rewrites the file and blocks writers meanwhile."""
+    for shard, path in enumerate(SHARD_PATHS):
+        async with get_db(shard) as db:
+            await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await db.execute("VACUUM")
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            (mode,) = await cursor.fetchone()
+        print(f"{path}: auto_vacuum is now {mode} (2 = incremental)")
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Database retention and compaction")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convert the database to auto_vacuum=INCREMENTAL (rewrites the file)")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        asyncio.run(_enable_incremental_vacuum())
+    else:
+        print(json.dumps(asyncio.run(maintenance_job.run_once()), indent=2))
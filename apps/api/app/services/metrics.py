@@ -0,0 +1,118 @@
+"""
+In-process metrics registry (one per worker), served on the admin metrics endpoint.
+"""
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+class Histogram:
+    """Running count/sum/max plus a bounded window of recent values for percentiles."""
+
+    __slots__ = ("count", "sum", "max", "recent")
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+        }
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms keyed by name and labels. Safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def get(self, name: str, **labels) -> Optional[float]:
+        """Current value of a counter or gauge, if set."""
+        key = _key(name, labels)
+        return self._counters.get(key, self._gauges.get(key))
+
+    def snapshot(self) -> dict:
+        def render(key: tuple) -> str:
+            name, labels = key
+            if not labels:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+        with self._lock:
+            return {
+                "counters": {render(k): v for k, v in sorted(self._counters.items())},
+                "gauges": {render(k): v for k, v in sorted(self._gauges.items())},
+                "histograms": {render(k): h.summary() for k, h in sorted(self._histograms.items())},
+            }
+
+    def prometheus(self) -> str:
+        """Render in the Prometheus text exposition format (histograms as summaries)."""
+        def labels_text(labels: tuple, extra: tuple = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{labels_text(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                lines.append(f"{name}{labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                for quantile in (50, 95, 99):
+                    q = (("quantile", quantile / 100),)
+                    lines.append(f"{name}{labels_text(labels, q)} {histogram.percentile(quantile)}")
+                lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+                lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
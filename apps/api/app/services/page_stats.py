@@ -0,0 +1,174 @@
+"""
+Per-page view analytics: views per UTC hour and unique viewers per UTC day.
+
+Views of the current day are counted in Redis (cache DB):
+- stats:views:{page_id}:{day}  hash of hour -> views
+- stats:uniq:{page_id}:{day}   HyperLogLog of hashed viewer IPs (12KB at most)
+- stats:pages:{day}            set of "{page_id}:{slug}" viewed that day
+The rollup job copies each day's numbers into page_stats_daily every
+PAGE_STATS_ROLLUP_SECONDS. Once a day is over and rolled up, its keys are
+dropped, so Redis holds one HyperLogLog and one small hash per viewed page.
+One worker per host runs the rollup (elected with a file lock).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from ..config import DATABASE_PATH, PAGE_STATS_ROLLUP_SECONDS
+from ..db.database import try_lock_file
+from ..db.repository import page_repository
+from .metrics import metrics
+from .redis_client import redis_client
+from .timing import timed
+
+# Safety net: keys of a day the rollup never got to expire on their own
+KEY_TTL_SECONDS = 3 * 86400
+
+# Pages read from Redis per pipeline during a rollup
+ROLLUP_BATCH_SIZE = 500
+
+
+def views_key(page_id: int, day: str) -> str:
+    return f"stats:views:{page_id}:{day}"
+
+
+def uniq_key(page_id: int, day: str) -> str:
+    return f"stats:uniq:{page_id}:{day}"
+
+
+def pages_key(day: str) -> str:
+    return f"stats:pages:{day}"
+
+
+def utc_day(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+def empty_day(day: str) -> dict:
+    return {"date": day, "views": 0, "unique_viewers": 0, "hourly": [0] * 24}
+
+
+class PageStats:
+    """Records views in Redis and rolls them up into SQLite."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._leader_lock = None
+
+    async def record_view(self, page_id: int, slug: str, viewer_hash: str):
+        """Count a view and its viewer for the current hour and day."""
+        now = datetime.now(timezone.utc)
+        day = utc_day(now)
+        try:
+            pipe = redis_client.cache.pipeline(transaction=False)
+            pipe.hincrby(views_key(page_id, day), str(now.hour), 1)
+            pipe.expire(views_key(page_id, day), KEY_TTL_SECONDS)
+            pipe.pfadd(uniq_key(page_id, day), viewer_hash)
+            pipe.expire(uniq_key(page_id, day), KEY_TTL_SECONDS)
+            pipe.sadd(pages_key(day), f"{page_id}:{slug.lower()}")
+            pipe.expire(pages_key(day), KEY_TTL_SECONDS)
+            with timed("cache", redis_round_trips=1):
+                await pipe.execute()
+        except Exception as e:
+            print(f"Page stats error for page {page_id}: {e}")
+
+    async def _read_days(self, keys: list[tuple[int, str]]) -> list[dict]:
+        """Live numbers for (page_id, day) pairs, one pipeline round trip."""
+        pipe = redis_client.cache.pipeline(transaction=False)
+        for page_id, day in keys:
+            pipe.hgetall(views_key(page_id, day))
+            pipe.pfcount(uniq_key(page_id, day))
+        with timed("cache", redis_round_trips=1):
+            results = await pipe.execute()
+
+        days = []
+        for index, (_, day) in enumerate(keys):
+            counts, uniques = results[2 * index], results[2 * index + 1]
+            hourly = [int(counts.get(str(hour), 0)) for hour in range(24)]
+            days.append({"date": day, "views": sum(hourly), "unique_viewers": uniques, "hourly": hourly})
+        return days
+
+    async def report(self, page: dict, days: int) -> dict:
+        """Today's live numbers and the rolled-up history for the last `days` days."""
+        today = utc_day(datetime.now(timezone.utc))
+        since = utc_day(datetime.now(timezone.utc) - timedelta(days=days - 1))
+        history = {
+            row["day"]: {"date": row["day"], "views": row["views"], "unique_viewers": row["unique_viewers"], "hourly": row["hourly"]}
+            for row in await page_repository.daily_stats(page["slug"], page["id"], since)
+        }
+
+        try:
+            live = (await self._read_days([(page["id"], today)]))[0]
+        except Exception as e:
+            # Fall back to the last rollup
+            print(f"Page stats error for page {page['id']}: {e}")
+            live = None
+        rolled = history.get(today)
+        if live and (not rolled or live["views"] >= rolled["views"]):
+            history[today] = live
+        history.setdefault(today, empty_day(today))
+
+        return {
+            "slug": page["slug"],
+            "total_views": page["view_count"],
+            "today": history[today],
+            "days": [history[day] for day in sorted(history, reverse=True)],
+        }
+
+    async def rollup(self) -> int:
+        """Copy yesterday's and today's numbers into SQLite, then drop yesterday's keys. Returns rows written."""
+        now = datetime.now(timezone.utc)
+        written = 0
+        for day, finished in ((utc_day(now - timedelta(days=1)), True), (utc_day(now), False)):
+            with timed("cache", redis_round_trips=1):
+                members = list(await redis_client.cache.smembers(pages_key(day)))
+            for start in range(0, len(members), ROLLUP_BATCH_SIZE):
+                batch = [member.split(":", 1) for member in members[start:start + ROLLUP_BATCH_SIZE]]
+                live = await self._read_days([(int(page_id), day) for page_id, _ in batch])
+                await page_repository.save_daily_stats([
+                    {"slug": slug, "page_id": int(page_id), "day": day, "views": stats["views"],
+                     "unique_viewers": stats["unique_viewers"], "hourly": stats["hourly"]}
+                    for (page_id, slug), stats in zip(batch, live)
+                ])
+                written += len(batch)
+                if finished:
+                    keys = [key for page_id, _ in batch for key in (views_key(page_id, day), uniq_key(page_id, day))]
+                    with timed("cache", redis_round_trips=1):
+                        await redis_client.cache.delete(*keys)
+            if finished and members:
+                with timed("cache", redis_round_trips=1):
+                    await redis_client.cache.delete(pages_key(day))
+        metrics.inc("page_stats_rows_rolled_up_total", written)
+        return written
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._leader_lock:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(PAGE_STATS_ROLLUP_SECONDS)
+            # Re-try every interval so another worker takes over if the leader exits
+            if self._leader_lock is None:
+                self._leader_lock = await asyncio.to_thread(try_lock_file, f"{DATABASE_PATH}.stats.lock")
+                if self._leader_lock is None:
+                    continue
+            try:
+                await self.rollup()
+            except Exception as e:
+                metrics.inc("page_stats_rollup_failures_total")
+                print(f"Page stats rollup error: {e}")
+
+
+# Global page stats instance
+page_stats = PageStats()
@@ -0,0 +1,177 @@
+"""
+On-demand sampling CPU profiler and tracemalloc snapshot diffs.
+Nothing here runs until explicitly started, so there is no cost when unused.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from ..config import PROFILE_INTERVAL_MS
+
+
+def _frame_label(code, cache: dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+        label = f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+        cache[code] = label
+    return label
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (the event loop thread) from a background
+    thread at a fixed interval and aggregates them as collapsed stacks, the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._labels: dict = {}
+        self._target_ident: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._users = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, target_ident: Optional[int] = None):
+        """Start sampling the given thread (default: the calling thread)."""
+        if self._thread is not None:
+            return
+        self._target_ident = target_ident or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def acquire(self):
+        """Reference-counted start, for profiling while any sampled request is in flight."""
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                self.start(threading.get_ident())
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self.stop()
+
+    def reset(self):
+        self.stacks = Counter()
+        self.samples = 0
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_ident)
+            if frame is None or self._target_ident == own_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code, self._labels))
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Render samples as collapsed stacks: 'root;child;leaf count' per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+
+def profile_for(seconds: float, interval: float, output_dir: str, target_ident: int) -> threading.Thread:
+    """Profile a thread for a fixed time in the background and write the result to a file."""
+    def run():
+        profiler = SamplingProfiler(interval)
+        profiler.start(target_ident)
+        time.sleep(seconds)
+        profiler.stop()
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"cpu.{os.getpid()}.{int(time.time())}.collapsed")
+        profiler.write(path)
+        print(f"Profile written to {path} ({profiler.samples} samples)")
+
+    thread = threading.Thread(target=run, name="timed-profiler", daemon=True)
+    thread.start()
+    return thread
+
+
+class MemoryProfiler:
+    """tracemalloc wrapper that diffs each snapshot against the previous one."""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._previous = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self._previous = None
+        tracemalloc.stop()
+
+    def snapshot_diff(self, limit: int = 25, group_by: str = "lineno") -> dict:
+        """Top allocation growth since the previous snapshot; the new snapshot becomes the baseline."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self._previous = self._previous, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+
+        if previous is None:
+            stats = snapshot.statistics(group_by)[:limit]
+            top = [
+                {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in stats
+            ]
+        else:
+            stats = snapshot.compare_to(previous, group_by)[:limit]
+            top = [
+                {
+                    "location": str(stat.traceback),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats
+            ]
+
+        return {
+            "pid": os.getpid(),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "diff": previous is not None,
+            "top": top,
+        }
+
+
+# Global instances
+request_profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000)
+memory_profiler = MemoryProfiler()
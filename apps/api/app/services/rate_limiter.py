@@ -1,12 +1,18 @@
 """
-Redis-based rate limiter using sliding window algorithm.
+Redis-based rate limiter using sliding window algorithm, plus a per-IP compute
+budget: requests reserve an estimated cost before they run and are settled to
+the work they actually did afterwards.
 """
 import hashlib
 import time
 from typing import Optional
 
 from .redis_client import redis_client
-from ..config import RATE_LIMIT_PAGES_PER_HOUR, RATE_LIMIT_SLUG_CHECKS_PER_MINUTE
+from .timing import timed
+from ..config import RATE_LIMIT_PAGES_PER_HOUR, RATE_LIMIT_SLUG_CHECKS_PER_MINUTE, COMPUTE_BUDGET_PER_MINUTE
+
+# Compute budget window
+BUDGET_WINDOW_SECONDS = 60
 
 
 class RedisRateLimiter:
@@ -48,14 +54,16 @@ class RedisRateLimiter:
             pipe.zcard(key)
 
             # Execute pipeline
-            results = await pipe.execute()
+            with timed("ratelimit", redis_round_trips=1):
+                results = await pipe.execute()
             current_count = results[1]
 
             if current_count >= max_requests:
                 # Get oldest timestamp in window to calculate retry_after
-                oldest_members = await redis_client.rate_limit.zrange(
-                    key, 0, 0, withscores=True
-                )
+                with timed("ratelimit", redis_round_trips=1):
+                    oldest_members = await redis_client.rate_limit.zrange(
+                        key, 0, 0, withscores=True
+                    )
                 if oldest_members:
                     oldest_timestamp = oldest_members[0][1]
                     retry_after = int(oldest_timestamp + window_seconds - now) + 1
@@ -64,10 +72,12 @@ class RedisRateLimiter:
                     return False, window_seconds
 
             # Add current request
-            await redis_client.rate_limit.zadd(key, {str(now): now})
+            with timed("ratelimit", redis_round_trips=1):
+                await redis_client.rate_limit.zadd(key, {str(now): now})
 
             # Set expiry (window + buffer for cleanup)
-            await redis_client.rate_limit.expire(key, window_seconds + 60)
+            with timed("ratelimit", redis_round_trips=1):
+                await redis_client.rate_limit.expire(key, window_seconds + 60)
 
             return True, None
 
@@ -94,6 +104,68 @@ class RedisRateLimiter:
             60  # 1 minute
         )
 
+    def _budget_keys(self, ip: str, now: float) -> tuple[str, str, float]:
+        """Keys of the current and previous budget windows, and how far into the current one we are (0-1)."""
+        ip_hash = self._hash_ip(ip)
+        window = int(now // BUDGET_WINDOW_SECONDS)
+        elapsed = (now % BUDGET_WINDOW_SECONDS) / BUDGET_WINDOW_SECONDS
+        return f"budget:{ip_hash}:{window}", f"budget:{ip_hash}:{window - 1}", elapsed
+
+    async def reserve(
+        self,
+        ip: str,
+        cost: int,
+        at: float,
+        limit: int = COMPUTE_BUDGET_PER_MINUTE
+    ) -> tuple[bool, Optional[int]]:
+        """
+        Take `cost` units of the IP's compute budget up front, before the work
+        runs. Returns (is_allowed, retry_after_seconds); a rejected reservation
+        is handed back.
+
+        Sliding window counter: cost spent in the current minute plus the
+        previous minute's cost weighted by how much of it is still in the window.
+        - Key: budget:{ip_hash}:{minute}
+        - Value: cost units charged or reserved in that minute
+
+        The INCRBY is atomic, so concurrent requests see each other's
+        reservations: once the budget is spent, no more work starts, and
+        requests in flight can overrun it by at most their own reservation.
+        """
+        current_key, previous_key, elapsed = self._budget_keys(ip, at)
+        try:
+            pipe = redis_client.rate_limit.pipeline()
+            pipe.incrby(current_key, cost)
+            pipe.expire(current_key, BUDGET_WINDOW_SECONDS * 2 + 60)
+            pipe.get(previous_key)
+            with timed("ratelimit", redis_round_trips=1):
+                current, _, previous = await pipe.execute()
+
+            used_before = int(current) - cost + int(previous or 0) * (1 - elapsed)
+            if used_before >= limit:
+                with timed("ratelimit", redis_round_trips=1):
+                    await redis_client.rate_limit.incrby(current_key, -cost)
+                # The previous minute's share keeps shrinking; the current one resets at the next minute
+                return False, max(1, int((1 - elapsed) * BUDGET_WINDOW_SECONDS) + 1)
+            return True, None
+
+        except Exception as e:
+            # Fail open, like the request limits
+            print(f"Rate limiter error: {e}")
+            return True, None
+
+    async def charge(self, ip: str, cost: int, at: float):
+        """Add `cost` (negative to refund) to the budget window that was current at `at`."""
+        current_key, _, _ = self._budget_keys(ip, at)
+        try:
+            pipe = redis_client.rate_limit.pipeline()
+            pipe.incrby(current_key, cost)
+            pipe.expire(current_key, BUDGET_WINDOW_SECONDS * 2 + 60)
+            with timed("ratelimit", redis_round_trips=1):
+                await pipe.execute()
+        except Exception as e:
+            print(f"Rate limiter error: {e}")
+
 
 # Global rate limiter instance
 rate_limiter = RedisRateLimiter()
@@ -1,10 +1,158 @@
 """
 Redis client service with separate DB namespaces for different concerns.
+
+Every namespace has connect/command timeouts, a blocking pool with a bounded
+checkout wait, and a circuit breaker. While a breaker is open, commands fail
+at once with CircuitOpenError (a redis ConnectionError, so callers' existing
+fail-open handling applies) instead of waiting on a degraded server.
 """
+import asyncio
+import inspect
+import time
 from redis import asyncio as aioredis
-from typing import Optional
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError, TimeoutError as RedisTimeoutError
+from typing import Any, Optional
 import os
 
+from ..config import (
+    REDIS_CONNECT_TIMEOUT_MS,
+    REDIS_COMMAND_TIMEOUT_MS,
+    REDIS_POOL_TIMEOUT_MS,
+    REDIS_BREAKER_FAILURES,
+    REDIS_BREAKER_RESET_SECONDS,
+    REDIS_AUTO_PIPELINE,
+)
+from .auto_pipeline import AutoPipeline
+from .metrics import metrics
+
+# Errors that mean Redis is unreachable or too slow (as opposed to a command error)
+AVAILABILITY_ERRORS = (RedisConnectionError, RedisTimeoutError, asyncio.TimeoutError, OSError)
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(RedisConnectionError):
+    """Raised instead of calling Redis while the namespace's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failures` availability errors in a row it
+    opens and rejects calls for `reset_seconds`, then lets a single probe
+    through (half-open); the probe's outcome closes or reopens it.
+    """
+
+    def __init__(self, name: str, failures: int = REDIS_BREAKER_FAILURES,
+                 reset_seconds: float = REDIS_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        metrics.set("redis_circuit_state", 0, namespace=name)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            metrics.set("redis_circuit_state", BREAKER_STATES[state], namespace=self.name)
+            metrics.inc("redis_circuit_transitions_total", namespace=self.name, state=state)
+            print(f"Redis {self.name} circuit {state}")
+
+    def allow(self) -> bool:
+        """Whether a call may go to Redis now."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._transition("half_open")
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        metrics.inc("redis_circuit_rejected_total", namespace=self.name)
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.probing = False
+        self._transition("closed")
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+            self._transition("open")
+
+    def abandon(self):
+        """A call ended without an outcome (cancelled); let the next one probe."""
+        self.probing = False
+
+    async def guard(self, awaitable):
+        """Await a Redis call, recording its outcome; rejects it while open."""
+        if not self.allow():
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()
+            raise CircuitOpenError(f"Redis {self.name} circuit is open")
+        try:
+            result = await awaitable
+        except AVAILABILITY_ERRORS:
+            self.record_failure()
+            raise
+        except RedisError:
+            # The server answered, just not with a result
+            self.record_success()
+            raise
+        except BaseException:
+            self.abandon()
+            raise
+        self.record_success()
+        return result
+
+
+class GuardedRedis:
+    """Proxy that sends every command (and pipeline execute) through a circuit breaker."""
+
+    def __init__(self, client: Any, breaker: CircuitBreaker, is_pipeline: bool = False):
+        self.client = client
+        self._breaker = breaker
+        self._is_pipeline = is_pipeline
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        breaker = self._breaker
+
+        if self._is_pipeline:
+            # Queued pipeline commands return the (awaitable) pipeline; only execute talks to Redis
+            if name != "execute":
+                return attr
+            return lambda *args, **kwargs: breaker.guard(attr(*args, **kwargs))
+
+        def command(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name == "pipeline":
+                return GuardedRedis(result, breaker, is_pipeline=True)
+            if inspect.isawaitable(result):
+                return breaker.guard(result)
+            return result
+
+        return command
+
+
+class TimedConnectionPool(aioredis.BlockingConnectionPool):
+    """Blocking pool that records how long each checkout waited for a free connection."""
+
+    namespace = "redis"
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            metrics.observe("redis_pool_wait_seconds", time.perf_counter() - start, namespace=self.namespace)
+
 
 class RedisClient:
     """Centralized Redis connection manager with separate DB namespaces."""
@@ -13,64 +161,70 @@ class RedisClient:
         self._rate_limit_client: Optional[aioredis.Redis] = None
         self._cache_client: Optional[aioredis.Redis] = None
         self._queue_client: Optional[aioredis.Redis] = None
+        self.breakers = {name: CircuitBreaker(name) for name in ("rate_limit", "cache", "queue")}
+        self._wrapped: dict[str, tuple[Any, Any]] = {}  # namespace -> (raw client, wrapper)
+
+    def _create_client(self, url: str, namespace: str, max_connections: int) -> aioredis.Redis:
+        pool = TimedConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            timeout=REDIS_POOL_TIMEOUT_MS / 1000,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT_MS / 1000,
+            socket_timeout=REDIS_COMMAND_TIMEOUT_MS / 1000,
+            encoding="utf-8",
+            decode_responses=True,
+        )
+        pool.namespace = namespace
+        return aioredis.Redis(connection_pool=pool)
 
     async def connect(self):
         """Establish connections to Redis with separate DB namespaces."""
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 
         # DB 0: Rate limiting (needs fast access, can be volatile)
-        self._rate_limit_client = await aioredis.from_url(
-            f"{redis_url}/0",
-            encoding="utf-8",
-            decode_responses=True,
-            max_connections=20
-        )
+        self._rate_limit_client = self._create_client(f"{redis_url}/0", "rate_limit", max_connections=20)
 
         # DB 1: Caching (TTL-based, can be volatile)
-        self._cache_client = await aioredis.from_url(
-            f"{redis_url}/1",
-            encoding="utf-8",
-            decode_responses=True,
-            max_connections=20
-        )
+        self._cache_client = self._create_client(f"{redis_url}/1", "cache", max_connections=20)
 
         # DB 2: Queue system (used by RQ)
-        self._queue_client = await aioredis.from_url(
-            f"{redis_url}/2",
-            encoding="utf-8",
-            decode_responses=True,
-            max_connections=10
-        )
+        self._queue_client = self._create_client(f"{redis_url}/2", "queue", max_connections=10)
 
     async def close(self):
         """Close all Redis connections."""
-        if self._rate_limit_client:
-            await self._rate_limit_client.close()
-        if self._cache_client:
-            await self._cache_client.close()
-        if self._queue_client:
-            await self._queue_client.close()
+        for client in (self._rate_limit_client, self._cache_client, self._queue_client):
+            if client:
+                await client.close()
+                # Pools passed in explicitly are not closed by the client
+                if getattr(client, "connection_pool", None) is not None:
+                    await client.connection_pool.disconnect()
+
+    def _namespace(self, name: str, client: Optional[aioredis.Redis]):
+        if not client:
+            raise RuntimeError("Redis client not initialized. Call connect() first.")
+        cached = self._wrapped.get(name)
+        if cached is None or cached[0] is not client:
+            wrapper = GuardedRedis(client, self.breakers[name])
+            if REDIS_AUTO_PIPELINE:
+                # Outside the breaker, so one check covers a whole batch
+                wrapper = AutoPipeline(wrapper, name)
+            cached = self._wrapped[name] = (client, wrapper)
+        return cached[1]
 
     @property
     def rate_limit(self) -> aioredis.Redis:
         """Redis client for rate limiting operations."""
-        if not self._rate_limit_client:
-            raise RuntimeError("Redis client not initialized. Call connect() first.")
-        return self._rate_limit_client
+        return self._namespace("rate_limit", self._rate_limit_client)
 
     @property
     def cache(self) -> aioredis.Redis:
         """Redis client for caching operations."""
-        if not self._cache_client:
-            raise RuntimeError("Redis client not initialized. Call connect() first.")
-        return self._cache_client
+        return self._namespace("cache", self._cache_client)
 
     @property
     def queue(self) -> aioredis.Redis:
         """Redis client for queue operations."""
-        if not self._queue_client:
-            raise RuntimeError("Redis client not initialized. Call connect() first.")
-        return self._queue_client
+        return self._namespace("queue", self._queue_client)
 
 
 # Global instance
@@ -0,0 +1,97 @@
+"""
+Short-lived slug leases in Redis (SET NX PX).
+
+A lease marks a slug as claimed: by a visitor who reserved it while filling
+in the form (POST /api/slugs/lease/{slug}), or by a page creation in flight.
+Creation takes or renews the lease instead of re-checking the database; the
+unique index on active slugs settles anything that gets past it. When Redis
+is unavailable, leases fail open and the index alone protects the slug.
+"""
+import secrets
+from typing import Optional
+
+from ..config import SLUG_LEASE_TTL_SECONDS
+from .metrics import metrics
+from .redis_client import redis_client
+from .timing import timed
+
+# Take the lease if it is free, or extend it if the caller already holds it
+RENEW_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+# Delete the lease only if the caller still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def lease_key(slug: str) -> str:
+    return f"slug_lease:{slug.lower()}"
+
+
+class SlugLeaseService:
+    """Atomic slug leases on the cache Redis DB."""
+
+    async def acquire(self, slug: str, lease_token: Optional[str] = None,
+                      ttl_seconds: float = SLUG_LEASE_TTL_SECONDS) -> Optional[str]:
+        """
+        Lease a slug for ttl_seconds and return the lease token, or None if
+        someone else holds it. Passing the token of a lease you hold renews it.
+        """
+        token = lease_token or secrets.token_urlsafe(16)
+        ttl_ms = int(ttl_seconds * 1000)
+        try:
+            with timed("cache", redis_round_trips=1):
+                if lease_token:
+                    taken = await redis_client.cache.eval(RENEW_SCRIPT, 1, lease_key(slug), token, ttl_ms)
+                else:
+                    taken = await redis_client.cache.set(lease_key(slug), token, px=ttl_ms, nx=True)
+        except Exception as e:
+            print(f"Slug lease error for {slug}: {e}")
+            metrics.inc("slug_leases_total", result="error")
+            return token
+
+        if not taken:
+            metrics.inc("slug_leases_total", result="conflict")
+            return None
+        metrics.inc("slug_leases_total", result="renewed" if lease_token else "acquired")
+        return token
+
+    async def is_free(self, slug: str, lease_token: Optional[str] = None) -> bool:
+        """True if nobody holds a lease on the slug, or the caller does."""
+        try:
+            with timed("cache", redis_round_trips=1):
+                holder = await redis_client.cache.get(lease_key(slug))
+        except Exception as e:
+            print(f"Slug lease error for {slug}: {e}")
+            return True
+        return holder is None or holder == lease_token
+
+    async def release(self, slug: str, lease_token: str):
+        """Give a lease back so the slug can be taken again right away."""
+        try:
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.eval(RELEASE_SCRIPT, 1, lease_key(slug), lease_token)
+        except Exception as e:
+            print(f"Slug lease error for {slug}: {e}")
+
+    async def clear(self, slug: str):
+        """Drop any lease on a slug that now belongs to a page."""
+        try:
+            with timed("cache", redis_round_trips=1):
+                await redis_client.cache.delete(lease_key(slug))
+        except Exception as e:
+            print(f"Slug lease error for {slug}: {e}")
+
+
+# Global slug lease service instance
+slug_leases = SlugLeaseService()
@@ -1,5 +1,6 @@
 import re
 import random
+import asyncio
 from typing import Optional
 
 from ..config import (
@@ -8,9 +9,11 @@ from ..config import (
     SLUG_PATTERN,
     RESERVED_SLUGS,
 )
-from ..db.database import execute_query
+from ..db.repository import page_repository
 from .cache_service import cache_service
 
+TAKEN_REASON = "This slug is already taken"
+
 
 def validate_slug_format(slug: str) -> tuple[bool, Optional[str]]:
     """Validate slug format. Returns (is_valid, error_message)."""
@@ -33,11 +36,19 @@ def is_reserved_slug(slug: str) -> bool:
 
 async def is_slug_taken(slug: str) -> bool:
     """Check if slug is already used in the database."""
-    result = await execute_query(
-        "SELECT 1 FROM pages WHERE slug_lower = ? AND is_active = 1",
-        (slug.lower(),)
-    )
-    return len(result) > 0
+    return await page_repository.slug_exists(slug)
+
+
+def check_slug_rules(slug: str) -> tuple[bool, Optional[str]]:
+    """Format and reserved-word checks only (no I/O). Returns (is_valid, error_message)."""
+    is_valid, error = validate_slug_format(slug)
+    if not is_valid:
+        return False, error
+
+    if is_reserved_slug(slug):
+        return False, "This slug is reserved"
+
+    return True, None
 
 
 async def check_slug_availability(slug: str) -> tuple[bool, Optional[str]]:
@@ -46,15 +57,11 @@ async def check_slug_availability(slug: str) -> tuple[bool, Optional[str]]:
     Returns (is_available, reason_if_not_available).
     Uses caching to reduce database queries.
     """
-    # Format validation (no caching needed)
-    is_valid, error = validate_slug_format(slug)
+    # Format and reserved checks (no caching needed)
+    is_valid, error = check_slug_rules(slug)
     if not is_valid:
         return False, error
 
-    # Reserved check (no caching needed)
-    if is_reserved_slug(slug):
-        return False, "This slug is reserved"
-
     # Check cache first
     cache_key = f"slug_available:{slug.lower()}"
     cached_result = await cache_service.get(cache_key)
@@ -64,7 +71,7 @@ async def check_slug_availability(slug: str) -> tuple[bool, Optional[str]]:
 
     # Database check
     is_taken = await is_slug_taken(slug)
-    result = (not is_taken, "This slug is already taken" if is_taken else None)
+    result = (not is_taken, TAKEN_REASON if is_taken else None)
 
     # Cache the result for 60 seconds
     await cache_service.set(
@@ -76,6 +83,20 @@ async def check_slug_availability(slug: str) -> tuple[bool, Optional[str]]:
     return result
 
 
+async def collect_available(candidates: list[str], suggestions: list[str], count: int):
+    """
+    Append available candidates, in order, until there are count suggestions.
+    Candidates are checked concurrently in batches of the number still
+    missing, so lookups fan out across shards without checking extra slugs.
+    """
+    index = 0
+    while len(suggestions) < count and index < len(candidates):
+        batch = candidates[index:index + count - len(suggestions)]
+        index += len(batch)
+        results = await asyncio.gather(*(check_slug_availability(candidate) for candidate in batch))
+        suggestions.extend(candidate for candidate, (available, _) in zip(batch, results) if available)
+
+
 async def generate_suggestions(base_slug: str, count: int = 5) -> list[str]:
     """Generate alternative slug suggestions."""
     suggestions = []
@@ -86,31 +107,25 @@ async def generate_suggestions(base_slug: str, count: int = 5) -> list[str]:
         clean_base = "love"
 
     # Strategy 1: Append numbers
-    for i in range(1, 100):
-        candidate = f"{clean_base}-{i}"
-        available, _ = await check_slug_availability(candidate)
-        if available:
-            suggestions.append(candidate)
-            if len(suggestions) >= count:
-                return suggestions
+    await collect_available([f"{clean_base}-{i}" for i in range(1, 100)], suggestions, count)
+    if len(suggestions) >= count:
+        return suggestions
 
     # Strategy 2: Add romantic prefixes/suffixes
     romantic_words = ["love", "heart", "sweet", "dear", "my", "xoxo", "forever"]
-    for word in romantic_words:
-        for candidate in [f"{word}-{clean_base}", f"{clean_base}-{word}"]:
-            if len(candidate) <= MAX_SLUG_LENGTH:
-                available, _ = await check_slug_availability(candidate)
-                if available:
-                    suggestions.append(candidate)
-                    if len(suggestions) >= count:
-                        return suggestions
+    candidates = [
+        candidate
+        for word in romantic_words
+        for candidate in [f"{word}-{clean_base}", f"{clean_base}-{word}"]
+        if len(candidate) <= MAX_SLUG_LENGTH
+    ]
+    await collect_available(candidates, suggestions, count)
+    if len(suggestions) >= count:
+        return suggestions
 
     # Strategy 3: Random suffixes
     while len(suggestions) < count:
-        random_num = random.randint(100, 9999)
-        candidate = f"{clean_base}-{random_num}"
-        available, _ = await check_slug_availability(candidate)
-        if available:
-            suggestions.append(candidate)
+        candidates = [f"{clean_base}-{random.randint(100, 9999)}" for _ in range(count - len(suggestions))]
+        await collect_available(candidates, suggestions, count)
 
     return suggestions[:count]
@@ -0,0 +1,120 @@
+"""
+Request-scoped timing context used to build the Server-Timing response header.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestTimings:
+    """Accumulates per-segment durations and round-trip counts for one request."""
+
+    __slots__ = ("start", "durations", "db_round_trips", "redis_round_trips")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations: dict[str, float] = {}
+        self.db_round_trips = 0
+        self.redis_round_trips = 0
+
+    def add(self, name: str, elapsed: float, db_round_trips: int = 0, redis_round_trips: int = 0):
+        """Add elapsed seconds to a named segment."""
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed
+        self.db_round_trips += db_round_trips
+        self.redis_round_trips += redis_round_trips
+
+    def header_value(self) -> str:
+        """
+        Render the collected timings as a Server-Timing header value.
+        Durations are in milliseconds; round-trip counts go in the description.
+        """
+        parts = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in self.durations.items()]
+        parts.append(f'db-queries;desc="{self.db_round_trips}"')
+        parts.append(f'redis-calls;desc="{self.redis_round_trips}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Return the timings for the current request, or None when not collecting."""
+    return _current_timings.get()
+
+
+def start_request_timings() -> tuple[RequestTimings, object]:
+    """Begin collecting timings for the current context. Returns (timings, reset_token)."""
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def stop_request_timings(token: object):
+    """Stop collecting timings for the current context."""
+    _current_timings.reset(token)
+
+
+class timed:
+    """
+    Context manager that adds the time spent in its block to a named segment.
+    A no-op (single ContextVar lookup) when no request is being timed.
+
+        with timed("db", db_round_trips=1):
+            cursor = await db.execute(query, params)
+    """
+
+    __slots__ = ("name", "db_round_trips", "redis_round_trips", "_timings", "_start")
+
+    def __init__(self, name: str, db_round_trips: int = 0, redis_round_trips: int = 0):
+        self.name = name
+        self.db_round_trips = db_round_trips
+        self.redis_round_trips = redis_round_trips
+
+    def __enter__(self):
+        self._timings = _current_timings.get()
+        if self._timings is not None:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._timings is not None:
+            self._timings.add(
+                self.name,
+                time.perf_counter() - self._start,
+                self.db_round_trips,
+                self.redis_round_trips,
+            )
+        return False
+
+
+class count_work:
+    """
+    Counts the database round trips made inside its block, whether or not the
+    request is being timed for Server-Timing (used to charge compute budgets).
+
+        with count_work() as work:
+            suggestions = await generate_suggestions(slug)
+        cost = work.db_round_trips
+    """
+
+    __slots__ = ("_timings", "_token", "_base", "_end")
+
+    def __enter__(self):
+        self._timings = _current_timings.get()
+        self._token = None
+        if self._timings is None:
+            self._timings, self._token = start_request_timings()
+        self._base = self._timings.db_round_trips
+        self._end = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._end = self._timings.db_round_trips
+        if self._token is not None:
+            stop_request_timings(self._token)
+        return False
+
+    @property
+    def db_round_trips(self) -> int:
+        end = self._timings.db_round_trips if self._end is None else self._end
+        return end - self._base
@@ -0,0 +1,296 @@
+"""
+WAL checkpoint manager and online backups.
+
+SQLite's auto-checkpoint runs inside whichever connection happens to commit
+past the threshold, and can never reset the WAL while readers hold old
+snapshots, so under steady writes the -wal file keeps growing and reads slow
+down. This task watches the WAL and checkpoints on its own schedule:
+
+- PASSIVE once writes go quiet, or when the last checkpoint is overdue
+  (never waits on readers or writers)
+- RESTART after several PASSIVE runs in a row leave frames behind, so
+  readers move forward and writers start again at the top of the WAL
+- TRUNCATE when the file grows past WAL_SIZE_LIMIT_MB
+
+RESTART/TRUNCATE wait at most WAL_CHECKPOINT_BUSY_TIMEOUT_MS for readers.
+
+Backups use SQLite's backup API a few pages per step, each step a short read,
+so writers are never blocked. One worker per host runs the schedule; with
+DB_SHARDS > 1 every shard file is checkpointed and backed up on its own.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from .metrics import metrics
+from ..config import (
+    DATABASE_PATH,
+    WAL_CHECK_INTERVAL_SECONDS,
+    WAL_QUIET_SECONDS,
+    WAL_CHECKPOINT_MAX_INTERVAL_SECONDS,
+    WAL_SIZE_LIMIT_MB,
+    WAL_ESCALATE_AFTER,
+    WAL_CHECKPOINT_BUSY_TIMEOUT_MS,
+    BACKUP_INTERVAL_SECONDS,
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+    BACKUP_MAX_RESTARTS,
+)
+from ..db.database import try_lock_file, open_db, SHARD_PATHS
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+class _BackupRestarted(Exception):
+    """Raised from the progress callback to abandon a stepped backup."""
+
+
+def _backup_sync(source_path: str, dest_path: str, pages: int, sleep: float, max_restarts: int) -> dict:
+    """
+    Copy source_path to dest_path with the backup API.
+
+    Another connection writing to the source restarts a stepped backup, so a
+    busy database could keep it from ever finishing. After max_restarts the
+    copy is redone in a single step: in WAL mode that is one read
+    transaction, which writers do not wait on.
+    """
+    state = {"restarts": 0, "remaining": None, "steps": 0}
+
+    def progress(status, remaining, total):
+        state["steps"] += 1
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+
+    source = sqlite3.connect(source_path)
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            try:
+                source.backup(dest, pages=pages, progress=progress, sleep=sleep)
+                stepped = True
+            except _BackupRestarted:
+                source.backup(dest, pages=-1)
+                stepped = False
+            (page_count,) = dest.execute("PRAGMA page_count").fetchone()
+            (page_size,) = dest.execute("PRAGMA page_size").fetchone()
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+    return {
+        "pages": page_count,
+        "bytes": page_count * page_size,
+        "steps": state["steps"],
+        "restarts": state["restarts"],
+        "stepped": stepped,
+    }
+
+
+class WalManager:
+    """Background WAL checkpointing and scheduled backups."""
+
+    def __init__(self):
+        self.status: dict = {"leader": False, "shards": {}}
+        self._task: Optional[asyncio.Task] = None
+        self._leader_lock = None
+        self._backup_lock = asyncio.Lock()
+        # Per shard: when it was last checkpointed, WAL mtime as of the last complete
+        # checkpoint, and how many PASSIVE runs in a row left frames behind
+        self._last_checkpoint_at = {shard: time.time() for shard in range(len(SHARD_PATHS))}
+        self._checkpointed_mtime: dict[int, Optional[float]] = {}
+        self._incomplete_runs: dict[int, int] = {}
+
+    def _shard_status(self, shard: int) -> dict:
+        return self.status["shards"].setdefault(shard, {"last_checkpoint": None, "last_backup": None})
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._leader_lock:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(WAL_CHECK_INTERVAL_SECONDS)
+            if self._leader_lock is None:
+                self._leader_lock = await asyncio.to_thread(try_lock_file, f"{DATABASE_PATH}.wal.lock")
+                if self._leader_lock is None:
+                    continue
+                self.status["leader"] = True
+            for shard in range(len(SHARD_PATHS)):
+                try:
+                    await self.tick(shard)
+                    if BACKUP_INTERVAL_SECONDS > 0 and self._backup_due(shard):
+                        await self.backup(shard)
+                except Exception as e:
+                    metrics.inc("sqlite_wal_manager_errors_total")
+                    print(f"WAL manager error on {SHARD_PATHS[shard]}: {e}")
+
+    def _wal_stat(self, shard: int) -> tuple[int, Optional[float]]:
+        try:
+            stat = os.stat(f"{SHARD_PATHS[shard]}-wal")
+        except FileNotFoundError:
+            return 0, None
+        return stat.st_size, stat.st_mtime
+
+    async def tick(self, shard: int = 0):
+        """Check one shard's WAL and checkpoint if it is worth doing now."""
+        size, mtime = self._wal_stat(shard)
+        metrics.set("sqlite_wal_bytes", size, shard=str(shard))
+        self._shard_status(shard)["wal_bytes"] = size
+        if mtime is None:
+            return
+
+        now = time.time()
+        over_limit = size > WAL_SIZE_LIMIT_MB * 1024 * 1024
+        # Nothing has been written since the last complete checkpoint
+        if mtime == self._checkpointed_mtime.get(shard) and not over_limit:
+            return
+
+        quiet = now - mtime >= WAL_QUIET_SECONDS
+        overdue = now - self._last_checkpoint_at[shard] >= WAL_CHECKPOINT_MAX_INTERVAL_SECONDS
+        if not (quiet or overdue or over_limit):
+            return
+
+        result = await self.checkpoint("PASSIVE", shard)
+        if result["log"] > result["checkpointed"]:
+            self._incomplete_runs[shard] = self._incomplete_runs.get(shard, 0) + 1
+        else:
+            self._incomplete_runs[shard] = 0
+            self._checkpointed_mtime[shard] = mtime
+
+        if over_limit:
+            result = await self.checkpoint("TRUNCATE", shard)
+        elif self._incomplete_runs[shard] >= WAL_ESCALATE_AFTER:
+            result = await self.checkpoint("RESTART", shard)
+        if result["mode"] != "PASSIVE" and not result["busy"]:
+            self._incomplete_runs[shard] = 0
+            self._checkpointed_mtime[shard] = self._wal_stat(shard)[1]
+
+    async def checkpoint(self, mode: str = "PASSIVE", shard: int = 0) -> dict:
+        """Run PRAGMA wal_checkpoint(mode) and record how long it took."""
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+
+        db = await open_db(SHARD_PATHS[shard])
+        try:
+            # Bounds how long RESTART/TRUNCATE wait for readers (PASSIVE never waits)
+            await db.execute(f"PRAGMA busy_timeout={WAL_CHECKPOINT_BUSY_TIMEOUT_MS}")
+            start = time.perf_counter()
+            cursor = await db.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, log, checkpointed = await cursor.fetchone()
+            await cursor.close()
+            elapsed = time.perf_counter() - start
+        finally:
+            await db.close()
+
+        self._last_checkpoint_at[shard] = time.time()
+        outcome = "busy" if busy else "ok"
+        metrics.observe("sqlite_checkpoint_seconds", elapsed, mode=mode)
+        metrics.inc("sqlite_checkpoints_total", mode=mode, result=outcome)
+        metrics.set("sqlite_wal_frames", log, shard=str(shard))
+
+        result = {
+            "shard": shard,
+            "mode": mode,
+            "busy": bool(busy),
+            "log": log,
+            "checkpointed": checkpointed,
+            "seconds": round(elapsed, 6),
+            "at": self._last_checkpoint_at[shard],
+        }
+        self._shard_status(shard)["last_checkpoint"] = result
+        if mode != "PASSIVE":
+            print(f"WAL checkpoint {mode} on {Path(SHARD_PATHS[shard]).name}: {outcome}, {checkpointed}/{log} frames in {elapsed * 1000:.1f}ms")
+        return result
+
+    def _backups(self, shard: int) -> list[Path]:
+        """Completed backups of one shard file, oldest first."""
+        stem = Path(SHARD_PATHS[shard]).stem
+        return sorted(Path(BACKUP_DIR).glob(f"{stem}-*.db"))
+
+    def _backup_due(self, shard: int) -> bool:
+        backups = self._backups(shard)
+        if not backups:
+            return True
+        return time.time() - backups[-1].stat().st_mtime >= BACKUP_INTERVAL_SECONDS
+
+    async def backup(self, shard: int = 0) -> dict:
+        """Write a consistent copy of one shard file to BACKUP_DIR and prune old copies."""
+        async with self._backup_lock:
+            backup_dir = Path(BACKUP_DIR)
+            backup_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{Path(SHARD_PATHS[shard]).stem}-{time.strftime('%Y%m%d-%H%M%S')}.db"
+            final = backup_dir / name
+            partial = backup_dir / f"{name}.partial"
+
+            start = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(
+                    _backup_sync,
+                    SHARD_PATHS[shard],
+                    str(partial),
+                    BACKUP_PAGES_PER_STEP,
+                    BACKUP_STEP_SLEEP_MS / 1000,
+                    BACKUP_MAX_RESTARTS,
+                )
+                os.replace(partial, final)
+            except Exception:
+                metrics.inc("sqlite_backups_total", result="failed")
+                partial.unlink(missing_ok=True)
+                raise
+            elapsed = time.perf_counter() - start
+
+            for old in self._backups(shard)[:-BACKUP_KEEP] if BACKUP_KEEP > 0 else []:
+                old.unlink(missing_ok=True)
+
+            metrics.observe("sqlite_backup_seconds", elapsed)
+            metrics.inc("sqlite_backups_total", result="ok")
+            metrics.set("sqlite_backup_bytes", result["bytes"])
+            metrics.set("sqlite_backup_last_timestamp", time.time())
+
+            result.update(shard=shard, path=str(final), seconds=round(elapsed, 3), at=time.time())
+            self._shard_status(shard)["last_backup"] = result
+            print(f"Backup written to {final} ({result['bytes']} bytes, {result['restarts']} restarts, {elapsed:.2f}s)")
+            return result
+
+
+# Global WAL manager instance
+wal_manager = WalManager()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="WAL checkpoint and online backup")
+    sub = parser.add_subparsers(dest="command", required=True)
+    checkpoint_parser = sub.add_parser("checkpoint", help="Run one checkpoint")
+    checkpoint_parser.add_argument("--mode", default="PASSIVE", choices=CHECKPOINT_MODES)
+    sub.add_parser("backup", help="Write a backup to BACKUP_DIR")
+    args = parser.parse_args()
+
+    async def run_all():
+        if args.command == "checkpoint":
+            return [await wal_manager.checkpoint(args.mode, shard) for shard in range(len(SHARD_PATHS))]
+        return [await wal_manager.backup(shard) for shard in range(len(SHARD_PATHS))]
+
+    print(json.dumps(asyncio.run(run_all()), indent=2))
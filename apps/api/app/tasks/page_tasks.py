@@ -20,63 +20,56 @@ async def create_page_async(
     template_id: str,
     client_ip: str,
     sender_name: str = None,
-    recipient_name: str = None
+    recipient_name: str = None,
+    expires_at: str = None
 ) -> Dict[str, Any]:
     """
     Background task for page creation.
     Returns dict with status and either page data or error.
     """
     # Import here to avoid circular dependencies
-    from ..services.slug_service import check_slug_availability
+    from ..services.slug_service import check_slug_rules, TAKEN_REASON
+    from ..services.slug_lease import slug_leases
     from ..services.cache_service import cache_service
-    from ..db.database import execute_insert, execute_query
+    from ..services.expiry import default_expiry
+    from ..services.hot_pages import hot_pages
+    from ..db.repository import page_repository, SlugTakenError
 
     try:
-        # Double-check slug availability (race condition protection)
-        available, reason = await check_slug_availability(slug)
-        if not available:
+        # No availability lookup: the unique index on active slugs decides races
+        valid, reason = check_slug_rules(slug)
+        if not valid:
             return {"status": "error", "error": reason}
 
         # Generate edit token
         edit_token = secrets.token_urlsafe(32)
 
-        # Insert page
-        page_id = await execute_insert(
-            """
-            INSERT INTO pages (slug, slug_lower, title, message, sender_name, recipient_name, template_id, edit_token)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                slug,
-                slug.lower(),
-                title,
-                message,
-                sender_name,
-                recipient_name,
-                template_id,
+        # Insert page and log creation
+        try:
+            page_data = await page_repository.create(
+                {
+                    "slug": slug,
+                    "title": title,
+                    "message": message,
+                    "sender_name": sender_name,
+                    "recipient_name": recipient_name,
+                    "template_id": template_id,
+                    "expires_at": expires_at or default_expiry(template_id),
+                },
                 edit_token,
+                hash_ip(client_ip),
             )
-        )
+        except SlugTakenError:
+            return {"status": "error", "error": TAKEN_REASON, "code": "slug_taken"}
 
-        # Log creation
-        await execute_insert(
-            "INSERT INTO creation_logs (ip_hash, page_id) VALUES (?, ?)",
-            (hash_ip(client_ip), page_id)
-        )
-
-        # Fetch created page
-        pages = await execute_query(
-            "SELECT * FROM pages WHERE id = ?",
-            (page_id,)
-        )
-
-        if not pages:
+        if not page_data:
             return {"status": "error", "error": "Failed to create page"}
 
-        page_data = pages[0]
-
-        # Invalidate slug availability cache
+        # Invalidate slug availability cache; the page now holds the slug, not the lease
         await cache_service.delete(f"slug_available:{slug.lower()}")
+        await slug_leases.clear(slug)
+        # The slug may have belonged to an expired page that was still cached
+        await hot_pages.evict(slug)
 
         # Build response
         from ..config import FRONTEND_DOMAIN
@@ -92,6 +85,7 @@ async def create_page_async(
                 "template_id": page_data["template_id"],
                 "created_at": page_data["created_at"],
                 "view_count": page_data["view_count"],
+                "expires_at": page_data["expires_at"],
             },
             "edit_token": edit_token,
             "url": f"{FRONTEND_DOMAIN}/{slug}"
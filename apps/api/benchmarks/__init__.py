@@ -0,0 +1 @@
+"""Benchmarks for the Valentine's Page Generator API."""
@@ -0,0 +1,155 @@
+"""
+Shared helpers for the benchmark tools: booting the app in-process, latency
+summaries and baseline comparison.
+"""
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float, statuses: dict[int, int]) -> dict:
+    """Summarize one group of requests. Latencies are in seconds, output in milliseconds."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def environment_info() -> dict:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def leftover_threads(timeout: float = 2.0) -> list[str]:
+    """
+    Names of non-daemon threads still running once the app has shut down,
+    after giving them `timeout` seconds to finish. Anything left is a leak
+    (e.g. an aiosqlite connection that was never closed) and would keep the
+    process alive.
+    """
+    deadline = time.monotonic() + timeout
+    for thread in threading.enumerate():
+        if thread is threading.main_thread() or thread.daemon:
+            continue
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return [
+        thread.name for thread in threading.enumerate()
+        if thread is not threading.main_thread() and not thread.daemon and thread.is_alive()
+    ]
+
+
+def exit_code(code: int) -> int:
+    """Fail a benchmark run (exit 1) that left threads behind, so leaks are not hidden."""
+    leaked = leftover_threads()
+    if leaked:
+        print(f"\n{len(leaked)} thread(s) still running after shutdown: {', '.join(leaked)}")
+        return 1
+    return code
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold_pct: float) -> list[str]:
+    """
+    Compare every group present in both runs.
+    Returns human-readable regressions: p95 latency up, throughput down or
+    error rate up by more than threshold_pct.
+    """
+    regressions = []
+    for group, current in results.items():
+        previous = baseline.get(group)
+        if not previous:
+            continue
+        limit = 1 + threshold_pct / 100
+        if previous["p95_ms"] > 0 and current["p95_ms"] > previous["p95_ms"] * limit:
+            regressions.append(
+                f"{group}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms"
+            )
+        if previous["throughput_rps"] > 0 and current["throughput_rps"] * limit < previous["throughput_rps"]:
+            regressions.append(
+                f"{group}: throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s"
+            )
+        if current["error_rate"] > previous["error_rate"] + threshold_pct / 100:
+            regressions.append(
+                f"{group}: error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}"
+            )
+    return regressions
+
+
+def load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path: str, data: dict):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def prepare_environment(redis_url: Optional[str], extra_env: Optional[dict] = None) -> str:
+    """
+    Point the app at a fresh SQLite file (and optionally a Redis server) and lift
+    the per-IP rate limits and compute budget so they don't dominate the
+    numbers. Must run before anything under app/ is imported, since config is
+    read at import time.
+    Returns the temporary data directory.
+    """
+    data_dir = tempfile.mkdtemp(prefix="valentine-bench-")
+    os.environ["DATABASE_PATH"] = os.path.join(data_dir, "bench.db")
+    os.environ.setdefault("RATE_LIMIT_PAGES_PER_HOUR", "1000000000")
+    os.environ.setdefault("RATE_LIMIT_SLUG_CHECKS_PER_MINUTE", "1000000000")
+    os.environ.setdefault("COMPUTE_BUDGET_PER_MINUTE", "1000000000")
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+    for key, value in (extra_env or {}).items():
+        os.environ[key] = str(value)
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+    return data_dir
+
+
+@asynccontextmanager
+async def running_app(fake_redis: bool):
+    """Import app.main:app, run its lifespan and yield an httpx client bound to it in-process."""
+    import httpx
+
+    if fake_redis:
+        from . import fake_redis as fake
+        fake.install()
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
@@ -0,0 +1,276 @@
+"""
+In-process stand-in for the async Redis client, covering the commands the API uses.
+Lets benchmarks run without a Redis server; latency is near zero, so results
+isolate framework, SQLite and application overhead.
+"""
+import fnmatch
+import time
+import uuid
+from typing import Any, Optional
+
+
+class FakeRedis:
+    """Single-database, single-process imitation of redis.asyncio.Redis (decode_responses=True)."""
+
+    def __init__(self):
+        self._data: dict[str, Any] = {}
+        self._expires: dict[str, float] = {}
+
+    # -- housekeeping -------------------------------------------------------
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        return key in self._data
+
+    def _get(self, key: str, default=None):
+        return self._data[key] if self._alive(key) else default
+
+    async def close(self):
+        self._data.clear()
+        self._expires.clear()
+
+    async def ping(self) -> bool:
+        return True
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    # -- keys -----------------------------------------------------------------
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self._data[key]
+                self._expires.pop(key, None)
+                removed += 1
+        return removed
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._alive(key))
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.time() + seconds
+        return True
+
+    async def pexpire(self, key: str, milliseconds: int) -> bool:
+        return await self.expire(key, milliseconds / 1000)
+
+    async def ttl(self, key: str) -> int:
+        if not self._alive(key):
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else max(0, int(expires_at - time.time()))
+
+    async def keys(self, pattern: str = "*") -> list[str]:
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    # -- scripts --------------------------------------------------------------
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args) -> int:
+        """No Lua here: runs the slug lease and hot page pin scripts by name."""
+        from app.services.hot_pages import PIN_SCRIPT
+        from app.services.slug_lease import RENEW_SCRIPT, RELEASE_SCRIPT
+
+        if script == PIN_SCRIPT:
+            key, generation_key, generation, value, ttl = keys_and_args
+            if (self._get(generation_key) or "") != generation:
+                return 0
+            await self.set(key, value, ex=int(ttl))
+            return 1
+
+        key, token, *args = keys_and_args
+        holder = self._get(key)
+        if script == RENEW_SCRIPT:
+            if holder is not None and holder != token:
+                return 0
+            await self.set(key, token, px=int(args[0]))
+            return 1
+        if script == RELEASE_SCRIPT:
+            return await self.delete(key) if holder == token else 0
+        raise NotImplementedError("FakeRedis.eval only knows the slug lease and hot page pin scripts")
+
+    # -- strings --------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._get(key)
+
+    async def mget(self, *keys: str) -> list[Optional[str]]:
+        return [self._get(key) for key in keys]
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]:
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[key] = str(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = time.time() + ex
+        elif px is not None:
+            self._expires[key] = time.time() + px / 1000
+        return True
+
+    async def setex(self, key: str, seconds: int, value: Any) -> bool:
+        return await self.set(key, value, ex=seconds)
+
+    async def incrby(self, key: str, amount: int = 1) -> int:
+        value = int(self._get(key, 0)) + amount
+        self._data[key] = str(value)
+        return value
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self.incrby(key, amount)
+
+    # -- hashes ---------------------------------------------------------------
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        hash_ = self._get(key)
+        if hash_ is None:
+            hash_ = self._data[key] = {}
+        hash_[field] = str(int(hash_.get(field, 0)) + amount)
+        return int(hash_[field])
+
+    async def hset(self, key: str, field: str, value: Any) -> int:
+        hash_ = self._get(key)
+        if hash_ is None:
+            hash_ = self._data[key] = {}
+        added = 0 if field in hash_ else 1
+        hash_[field] = str(value)
+        return added
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        hash_ = self._get(key, {})
+        return sum(1 for field in fields if hash_.pop(field, None) is not None)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self._get(key, {}))
+
+    # -- sets and HyperLogLogs (exact counts) ----------------------------------
+
+    async def sadd(self, key: str, *members: str) -> int:
+        members_ = self._get(key)
+        if members_ is None:
+            members_ = self._data[key] = set()
+        added = len(set(members) - members_)
+        members_.update(members)
+        return added
+
+    async def smembers(self, key: str) -> "set[str]":
+        return set(self._get(key, set()))
+
+    async def pfadd(self, key: str, *elements: str) -> int:
+        return 1 if await self.sadd(key, *elements) else 0
+
+    async def pfcount(self, *keys: str) -> int:
+        return len(set().union(*(self._get(key, set()) for key in keys)))
+
+    # -- sorted sets ----------------------------------------------------------
+
+    def _zset(self, key: str) -> dict[str, float]:
+        zset = self._get(key)
+        if zset is None:
+            zset = self._data[key] = {}
+        return zset
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        zset = self._zset(key)
+        added = sum(1 for member in mapping if member not in zset)
+        zset.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    async def zcard(self, key: str) -> int:
+        return len(self._get(key, {}))
+
+    async def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
+        zset = self._get(key)
+        if not zset:
+            return 0
+        doomed = [m for m, s in zset.items() if float(min_score) <= s <= float(max_score)]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    async def zrange(self, key: str, start: int, end: int, withscores: bool = False):
+        ordered = sorted(self._get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        end = len(ordered) if end == -1 else end + 1
+        items = ordered[start:end]
+        return items if withscores else [member for member, _ in items]
+
+
+class FakePipeline:
+    """Queues commands and runs them in order on execute(), like a redis-py pipeline."""
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        results = []
+        commands, self._commands = self._commands, []
+        for name, args, kwargs in commands:
+            try:
+                results.append(await getattr(self._redis, name)(*args, **kwargs))
+            except Exception as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands = []
+
+
+class FakeJob:
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+
+
+class FakeQueue:
+    """Stand-in for rq.Queue that records enqueued jobs without running them."""
+
+    jobs: list[tuple] = []
+
+    def __init__(self, name: str = "page_creation", connection: Any = None):
+        self.name = name
+        self.connection = connection
+
+    def enqueue(self, func: str, *args, **kwargs) -> FakeJob:
+        FakeQueue.jobs.append((func, args))
+        return FakeJob()
+
+
+def install() -> None:
+    """Replace the app's Redis connections and RQ queue with in-process stand-ins."""
+    from app.routes import pages
+    from app.services.redis_client import redis_client
+
+    async def connect():
+        redis_client._rate_limit_client = FakeRedis()
+        redis_client._cache_client = FakeRedis()
+        redis_client._queue_client = FakeRedis()
+
+    redis_client.connect = connect
+    pages.get_page_queue = FakeQueue
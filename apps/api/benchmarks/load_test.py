@@ -0,0 +1,353 @@
+"""
+Reproducible load test for the API.
+
+Boots app.main:app in-process against a temporary SQLite file and either a
+local Redis (--redis-url) or an in-process stand-in (--fake-redis), then drives
+realistic request mixes at a fixed concurrency and reports throughput,
+p50/p95/p99 latency and error rates as JSON.
+
+    cd apps/api
+    python -m benchmarks.load_test --fake-redis --concurrency 50 --duration 15 \\
+        --output bench.json
+    python -m benchmarks.load_test --fake-redis --baseline bench.json --threshold 10
+
+Use --url to target an already running server instead of booting one.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import string
+import sys
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+from .common import (
+    compare_to_baseline,
+    environment_info,
+    exit_code,
+    load_json,
+    prepare_environment,
+    running_app,
+    summarize,
+    write_json,
+)
+
+WORDS = [
+    "valentine", "sweetheart", "forever", "darling", "honey", "sunshine", "love",
+    "roses", "cupid", "kisses", "amore", "babe", "angel", "dearest", "treasure",
+]
+
+
+class Recorder:
+    """Collects latencies, errors and status codes per request group."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.queued = 0
+
+    async def request(self, client, group: str, method: str, url: str, **kwargs):
+        # In-process, a response that never waits on I/O (e.g. a 503 from load
+        # shedding) would let one client loop without ever yielding to the others
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.latencies[group].append(time.perf_counter() - start)
+            self.errors[group] += 1
+            self.statuses[group][0] += 1
+            return None
+        self.latencies[group].append(time.perf_counter() - start)
+        self.statuses[group][response.status_code] += 1
+        if response.status_code >= 500:
+            self.errors[group] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            group: summarize(latencies, self.errors[group], elapsed, self.statuses[group])
+            for group, latencies in sorted(self.latencies.items())
+        }
+
+
+def client_headers(worker_id: int) -> dict:
+    """Each virtual user gets its own client IP so per-IP limits behave realistically."""
+    return {"X-Forwarded-For": f"10.{worker_id // 65536 % 256}.{worker_id // 256 % 256}.{worker_id % 256}"}
+
+
+def random_slug(rng: random.Random, prefix: str = "bench") -> str:
+    suffix = "".join(rng.choices(string.ascii_lowercase + string.digits, k=10))
+    return f"{prefix}-{suffix}"
+
+
+def page_body(slug: str) -> dict:
+    return {
+        "slug": slug,
+        "title": "Happy Valentine's Day!",
+        "message": "You make my heart sing. " * 8,
+        "sender_name": "Sam",
+        "recipient_name": "Alex",
+        "template_id": "classic",
+    }
+
+
+class Workload:
+    """Shared state for the scenarios: seeded pages, their edit tokens and RNG."""
+
+    def __init__(self, seed: int, pages: int, zipf_s: float):
+        self.rng = random.Random(seed)
+        self.page_count = pages
+        self.zipf_s = zipf_s
+        self.slugs: list[str] = []
+        self.cum_weights: list[float] = []
+        self.editable: list[tuple[str, str]] = []
+
+    async def create(self, client, slug: str, headers: dict) -> Optional[str]:
+        response = await client.post("/api/pages", json=page_body(slug), headers=headers)
+        if response.status_code == 200 and "edit_token" in response.json():
+            return response.json()["edit_token"]
+        return None
+
+    async def seed(self, client, count: int, prefix: str, concurrency: int) -> list[tuple[str, str]]:
+        """Create pages outside of measurement. Returns (slug, edit_token) pairs."""
+        created: list[tuple[str, str]] = []
+        slugs = iter([f"{prefix}-{i}" for i in range(count)])
+
+        async def worker(worker_id: int):
+            for slug in slugs:
+                token = await self.create(client, slug, client_headers(10_000 + worker_id))
+                if token:
+                    created.append((slug, token))
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return created
+
+    async def setup_views(self, client, concurrency: int):
+        if self.slugs:
+            return
+        created = await self.seed(client, self.page_count, "viewed", concurrency)
+        self.slugs = [slug for slug, _ in created]
+        # Zipf-like skew: a handful of viral pages get most of the views
+        weights = [1 / (rank + 1) ** self.zipf_s for rank in range(len(self.slugs))]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def popular_slug(self) -> str:
+        return self.rng.choices(self.slugs, cum_weights=self.cum_weights)[0]
+
+
+async def step_page_view(client, rec: Recorder, load: Workload, worker_id: int):
+    await rec.request(client, "page_view", "GET", f"/api/pages/{load.popular_slug()}")
+
+
+async def step_slug_typing(client, rec: Recorder, load: Workload, worker_id: int):
+    """A user typing a slug: one check per keystroke once the minimum length is reached."""
+    rng = load.rng
+    if load.slugs and rng.random() < 0.3:
+        # Retyping a taken slug fans out into suggestion generation
+        target = load.popular_slug()
+    else:
+        target = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}{rng.randint(0, 99)}"
+    headers = client_headers(worker_id)
+    for end in range(3, len(target) + 1):
+        prefix = target[:end]
+        if prefix.endswith("-"):
+            continue
+        await rec.request(client, "slug_check", "GET", f"/api/slugs/check/{prefix}", headers=headers)
+
+
+async def step_create(client, rec: Recorder, load: Workload, worker_id: int):
+    response = await rec.request(
+        client, "create", "POST", "/api/pages",
+        json=page_body(random_slug(load.rng)), headers=client_headers(worker_id),
+    )
+    if response is not None and response.status_code == 200 and "job_id" in response.json():
+        rec.queued += 1
+
+
+async def step_update_delete(client, rec: Recorder, load: Workload, worker_id: int):
+    if not load.editable:
+        raise StopAsyncIteration
+    slug, token = load.editable.pop()
+    headers = {"X-Edit-Token": token}
+    await rec.request(
+        client, "update", "PATCH", f"/api/pages/{slug}",
+        json={"title": "Updated title", "message": "Updated message"}, headers=headers,
+    )
+    await rec.request(client, "delete", "DELETE", f"/api/pages/{slug}", headers=headers)
+
+
+Step = Callable[..., Awaitable[None]]
+
+MIXED_WEIGHTS: list[tuple[Step, float]] = [
+    (step_page_view, 0.80),
+    (step_slug_typing, 0.15),
+    (step_create, 0.04),
+    (step_update_delete, 0.01),
+]
+
+
+async def step_mixed(client, rec: Recorder, load: Workload, worker_id: int):
+    steps, weights = zip(*MIXED_WEIGHTS)
+    step = load.rng.choices(steps, weights=weights)[0]
+    try:
+        await step(client, rec, load, worker_id)
+    except StopAsyncIteration:
+        await step_page_view(client, rec, load, worker_id)
+
+
+SCENARIOS: dict[str, Step] = {
+    "page_views": step_page_view,
+    "slug_typing": step_slug_typing,
+    "create_spike": step_create,
+    "update_delete": step_update_delete,
+    "mixed": step_mixed,
+}
+
+
+async def run_scenario(client, name: str, load: Workload, args) -> dict:
+    """Prepare data for a scenario, then run it for the configured duration."""
+    if name in ("page_views", "slug_typing", "mixed"):
+        await load.setup_views(client, args.seed_concurrency)
+    if name in ("update_delete", "mixed"):
+        load.editable = await load.seed(client, args.editable_pages, f"editable-{name.replace('_', '-')}", args.seed_concurrency)
+
+    step = SCENARIOS[name]
+    rec = Recorder()
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(worker_id: int):
+        while time.perf_counter() < deadline:
+            try:
+                await step(client, rec, load, worker_id)
+            except StopAsyncIteration:
+                return
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    groups = rec.summary(elapsed)
+    print(f"\n== {name} ({elapsed:.1f}s, concurrency {args.concurrency})")
+    for group, stats in groups.items():
+        print(
+            f"  {group:<12} {stats['requests']:>7} req  {stats['throughput_rps']:>9.1f} req/s  "
+            f"p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  "
+            f"p99 {stats['p99_ms']:>8.2f}ms  errors {stats['error_rate']:.2%}"
+        )
+    if rec.queued:
+        print(f"  {rec.queued} creations overflowed into the queue")
+    return {"wall_seconds": round(elapsed, 3), "queued": rec.queued, "groups": groups}
+
+
+async def run(args) -> dict:
+    import httpx
+
+    load = Workload(args.seed, args.pages, args.zipf)
+    results = {}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, load, args)
+    else:
+        async with running_app(args.fake_redis) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, load, args)
+
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "baseline", "threshold")
+        },
+        "environment": environment_info(),
+        "scenarios": results,
+    }
+    if not args.url:
+        report["event_loop"] = event_loop_summary()
+    return report
+
+
+def event_loop_summary() -> dict:
+    """Loop lag and stalls seen by the in-process app (shared with the load generator)."""
+    from app.services.loop_monitor import loop_monitor
+
+    loop = loop_monitor.report()
+    summary = {"lag_seconds": loop["lag"], "stalls": len(loop["stalls"]), "blocking_calls": loop["blocking_calls"]}
+    if loop["lag"]:
+        print(
+            f"\nEvent loop lag p95 {loop['lag']['p95'] * 1000:.1f}ms, max {loop['lag']['max'] * 1000:.1f}ms, "
+            f"{summary['stalls']} stalls"
+        )
+    return summary
+
+
+def flatten(report: dict) -> dict:
+    """Map 'scenario/group' to its summary, for baseline comparison."""
+    return {
+        f"{scenario}/{group}": stats
+        for scenario, data in report["scenarios"].items()
+        for group, stats in data["groups"].items()
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Valentine's Page Generator API")
+    parser.add_argument("--scenarios", default="page_views,slug_typing,create_spike,update_delete,mixed",
+                        help=f"Comma-separated list of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--pages", type=int, default=500, help="Pages seeded for view/typing traffic")
+    parser.add_argument("--editable-pages", type=int, default=300, help="Pages seeded for update/delete")
+    parser.add_argument("--seed-concurrency", type=int, default=10)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Skew of page view popularity")
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--create-timeout", type=float, default=None,
+                        help="Override the 2s sync creation timeout to force queue overflow")
+    parser.add_argument("--fake-redis", action="store_true", help="Use the in-process Redis stand-in")
+    parser.add_argument("--storage", choices=["sqlite", "memory"], default="sqlite",
+                        help="STORAGE_BACKEND; memory isolates HTTP/framework cost from storage cost")
+    parser.add_argument("--redis-url", default=None, help="Redis to use when booting in-process")
+    parser.add_argument("--url", default=None, help="Target a running server instead of booting one")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON report")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    extra_env = {}
+    if args.create_timeout is not None:
+        extra_env["PAGE_CREATE_SYNC_TIMEOUT"] = args.create_timeout
+    extra_env["STORAGE_BACKEND"] = args.storage
+    if not args.url:
+        prepare_environment(args.redis_url, extra_env)
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        write_json(args.output, report)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(flatten(report), flatten(load_json(args.baseline)), args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(exit_code(main()))
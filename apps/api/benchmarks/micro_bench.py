@@ -0,0 +1,244 @@
+"""
+Micro benchmarks for the per-request hot paths that never leave the process:
+slug format validation, the PageCreate validators, IP hashing, building and
+serializing response models, and slug suggestions against a filled slug set.
+
+Everything runs in one interpreter on the in-memory page repository and the
+in-process Redis stand-in, so the numbers are CPU cost only. Cheap calls are
+timed in calibrated batches (like timeit) and reported per call; suggestions
+are timed one call at a time.
+
+    cd apps/api
+    python -m benchmarks.micro_bench --sizes 1000 100000 1000000 --output micro.json
+    python -m benchmarks.micro_bench --baseline micro.json --threshold 10
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from .common import environment_info, load_json, percentile, write_json, prepare_environment
+
+# Suffixes generate_suggestions tries first; filling them for a base forces the slower strategies
+NUMBERED_SUFFIXES = range(1, 100)
+ROMANTIC_WORDS = ["love", "heart", "sweet", "dear", "my", "xoxo", "forever"]
+
+PAGE = {
+    "id": 42,
+    "slug": "Sam-And-Alex",
+    "title": "Happy Valentine's Day!",
+    "message": "You make my heart sing. " * 8,
+    "sender_name": "Sam",
+    "recipient_name": "Alex",
+    "template_id": "classic",
+    "created_at": "2026-02-14 09:30:00",
+    "view_count": 1234,
+    "expires_at": None,
+}
+
+
+def summarize_ns(samples: list[float]) -> dict:
+    """Per-call seconds -> nanosecond stats."""
+    ordered = sorted(samples)
+    median = percentile(ordered, 50)
+    return {
+        "samples": len(ordered),
+        "min_ns": round(ordered[0] * 1e9, 1),
+        "median_ns": round(median * 1e9, 1),
+        "mean_ns": round(sum(ordered) / len(ordered) * 1e9, 1),
+        "p95_ns": round(percentile(ordered, 95) * 1e9, 1),
+        "ops_per_second": round(1 / median) if median > 0 else 0,
+    }
+
+
+def bench(func, rounds: int, min_batch_seconds: float) -> dict:
+    """Time a cheap call: grow the batch until it takes min_batch_seconds, then time `rounds` batches."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_batch_seconds:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {**summarize_ns(samples), "calls_per_round": number}
+
+
+async def bench_async(func, calls: int, setup=None) -> dict:
+    """Time `calls` awaits of func() one by one; setup() runs untimed before each."""
+    samples = []
+    for i in range(calls):
+        if setup:
+            await setup()
+        start = time.perf_counter()
+        await func(i)
+        samples.append(time.perf_counter() - start)
+    return summarize_ns(samples)
+
+
+def taken_slugs(size: int) -> tuple[list[str], list[str]]:
+    """
+    `size` slugs in groups of every numbered and romantic variant of a base,
+    so a suggestion for one of the bases finds none of them free. Returns
+    (slugs, bases).
+    """
+    slugs, bases = [], []
+    index = 0
+    while len(slugs) < size:
+        base = f"bench{index:06d}"
+        variants = [f"{base}-{i}" for i in NUMBERED_SUFFIXES]
+        variants += [v for word in ROMANTIC_WORDS for v in (f"{word}-{base}", f"{base}-{word}")]
+        if size - len(slugs) > len(variants):
+            bases.append(base)
+        slugs.append(base)
+        slugs.extend(variants[:size - len(slugs)])
+        index += 1
+    return slugs, bases
+
+
+def fill_repository(repository, slugs: list[str]):
+    """Mark every slug taken in the in-memory repository (one shared page keeps 1M entries affordable)."""
+    repository.pages = {1: {**PAGE, "id": 1, "slug_lower": "bench", "is_active": 1}}
+    repository.active = dict.fromkeys((slug.lower() for slug in slugs), 1)
+
+
+def sync_cases(rounds: int, min_batch_seconds: float) -> dict:
+    from app.models.page import PageCreate, PageResponse
+    from app.models.template import Template, TemplateListResponse
+    from app.routes.pages import hash_ip as route_hash_ip
+    from app.services.slug_service import validate_slug_format
+    from app.tasks.page_tasks import hash_ip as task_hash_ip
+    from app.config import TEMPLATES
+
+    create_body = {
+        "slug": "sam-and-alex-2026",
+        "title": PAGE["title"],
+        "message": PAGE["message"],
+        "sender_name": "Sam",
+        "recipient_name": "Alex",
+        "template_id": "classic",
+    }
+    response = PageResponse(**PAGE)
+    templates = list(TEMPLATES.values())
+
+    cases = {
+        "validate_slug_format[valid]": lambda: validate_slug_format("sam-and-alex-2026"),
+        "validate_slug_format[invalid]": lambda: validate_slug_format("-sam-and-alex-"),
+        "PageCreate[validate]": lambda: PageCreate(**create_body),
+        "hash_ip[routes.pages]": lambda: route_hash_ip("203.0.113.42"),
+        "hash_ip[tasks.page_tasks]": lambda: task_hash_ip("203.0.113.42"),
+        "PageResponse[build]": lambda: PageResponse(**PAGE),
+        "PageResponse[dump_json]": lambda: response.model_dump_json(),
+        "TemplateListResponse[build]": lambda: TemplateListResponse(templates=[Template(**t) for t in templates]),
+    }
+    results = {}
+    for name, func in cases.items():
+        results[name] = bench(func, rounds, min_batch_seconds)
+        print_result(name, results[name])
+    return results
+
+
+async def suggestion_cases(sizes: list[int], calls: int) -> dict:
+    from app.db.repository import page_repository
+    from app.services.redis_client import redis_client
+    from app.services.slug_service import generate_suggestions
+
+    async def flush_availability_cache():
+        keys = await redis_client.cache.keys("slug_available:*")
+        if keys:
+            await redis_client.cache.delete(*keys)
+
+    results = {}
+    for size in sizes:
+        slugs, bases = taken_slugs(size)
+        fill_repository(page_repository, slugs)
+        del slugs
+        await flush_availability_cache()
+
+        cases = {
+            # Every numbered and romantic candidate taken, nothing cached: the slowest path
+            "taken_cold": (lambda i: generate_suggestions(bases[i % len(bases)]), flush_availability_cache),
+            # Same bases again with the availability answers still cached
+            "taken_warm": (lambda i: generate_suggestions(bases[i % len(bases)]), None),
+            # A free base: the first numbered candidates are available
+            "free_cold": (lambda i: generate_suggestions(f"free{i:06d}"), flush_availability_cache),
+        }
+        for label, (func, setup) in cases.items():
+            name = f"generate_suggestions[{size}/{label}]"
+            results[name] = {**await bench_async(func, calls, setup), "slugs": size}
+            print_result(name, results[name])
+    return results
+
+
+def print_result(name: str, stats: dict):
+    print(f"  {name:<44} median {stats['median_ns']:>12.1f}ns  p95 {stats['p95_ns']:>12.1f}ns  "
+          f"{stats['ops_per_second']:>10}/s")
+
+
+def compare_micro(results: dict, baseline: dict, threshold_pct: float) -> list[str]:
+    """Cases present in both runs whose median got slower by more than threshold_pct."""
+    regressions = []
+    limit = 1 + threshold_pct / 100
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and previous["median_ns"] > 0 and current["median_ns"] > previous["median_ns"] * limit:
+            regressions.append(f"{name}: median {previous['median_ns']:.1f}ns -> {current['median_ns']:.1f}ns")
+    return regressions
+
+
+async def run(args) -> dict:
+    from . import fake_redis
+    fake_redis.install()
+    from app.services.redis_client import redis_client
+
+    await redis_client.connect()
+    try:
+        print("Validation and serialization:")
+        results = sync_cases(args.rounds, args.min_batch_ms / 1000)
+        print("Slug suggestions:")
+        results.update(await suggestion_cases(args.sizes, args.calls))
+    finally:
+        await redis_client.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro benchmarks for slug, suggestion and serialization hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Taken slugs in the repository for the suggestion cases")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed batches per cheap case")
+    parser.add_argument("--min-batch-ms", type=float, default=20, help="Minimum duration of one batch")
+    parser.add_argument("--calls", type=int, default=200, help="Timed calls per suggestion case")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None, help="Earlier --output report to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed median slowdown in percent")
+    args = parser.parse_args(argv)
+
+    # Before anything under app/ is imported; the memory backend stands in for SQLite
+    prepare_environment(None, {"STORAGE_BACKEND": "memory"})
+    results = asyncio.run(run(args))
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "environment": environment_info(), "results": results})
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_micro(results, load_json(args.baseline)["results"], args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions over {args.threshold}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
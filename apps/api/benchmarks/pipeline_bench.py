@@ -0,0 +1,155 @@
+"""
+Redis auto-pipelining on and off (REDIS_AUTO_PIPELINE), through the same
+service calls a slug check makes: the rate limiter, then the cache lookup.
+
+Each mode runs in a fresh interpreter (the flag is read at import) with
+--concurrency coroutines for --duration seconds. Against a real server:
+
+    cd apps/api
+    python -m benchmarks.pipeline_bench --redis-url redis://localhost:6379 --concurrency 200
+
+Without one, --fake-redis adds --rtt-ms of simulated network latency to every
+round trip (a command or a pipeline execute), with at most --connections in
+flight like the 20-connection pools. Round trips are what pipelining saves:
+
+    python -m benchmarks.pipeline_bench --fake-redis --rtt-ms 1 --concurrency 200 --output pipeline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from .common import API_DIR, environment_info, percentile, write_json
+
+PROBE = r"""
+import asyncio, json, random, sys, time
+duration, concurrency, fake, rtt, connections = (
+    float(sys.argv[1]), int(sys.argv[2]), sys.argv[3] == "1", float(sys.argv[4]) / 1000, int(sys.argv[5])
+)
+
+if fake:
+    from benchmarks import fake_redis
+    Base = fake_redis.FakeRedis
+    # Like a connection pool: at most this many round trips in flight at once
+    wire = None
+
+    async def round_trip():
+        global wire
+        wire = wire or asyncio.Semaphore(connections)
+        async with wire:
+            await asyncio.sleep(rtt)
+
+    class SlowPipeline(fake_redis.FakePipeline):
+        async def execute(self, raise_on_error=True):
+            # One round trip for the whole pipeline
+            await round_trip()
+            results = []
+            commands, self._commands = self._commands, []
+            for name, args, kwargs in commands:
+                try:
+                    results.append(await getattr(Base, name)(self._redis, *args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+            return results
+
+    class SlowRedis(Base):
+        def __getattribute__(self, name):
+            attr = super().__getattribute__(name)
+            if name.startswith("_") or not asyncio.iscoroutinefunction(attr):
+                return attr
+            async def command(*args, **kwargs):
+                await round_trip()
+                return await attr(*args, **kwargs)
+            return command
+
+        def pipeline(self, transaction=True):
+            return SlowPipeline(self)
+
+    fake_redis.FakeRedis = SlowRedis
+    fake_redis.install()
+
+from app.services.redis_client import redis_client
+from app.services.rate_limiter import rate_limiter
+from app.services.cache_service import cache_service
+
+async def main():
+    await redis_client.connect()
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client(n):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await rate_limiter.check_slug_check(f"10.0.{n // 256}.{n % 256}")
+                await cache_service.get(f"slug_available:bench-{random.randint(0, 999)}")
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    await redis_client.close()
+    print(json.dumps({"latencies": latencies, "errors": errors}))
+
+asyncio.run(main())
+"""
+
+
+def run_mode(auto_pipeline: bool, args) -> dict:
+    env = dict(
+        os.environ,
+        REDIS_AUTO_PIPELINE="true" if auto_pipeline else "false",
+        # Let every simulated client through the limiter
+        RATE_LIMIT_SLUG_CHECKS_PER_MINUTE="1000000000",
+    )
+    if args.redis_url:
+        env["REDIS_URL"] = args.redis_url
+    process = subprocess.run(
+        [sys.executable, "-c", PROBE, str(args.duration), str(args.concurrency),
+         "1" if args.fake_redis else "0", str(args.rtt_ms), str(args.connections)],
+        cwd=API_DIR, env=env, capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"pipeline bench run failed:\n{process.stderr}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    ordered = sorted(result["latencies"])
+    return {
+        "checks": len(ordered),
+        "errors": result["errors"],
+        "checks_per_second": round(len(ordered) / args.duration, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare Redis auto-pipelining on and off")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--redis-url", default=None)
+    target.add_argument("--fake-redis", action="store_true", help="In-process Redis with simulated latency")
+    parser.add_argument("--rtt-ms", type=float, default=1, help="Simulated round trip with --fake-redis")
+    parser.add_argument("--connections", type=int, default=20, help="Round trips in flight at once with --fake-redis")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode, enabled in (("off", False), ("on", True)):
+        results[mode] = stats = run_mode(enabled, args)
+        print(f"  auto-pipeline {mode:<3}  {stats['checks_per_second']:>9.1f} checks/s  "
+              f"p50 {stats['p50_ms']:>7.3f}ms  p99 {stats['p99_ms']:>7.3f}ms  errors {stats['errors']}")
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "environment": environment_info(), "results": results})
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
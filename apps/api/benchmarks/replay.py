@@ -0,0 +1,238 @@
+"""
+Replay captured production traffic (TRAFFIC_CAPTURE_ENABLED) against a local instance.
+
+Captures contain route templates and slug hashes, not real slugs. Each hash is
+mapped to a stable synthetic slug of the same length, pages that were viewed
+successfully or whose slug was taken when checked are created up front, and
+requests are then issued on the original schedule (--speed 1), N times faster
+(--speed N) or back-to-back (--speed 0).
+
+    cd apps/api
+    python -m benchmarks.replay 'captures/traffic.*.ndjson*' --fake-redis --speed 4 \\
+        --output replay.json
+    python -m benchmarks.replay capture.ndjson --url http://localhost:8000 --speed 1
+"""
+import argparse
+import asyncio
+import glob
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Optional
+
+from .common import environment_info, exit_code, prepare_environment, running_app, summarize, write_json
+from .load_test import page_body, random_slug, Workload
+
+PAGE_ROUTE = "/api/pages/{slug}"
+
+
+def load_trace(patterns: list[str]) -> list[dict]:
+    """Read every matching capture file (including rotated ones) in time order."""
+    entries = []
+    key_ids = set()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    if "capture" in entry:
+                        # Header: which key hashed the slugs that follow
+                        key_ids.add(entry["slug_key_id"])
+                    else:
+                        entries.append(entry)
+    if len(key_ids) > 1:
+        print(f"Warning: captures use {len(key_ids)} slug keys, so the same page seen by "
+              f"different writers replays as different slugs (set TRAFFIC_CAPTURE_KEY to share one)")
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def synthetic_slug(slug_hash: str, length: Optional[int]) -> str:
+    """Stable, valid slug standing in for the captured one."""
+    length = max(3, min(50, length or 12))
+    return (slug_hash * (length // len(slug_hash) + 1))[:length]
+
+
+def resolve_path(entry: dict) -> Optional[str]:
+    route = entry["route"]
+    if route == "unmatched":
+        return None
+    if "{slug}" in route:
+        if not entry.get("slug"):
+            return None
+        route = route.replace("{slug}", synthetic_slug(entry["slug"], entry.get("slug_len")))
+    if "{job_id}" in route or "{template_id}" in route:
+        route = route.replace("{job_id}", "00000000-0000-0000-0000-000000000000")
+        route = route.replace("{template_id}", "classic")
+    return route
+
+
+async def seed_pages(client, trace: list[dict], concurrency: int) -> dict[str, str]:
+    """
+    Create every page that the trace reads or edits successfully, and every
+    slug a check or lease found taken (so those replay with their
+    suggestions). Returns slug -> edit token.
+    """
+    wanted = sorted({
+        synthetic_slug(entry["slug"], entry.get("slug_len"))
+        for entry in trace
+        if entry.get("slug") and (
+            (entry["route"].startswith(PAGE_ROUTE) and entry["status"] < 400) or entry.get("slug_taken")
+        )
+    })
+    tokens: dict[str, str] = {}
+    pending = iter(wanted)
+
+    async def worker(worker_id: int):
+        for slug in pending:
+            response = await client.post(
+                "/api/pages", json=page_body(slug),
+                headers={"X-Forwarded-For": f"10.200.{worker_id // 256}.{worker_id % 256}"},
+            )
+            if response.status_code == 200 and "edit_token" in response.json():
+                tokens[slug] = response.json()["edit_token"]
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return tokens
+
+
+async def replay(client, trace: list[dict], tokens: dict[str, str], args) -> dict:
+    loader = Workload(args.seed, 0, 1.0)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    original: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    errors: dict[str, int] = defaultdict(int)
+    status_matches: dict[str, int] = defaultdict(int)
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    skipped = 0
+
+    async def send(entry: dict, path: str, client_id: int):
+        group = f"{entry['method']} {entry['route']}"
+        kwargs: dict = {"headers": {"X-Forwarded-For": f"10.100.{client_id // 256 % 256}.{client_id % 256}"}}
+        if entry["method"] == "POST" and entry["route"] == "/api/pages":
+            kwargs["json"] = page_body(random_slug(loader.rng, "replay"))
+        elif entry["method"] == "PATCH":
+            kwargs["json"] = {"title": "Replayed update"}
+        slug = path.rsplit("/", 1)[-1]
+        if entry["method"] in ("PATCH", "DELETE") and slug in tokens:
+            kwargs["headers"]["X-Edit-Token"] = tokens[slug]
+
+        async with in_flight:
+            start = time.perf_counter()
+            try:
+                response = await client.request(entry["method"], path, **kwargs)
+                status = response.status_code
+            except Exception:
+                status = 0
+            latencies[group].append(time.perf_counter() - start)
+
+        original[group].append(entry["ms"] / 1000)
+        statuses[group][status] += 1
+        if status == 0 or status >= 500:
+            errors[group] += 1
+        if status == entry["status"]:
+            status_matches[group] += 1
+
+    tasks = []
+    t0 = trace[0]["t"]
+    start = time.perf_counter()
+    for index, entry in enumerate(trace):
+        path = resolve_path(entry)
+        if path is None:
+            skipped += 1
+            continue
+        if args.speed > 0:
+            delay = (entry["t"] - t0) / args.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(entry, path, index % args.clients)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for group in sorted(latencies):
+        replayed = summarize(latencies[group], errors[group], elapsed, statuses[group])
+        captured = summarize(original[group], 0, elapsed, {})
+        report[group] = {
+            "replayed": replayed,
+            "captured": {key: captured[key] for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")},
+            "status_match_rate": round(status_matches[group] / len(latencies[group]), 4),
+        }
+    return {"wall_seconds": round(elapsed, 3), "skipped": skipped, "endpoints": report}
+
+
+def print_report(result: dict):
+    print(f"\nReplayed in {result['wall_seconds']:.1f}s ({result['skipped']} unroutable entries skipped)")
+    print(f"  {'endpoint':<38} {'req':>7}  {'p50 cap/rep':>19}  {'p95 cap/rep':>19}  {'p99 cap/rep':>19}  status match")
+    for group, data in result["endpoints"].items():
+        cap, rep = data["captured"], data["replayed"]
+        print(
+            f"  {group:<38} {rep['requests']:>7}  "
+            f"{cap['p50_ms']:>8.2f}/{rep['p50_ms']:<8.2f}ms  "
+            f"{cap['p95_ms']:>8.2f}/{rep['p95_ms']:<8.2f}ms  "
+            f"{cap['p99_ms']:>8.2f}/{rep['p99_ms']:<8.2f}ms  "
+            f"{data['status_match_rate']:.1%}"
+        )
+
+
+async def run(args, trace: list[dict]) -> dict:
+    import httpx
+
+    async def against(client):
+        tokens = await seed_pages(client, trace, args.seed_concurrency)
+        print(f"Seeded {len(tokens)} pages")
+        return await replay(client, trace, tokens, args)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            return await against(client)
+    async with running_app(args.fake_redis) as client:
+        return await against(client)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a local instance")
+    parser.add_argument("captures", nargs="+", help="Capture files or glob patterns")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="1 keeps the original timing, N replays N times faster, 0 as fast as possible")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N entries")
+    parser.add_argument("--clients", type=int, default=1000, help="Distinct client IPs to spread requests over")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--seed-concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--fake-redis", action="store_true", help="Use the in-process Redis stand-in")
+    parser.add_argument("--redis-url", default=None, help="Redis to use when booting in-process")
+    parser.add_argument("--url", default=None, help="Target a running server instead of booting one")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    trace = load_trace(args.captures)[: args.limit]
+    if not trace:
+        print("No entries found in the capture files")
+        return 1
+    print(f"Loaded {len(trace)} entries spanning {trace[-1]['t'] - trace[0]['t']:.1f}s")
+    if not args.url:
+        prepare_environment(args.redis_url)
+
+    result = asyncio.run(run(args, trace))
+    print_report(result)
+
+    if args.output:
+        write_json(args.output, {
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "environment": environment_info(),
+            **result,
+        })
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(exit_code(main()))
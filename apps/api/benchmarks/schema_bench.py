@@ -0,0 +1,177 @@
+"""
+Insert and lookup cost of the pages schema before and after the index overhaul
+(migration 002), at a realistic table size.
+
+Builds two SQLite files from the migration scripts - one stopped at 001, one
+fully migrated - bulk loads N pages (a share of them soft-deleted), then times
+single-row inserts in their own transactions (the API's write pattern) and
+the lookups the API makes on every request.
+
+    cd apps/api
+    python -m benchmarks.schema_bench --rows 1000000 --output schema.json
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from .common import API_DIR, environment_info, percentile, write_json
+
+MIGRATIONS_DIR = API_DIR / "app" / "db" / "migrations"
+
+# Migration 002 is the index overhaul; "after" stops there so later migrations don't blur the comparison
+INDEX_OVERHAUL_VERSION = 2
+
+INSERT_SQL = """
+    INSERT INTO pages (slug, slug_lower, title, message, sender_name, recipient_name, template_id, edit_token)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+LOOKUPS = {
+    "slug_exists": "SELECT 1 FROM pages WHERE slug_lower = ? AND is_active = 1",
+    "page_read": "SELECT * FROM pages WHERE slug_lower = ? AND is_active = 1",
+}
+
+
+def migrations_up_to(version: int) -> list[str]:
+    scripts = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        number = int(path.name.split("_", 1)[0])
+        if number <= version:
+            scripts.append(f"BEGIN;\n{path.read_text()}\nPRAGMA user_version = {number};\nCOMMIT;")
+    return scripts
+
+
+def page_row(i: int) -> tuple:
+    slug = f"Page-{i:08d}"
+    return (slug, slug.lower(), "Happy Valentine's Day!", "You make my heart sing. " * 8,
+            "Sam", "Alex", "classic", f"token-{i:08d}-{'x' * 30}")
+
+
+def build(path: str, version: int, rows: int, deleted_share: float, batch: int) -> dict:
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    for script in migrations_up_to(version):
+        db.executescript(script)
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        db.execute("BEGIN")
+        db.executemany(INSERT_SQL, (page_row(i) for i in range(offset, min(rows, offset + batch))))
+        db.execute("COMMIT")
+    bulk_seconds = time.perf_counter() - start
+
+    # Soft-delete a share of pages, spread across the key space
+    step = max(1, int(1 / deleted_share)) if deleted_share > 0 else 0
+    if step:
+        db.execute("UPDATE pages SET is_active = 0 WHERE id % ? = 0", (step,))
+    db.execute("ANALYZE")
+    db.close()
+    return {"bulk_load_seconds": round(bulk_seconds, 3), "bulk_rows_per_second": round(rows / bulk_seconds)}
+
+
+def time_single_inserts(path: str, start_id: int, count: int) -> dict:
+    """Autocommit inserts, one transaction each, like create_page_async."""
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("PRAGMA synchronous=NORMAL")
+    samples = []
+    for i in range(start_id, start_id + count):
+        t = time.perf_counter()
+        db.execute(INSERT_SQL, page_row(i))
+        samples.append(time.perf_counter() - t)
+    db.close()
+    return latency_summary(samples)
+
+
+def time_lookups(path: str, rows: int, count: int, seed: int) -> dict:
+    db = sqlite3.connect(path)
+    rng = random.Random(seed)
+    keys = [page_row(rng.randrange(rows))[1] for _ in range(count)]
+    # A third of existence checks miss, as suggestion generation mostly probes free slugs
+    misses = [f"free-{rng.randrange(10 ** 9)}" for _ in range(count // 3)]
+    results = {}
+    for name, sql in LOOKUPS.items():
+        probe = keys + misses if name == "slug_exists" else keys
+        samples = []
+        for key in probe:
+            t = time.perf_counter()
+            db.execute(sql, (key,)).fetchall()
+            samples.append(time.perf_counter() - t)
+        results[name] = latency_summary(samples)
+        results[name]["plan"] = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", (keys[0],))]
+    db.close()
+    return results
+
+
+def latency_summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p50_us": round(percentile(ordered, 50) * 1e6, 2),
+        "p95_us": round(percentile(ordered, 95) * 1e6, 2),
+        "p99_us": round(percentile(ordered, 99) * 1e6, 2),
+    }
+
+
+def storage(path: str) -> dict:
+    db = sqlite3.connect(path)
+    indexes = [row[0] for row in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'pages'"
+    )]
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+    return {"pages_indexes": indexes, "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="valentine-schema-bench-")
+    variants = {"before": INDEX_OVERHAUL_VERSION - 1, "after": args.after_version}
+    report = {}
+    for name, version in variants.items():
+        path = os.path.join(workdir, f"{name}.db")
+        print(f"[{name}] schema v{version}: loading {args.rows:,} rows...")
+        result = {"schema_version": version}
+        result.update(build(path, version, args.rows, args.deleted_share, args.batch))
+        result["single_insert"] = time_single_inserts(path, args.rows, args.inserts)
+        result["lookups"] = time_lookups(path, args.rows, args.lookups, args.seed)
+        result.update(storage(path))
+        report[name] = result
+        os.remove(path)
+        print(
+            f"[{name}] bulk {result['bulk_rows_per_second']:,} rows/s, "
+            f"insert p50 {result['single_insert']['p50_us']}us, "
+            f"exists p50 {result['lookups']['slug_exists']['p50_us']}us, "
+            f"read p50 {result['lookups']['page_read']['p50_us']}us, "
+            f"{result['file_mb']}MB, indexes: {', '.join(result['pages_indexes'])}"
+        )
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pages schema before/after the index overhaul")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--deleted-share", type=float, default=0.05, help="Share of pages soft-deleted")
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows per bulk-load transaction")
+    parser.add_argument("--inserts", type=int, default=5_000, help="Single-row inserts to time")
+    parser.add_argument("--lookups", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--after-version", type=int, default=INDEX_OVERHAUL_VERSION,
+                        help="Schema version of the \"after\" database (later migrations change more than indexes)")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+    latest = max(int(p.name.split("_", 1)[0]) for p in MIGRATIONS_DIR.glob("*.sql"))
+    if not INDEX_OVERHAUL_VERSION <= args.after_version <= latest:
+        parser.error(f"--after-version must be between {INDEX_OVERHAUL_VERSION} and {latest}")
+
+    report = {"config": vars(args), "environment": environment_info(), "results": run(args)}
+    if args.output:
+        write_json(args.output, report)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Page-creation write throughput against 1, 2, 4, ... SQLite shards.
+
+Each run starts --processes worker processes (like uvicorn workers) that call
+the real creation path (create_page_async with the in-process Redis
+stand-in) from --concurrency tasks each for --duration seconds, against a
+fresh set of shard files.
+
+    cd apps/api
+    python -m benchmarks.shard_bench --shards 1 2 4 --processes 4 --duration 10 --output shards.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .common import API_DIR, environment_info, percentile, write_json
+
+PROBE = r"""
+import asyncio, json, os, sys, time, uuid
+from benchmarks import fake_redis
+fake_redis.install()
+from app.services.redis_client import redis_client
+from app.tasks.page_tasks import create_page_async
+
+duration, concurrency = float(sys.argv[1]), int(sys.argv[2])
+
+async def main():
+    await redis_client.connect()
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def writer():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            result = await create_page_async(
+                slug=f"s-{uuid.uuid4().hex[:16]}", title="Bench", message="x" * 200,
+                template_id="classic", client_ip="127.0.0.1",
+            )
+            if result["status"] == "success":
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(writer() for _ in range(concurrency)))
+    print(json.dumps({"latencies": latencies, "errors": errors}))
+
+asyncio.run(main())
+"""
+
+INIT = "import asyncio; from app.db.database import init_db; asyncio.run(init_db())"
+
+
+def run_shards(shards: int, args, workdir: str) -> dict:
+    env = dict(os.environ, DATABASE_PATH=os.path.join(workdir, f"shards-{shards}", "bench.db"), DB_SHARDS=str(shards))
+    os.makedirs(os.path.dirname(env["DATABASE_PATH"]), exist_ok=True)
+    # Migrate once up front so the workers only measure writes
+    subprocess.run([sys.executable, "-c", INIT], cwd=API_DIR, env=env, check=True, capture_output=True)
+
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", PROBE, str(args.duration), str(args.concurrency)],
+            cwd=API_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(args.processes)
+    ]
+    latencies, errors = [], 0
+    for process in processes:
+        out, err = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"shard bench worker failed:\n{err}")
+        result = json.loads(out.strip().splitlines()[-1])
+        latencies.extend(result["latencies"])
+        errors += result["errors"]
+
+    ordered = sorted(latencies)
+    return {
+        "creates": len(ordered),
+        "errors": errors,
+        "creates_per_second": round(len(ordered) / args.duration, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure page-creation throughput per shard count")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--processes", type=int, default=4, help="Writer processes (API workers)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent creations per process")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="valentine-shard-bench-")
+    results = {}
+    for shards in args.shards:
+        results[f"{shards}_shards"] = stats = run_shards(shards, args, workdir)
+        scale = stats["creates_per_second"] / results[f"{args.shards[0]}_shards"]["creates_per_second"] \
+            if results[f"{args.shards[0]}_shards"]["creates_per_second"] else 0
+        print(f"  {shards:>2} shards  {stats['creates_per_second']:>8.1f} creates/s  x{scale:.2f}  "
+              f"p50 {stats['p50_ms']:>7.2f}ms  p95 {stats['p95_ms']:>7.2f}ms  errors {stats['errors']}")
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "environment": environment_info(), "results": results})
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
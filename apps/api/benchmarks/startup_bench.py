@@ -0,0 +1,108 @@
+"""
+Cold-start cost of an API worker: importing app.main and running init_db.
+
+Each measurement runs in a fresh interpreter, like a uvicorn worker during a
+rolling deploy. Scenarios:
+
+- import: time to import app.main
+- init_fresh: init_db against an empty database (all migrations)
+- init_current: init_db against an up-to-date database (the common restart)
+- init_race: N workers booting at once against an empty database
+
+    cd apps/api
+    python -m benchmarks.startup_bench --runs 10 --workers 4 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .common import API_DIR, environment_info, percentile, write_json
+
+PROBE = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from app.db.database import init_db
+asyncio.run(init_db())
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "init_db": t2 - t1}))
+"""
+
+
+def probe(db_path: str) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_PATH=db_path)
+    return subprocess.Popen(
+        [sys.executable, "-c", PROBE], cwd=API_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+
+
+def collect(process: subprocess.Popen) -> dict:
+    out, err = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"startup probe failed:\n{err}")
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="valentine-startup-bench-")
+    imports, fresh, current, race_walls = [], [], [], []
+
+    # Warm the bytecode cache so the first run isn't an outlier
+    collect(probe(os.path.join(workdir, "warmup.db")))
+
+    for run_index in range(args.runs):
+        db_path = os.path.join(workdir, f"run-{run_index}.db")
+        first = collect(probe(db_path))
+        imports.append(first["import"])
+        fresh.append(first["init_db"])
+
+        second = collect(probe(db_path))
+        imports.append(second["import"])
+        current.append(second["init_db"])
+
+        race_path = os.path.join(workdir, f"race-{run_index}.db")
+        results = [collect(p) for p in [probe(race_path) for _ in range(args.workers)]]
+        race_walls.append(max(r["import"] + r["init_db"] for r in results))
+
+    return {
+        "import": summary(imports),
+        "init_fresh": summary(fresh),
+        "init_current": summary(current),
+        f"init_race_{args.workers}_workers_slowest": summary(race_walls),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure API worker cold-start time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4, help="Workers booting at once in the race scenario")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    for name, stats in results.items():
+        print(f"  {name:<36} mean {stats['mean_ms']:>8.2f}ms  p50 {stats['p50_ms']:>8.2f}ms  max {stats['max_ms']:>8.2f}ms")
+
+    if args.output:
+        write_json(args.output, {"config": vars(args), "environment": environment_info(), "results": results})
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
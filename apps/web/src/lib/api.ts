@@ -8,6 +8,7 @@ export interface Template {
   secondary_color: string
   font: string
   interactive: boolean
+  expires_after_days?: number | null
 }
 
 export interface Page {
@@ -20,6 +21,7 @@ export interface Page {
   template_id: string
   created_at: string
   view_count: number
+  expires_at: string | null
 }
 
 export interface PageCreateData {
@@ -29,6 +31,8 @@ export interface PageCreateData {
   sender_name?: string
   recipient_name?: string
   template_id: string
+  lease_token?: string
+  expires_at?: string
 }
 
 export interface PageCreateResponse {
@@ -57,6 +61,26 @@ export interface SlugCheckResponse {
   suggestions: string[]
 }
 
+export interface SlugLeaseResponse {
+  slug: string
+  lease_token: string
+  expires_in: number
+}
+
+export interface DailyPageStats {
+  date: string
+  views: number
+  unique_viewers: number
+  hourly: number[]
+}
+
+export interface PageStatsResponse {
+  slug: string
+  total_views: number
+  today: DailyPageStats
+  days: DailyPageStats[]
+}
+
 export interface ApiError {
   detail: string
 }
@@ -98,6 +122,11 @@ class ApiClient {
     return this.fetch(`/slugs/check/${encodeURIComponent(slug)}`)
   }
 
+  async leaseSlug(slug: string, leaseToken?: string): Promise<SlugLeaseResponse> {
+    const query = leaseToken ? `?lease_token=${encodeURIComponent(leaseToken)}` : ''
+    return this.fetch(`/slugs/lease/${encodeURIComponent(slug)}${query}`, { method: 'POST' })
+  }
+
   async getSuggestions(base: string, count = 5): Promise<{ suggestions: string[] }> {
     return this.fetch(`/slugs/suggest?base=${encodeURIComponent(base)}&count=${count}`)
   }
@@ -159,6 +188,14 @@ class ApiClient {
       },
     })
   }
+
+  async getPageStats(slug: string, editToken: string, days = 30): Promise<PageStatsResponse> {
+    return this.fetch(`/pages/${encodeURIComponent(slug)}/stats?days=${days}`, {
+      headers: {
+        'X-Edit-Token': editToken,
+      },
+    })
+  }
 }
 
 export const api = new ApiClient()